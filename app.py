@@ -5,29 +5,87 @@ This module provides the application factory pattern for creating Flask app inst
 Routes are organized in separate blueprint modules in the routes package.
 """
 
+from typing import Dict, Optional
+
 from flask import Flask
-from database import init_database, add_sample_data
+from database import init_database, add_sample_data, set_slow_query_threshold
 from routes import register_blueprints
+from routes.admission import init_admission
+from services.write_queue import start_write_queue
+
+# Settings for multi-worker deployments (see wsgi.py)
+PRODUCTION_CONFIG = {
+    'SAMPLE_DATA': False,
+    'PRECOMPILE_TEMPLATES': True,
+}
 
 
-def create_app():
+def precompile_templates(app: Flask) -> int:
+    """
+    Compile every Jinja template into the environment's cache, so the first
+    request to each page does not pay for compiling it.
+    
+    Returns:
+        int: number of templates compiled
+    """
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def create_app(config: Optional[Dict] = None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        config: Optional settings applied to app.config, e.g.
+            WRITE_QUEUE (bool): apply borrows/returns through the group-commit writer thread
+            SCHEDULER (bool): run the background jobs (see services.jobs) in this process
+            SAMPLE_DATA (bool): seed an empty catalog with sample books (default True)
+            PRECOMPILE_TEMPLATES (bool): compile all templates at startup (default False)
+            SLOW_QUERY_MS (float): log statements slower than this with their query plans
+                (default None, off; see query_log)
+            ADMISSION (dict): per-blueprint write limits overriding routes.admission's
+                defaults, e.g. {'borrowing': {'max_in_flight': 8}, 'catalog': None}
+    
     Returns:
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
     app.secret_key = "super secret key"
+    app.config.update(WRITE_QUEUE=False, SCHEDULER=False, SAMPLE_DATA=True, PRECOMPILE_TEMPLATES=False,
+                      SLOW_QUERY_MS=None)
+    if config:
+        app.config.update(config)
+    
+    # Time statements on every connection opened from here on
+    if app.config['SLOW_QUERY_MS'] is not None:
+        set_slow_query_threshold(app.config['SLOW_QUERY_MS'])
     
-    # Initialize the database
+    # Initialize the database (a single pragma read once the schema is current)
     init_database()
     
     # Add sample data for testing and demonstration
-    add_sample_data()
+    if app.config['SAMPLE_DATA']:
+        add_sample_data()
     
     # Register all route blueprints
     register_blueprints(app)
+    init_admission(app)
+    
+    if app.config['PRECOMPILE_TEMPLATES']:
+        precompile_templates(app)
+    
+    # Batch borrow/return commits on a single writer thread
+    if app.config['WRITE_QUEUE']:
+        start_write_queue()
+    
+    # Background jobs; alternatively run them with `python cli.py worker`
+    if app.config['SCHEDULER']:
+        from services.jobs import register_jobs
+        from services.scheduler import start_scheduler
+        register_jobs(start_scheduler())
     
     return app
 
@@ -0,0 +1,96 @@
+"""
+Catalog memory benchmark - bytes per book held by catalog-wide reads.
+
+Usage:
+    python benchmarks/catalog_memory.py [--books 50000]
+
+Fills a throwaway database with synthetic books and uses tracemalloc to
+measure the memory kept (and the peak while loading) by the list of dicts
+from get_all_books(), by the column-wise catalog snapshot, and by the
+BookView objects of a full catalog page on top of the snapshot.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import database  # noqa: E402
+from services.catalog_snapshot import CatalogSnapshot  # noqa: E402
+
+WORDS = ["silent", "river", "garden", "winter", "empire", "shadow", "letters", "journey", "house", "glass",
+         "northern", "history", "stars", "city", "ocean", "secret", "memory", "iron", "summer", "kingdom"]
+
+
+def fill_catalog(count: int) -> None:
+    """Insert count synthetic books (titles of 3-6 words, about 5 books per author)."""
+    rng = random.Random(327)
+    authors = [f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}son" for _ in range(max(1, count // 5))]
+    rows = [(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 6))).title() + f" {i}",
+             rng.choice(authors), f"{9780000000000 + i}", 3, rng.randint(0, 3))
+            for i in range(count)]
+    conn = database.get_db_connection()
+    conn.executemany('''
+        INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def traced(load: Callable[[], object]) -> Tuple[object, int, int]:
+    """Run load() under tracemalloc; return its result, the bytes it keeps and the peak while loading."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = load()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - before, peak - before
+
+
+def measure(count: int) -> Dict[str, Tuple[int, int]]:
+    """Bytes kept and peak bytes for each way of holding the catalog."""
+    database.get_all_books()  # open the pooled connection outside the measurements
+
+    results = {}
+    books, kept, peak = traced(database.get_all_books)
+    results["list of dicts (get_all_books)"] = (kept, peak)
+    del books
+
+    token = database.get_data_version()
+    snapshot = CatalogSnapshot(token)
+    _, kept, peak = traced(lambda: snapshot.refresh(token))
+    results["column snapshot"] = (kept, peak)
+
+    views, kept, peak = traced(snapshot.books)
+    results["+ views for a full page"] = (kept, peak)
+    assert len(views) == count
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure memory per book of catalog-wide reads")
+    parser.add_argument("--books", type=int, default=50000, help="Number of synthetic books")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DATABASE = os.path.join(workdir, "library.db")
+        database.init_database()
+        fill_catalog(args.books)
+        results = measure(args.books)
+        database.close_connection_pools()
+
+    print(f"{args.books} books")
+    print(f"{'layout':<32} {'kept/book':>10} {'peak/book':>10}")
+    for layout, (kept, peak) in results.items():
+        print(f"{layout:<32} {kept / args.books:>9.1f}B {peak / args.books:>9.1f}B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Startup benchmark - cold-start time of an app worker.
+
+Usage:
+    python benchmarks/startup.py [--runs 5]
+
+Every sample starts a fresh Python process, the way a new gunicorn worker
+does, and times importing the app, create_app() and the first request.
+The first start of each mode runs against an empty directory (schema
+setup); the later ones reuse that database like restarted workers.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import PRODUCTION_CONFIG, create_app
+app = create_app(PRODUCTION_CONFIG if sys.argv[1] == "production" else None)
+ready = time.perf_counter()
+app.test_client().get("/catalog")
+done = time.perf_counter()
+print(json.dumps({"startup": ready - start, "first_request": done - ready,
+                  "requests_imported": "requests" in sys.modules}))
+"""
+
+
+def run_probe(mode: str, workdir: str) -> Dict:
+    """Start one worker process in workdir and return its timings in seconds."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    result = subprocess.run([sys.executable, "-c", PROBE, mode], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(mode: str, runs: int) -> Dict:
+    """First start plus `runs` restarts of one startup mode."""
+    with tempfile.TemporaryDirectory() as workdir:
+        first = run_probe(mode, workdir)
+        restarts: List[Dict] = [run_probe(mode, workdir) for _ in range(runs)]
+    return {
+        "mode": mode,
+        "first_start_ms": first["startup"] * 1000,
+        "restart_ms": statistics.median(sample["startup"] for sample in restarts) * 1000,
+        "first_request_ms": statistics.median(sample["first_request"] for sample in restarts) * 1000,
+        "requests_imported": first["requests_imported"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure app worker cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Restarts measured per mode")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<12} {'first start':>12} {'restart':>10} {'1st request':>12}  requests imported")
+    for mode in ("development", "production"):
+        result = measure(mode, args.runs)
+        print(f"{result['mode']:<12} {result['first_start_ms']:>10.1f}ms {result['restart_ms']:>8.1f}ms "
+              f"{result['first_request_ms']:>10.1f}ms  {result['requests_imported']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Command line tools for the Library Management System.
+
+Usage:
+    python cli.py export borrow_records --format csv --start 2024-01-01 --output history.csv
+    python cli.py archive --older-than-days 90
+    python cli.py rebuild-counters
+    python cli.py reconcile-inventory
+    python cli.py reminders
+    python cli.py backup --output backups/library.db
+    python cli.py verify-backup backups/library.db
+    python cli.py restore backups/library.db
+    python cli.py maintenance --analyze
+    python cli.py maintenance --enable-incremental-vacuum
+    python cli.py worker
+"""
+
+import argparse
+import sys
+import time
+
+from database import init_database, rebuild_patron_counters, reconcile_book_availability
+from services.archive_service import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_returned_records
+from services.backup_service import BACKUP_PAGES, BACKUP_PAUSE, backup_database, restore_database, verify_backup
+from services.export_service import EXPORT_COLUMNS, EXPORT_FORMATS, export_table, parse_date_range
+from services.jobs import register_jobs
+from services.maintenance_service import CHECKPOINT_MODE, run_maintenance
+from services.reminder_service import REMINDER_INTERVAL, run_reminders
+from services.scheduler import Scheduler
+
+
+def run_export(args) -> int:
+    """Stream a table export to a file or stdout."""
+    start, end = parse_date_range(args.start, args.end)
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        for chunk in export_table(args.table, args.format, start, end):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def run_archive(args) -> int:
+    """Move old returned loans into the archive table."""
+    moved = archive_returned_records(args.older_than_days, args.batch_size)
+    print(f'Archived {moved} borrow records.')
+    return 0
+
+
+def run_rebuild_counters(args) -> int:
+    """Check the per-patron loan counters against borrow_records and fix drift."""
+    fixed = rebuild_patron_counters()
+    print(f'Corrected loan counters for {fixed} patrons.')
+    return 0
+
+
+def run_reconcile_inventory(args) -> int:
+    """Check available_copies of every book against its open loans and fix drift."""
+    fixed = reconcile_book_availability(args.batch_size)
+    print(f'Corrected available copies for {fixed} books.')
+    return 0
+
+
+def run_reminder_pass(args) -> int:
+    """Queue and deliver due-date reminders once."""
+    queued, delivered = run_reminders()
+    print(f'Queued {queued} reminders, delivered {delivered}.')
+    return 0
+
+
+def run_backup(args) -> int:
+    """Take an online backup while the app keeps running."""
+    report = backup_database(args.output, args.pages, args.pause)
+    print(f"Backed up {report['pages']} pages to {report['path']} in {report['elapsed_ms']} ms.")
+    return 0
+
+
+def run_verify_backup(args) -> int:
+    """Run an integrity check on every file of a backup."""
+    failed = 0
+    for backup, problems in verify_backup(args.path).items():
+        print(f"{backup}: {'; '.join(problems) if problems else 'ok'}")
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+def run_restore(args) -> int:
+    """Replace the live database with a verified backup."""
+    try:
+        report = restore_database(args.path)
+    except ValueError as e:
+        print(f'Backup not restored: {e}', file=sys.stderr)
+        return 1
+    print(f"Restored {report['pages']} pages from {report['path']}. Restart the app workers.")
+    return 0
+
+
+def run_maintenance_pass(args) -> int:
+    """Refresh planner statistics, vacuum free pages and checkpoint the WAL once."""
+    report = run_maintenance(args.analyze, args.vacuum_pages, args.checkpoint, args.enable_incremental_vacuum)
+    for result in report['files']:
+        before, after, steps = result['before'], result['after'], result['steps_ms']
+        print(f"{result['path']}: {before['file_bytes']} -> {after['file_bytes']} bytes, "
+              f"WAL {before['wal_bytes']} -> {after['wal_bytes']} bytes, "
+              f"freelist {before['freelist_pages']} -> {after['freelist_pages']} pages")
+        if 'enable_incremental_vacuum' in steps:
+            print(f"  enable_incremental_vacuum {steps['enable_incremental_vacuum']} ms")
+        print(f"  {result['statistics']} {steps['optimize']} ms, "
+              f"incremental_vacuum {steps['incremental_vacuum']} ms, "
+              f"wal_checkpoint {steps['wal_checkpoint']} ms")
+    return 0
+
+
+def run_worker(args) -> int:
+    """Run the background jobs until interrupted."""
+    scheduler = register_jobs(Scheduler(), args.reminder_interval)
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one sub-command per tool."""
+    parser = argparse.ArgumentParser(description='Library Management System tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help='Stream a table as JSON Lines or CSV')
+    export.add_argument('table', choices=sorted(EXPORT_COLUMNS))
+    export.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='jsonl')
+    export.add_argument('--start', help='First borrow date to include (YYYY-MM-DD)')
+    export.add_argument('--end', help='Last borrow date to include (YYYY-MM-DD)')
+    export.add_argument('--output', help='File to write (default: stdout)')
+    export.set_defaults(handler=run_export)
+
+    archive = commands.add_parser('archive', help='Move old returned loans to borrow_records_archive')
+    archive.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    archive.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    archive.set_defaults(handler=run_archive)
+
+    counters = commands.add_parser('rebuild-counters', help='Recompute per-patron loan counters')
+    counters.set_defaults(handler=run_rebuild_counters)
+
+    reconcile = commands.add_parser('reconcile-inventory', help='Recompute available copies from open loans')
+    reconcile.add_argument('--batch-size', type=int, default=500, help='Books repaired per transaction')
+    reconcile.set_defaults(handler=run_reconcile_inventory)
+
+    reminders = commands.add_parser('reminders', help='Queue and deliver due-date reminders once')
+    reminders.set_defaults(handler=run_reminder_pass)
+
+    backup = commands.add_parser('backup', help='Take an online backup of the database')
+    backup.add_argument('--output', help='Backup file to write (default: a timestamped file in backups/)')
+    backup.add_argument('--pages', type=int, default=BACKUP_PAGES, help='Pages copied per step')
+    backup.add_argument('--pause', type=float, default=BACKUP_PAUSE, help='Seconds to sleep between steps')
+    backup.set_defaults(handler=run_backup)
+
+    verify = commands.add_parser('verify-backup', help='Run PRAGMA integrity_check on a backup')
+    verify.add_argument('path')
+    verify.set_defaults(handler=run_verify_backup)
+
+    restore = commands.add_parser('restore', help='Replace the database with a verified backup')
+    restore.add_argument('path')
+    restore.set_defaults(handler=run_restore)
+
+    maintenance = commands.add_parser('maintenance', help='Run ANALYZE/optimize, incremental vacuum and a WAL checkpoint')
+    maintenance.add_argument('--analyze', action='store_true', help='Run a full ANALYZE instead of PRAGMA optimize')
+    maintenance.add_argument('--vacuum-pages', type=int, help='Most free pages to hand back per file (default: all)')
+    maintenance.add_argument('--enable-incremental-vacuum', action='store_true',
+                             help='Convert files made without auto_vacuum=INCREMENTAL (one-off full VACUUM)')
+    maintenance.add_argument('--checkpoint', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+                             default=CHECKPOINT_MODE)
+    maintenance.set_defaults(handler=run_maintenance_pass)
+
+    worker = commands.add_parser('worker', help='Run the background jobs until interrupted')
+    worker.add_argument('--reminder-interval', type=float, default=REMINDER_INTERVAL,
+                        help='Seconds between reminder runs')
+    worker.set_defaults(handler=run_worker)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    init_database()
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
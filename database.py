@@ -3,35 +3,236 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import heapq
+import itertools
+import os
+import queue
 import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import query_log
 
 # Database configuration
 DATABASE = 'library.db'
+FETCH_BATCH_SIZE = 500  # rows pulled per fetchmany() call by the iter_* helpers
+READ_POOL_SIZE = 8  # read-only connections shared by the query helpers
+WRITE_POOL_SIZE = 2  # SQLite has one writer at a time, so keep this small
+SHARD_COUNT = 1  # patron-scoped tables are split over this many files (1 keeps everything in DATABASE)
+SCATTER_WORKERS = 8  # threads used to query shards in parallel
+SCHEMA_VERSION = 4  # stored in PRAGMA user_version once init_database has set a file up (4: fee_paid per loan)
+
+AUTO_VACUUM_INCREMENTAL = 2  # PRAGMA auto_vacuum value of INCREMENTAL
+SETUP_BUSY_TIMEOUT = 600.0  # seconds a starting worker waits for another one's schema setup to finish
+
+T = TypeVar('T')
 
 def get_db_connection():
     """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
+    conn = sqlite3.connect(DATABASE, factory=query_log.connection_class())
     conn.row_factory = sqlite3.Row  # This enables column access by name
     return conn
 
-def init_database():
-    """Initialize the database with required tables."""
-    conn = get_db_connection()
-    
-    # Create books table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            author TEXT NOT NULL,
-            isbn TEXT UNIQUE NOT NULL,
-            total_copies INTEGER NOT NULL,
-            available_copies INTEGER NOT NULL
-        )
-    ''')
-    
+def _open_read_connection(path: str, catalog: Optional[str] = None) -> sqlite3.Connection:
+    """Open a read-only connection that can never take a write lock (attaching the catalog to shards)."""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False,
+                           factory=query_log.connection_class())
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA query_only = ON')
+    if catalog:
+        conn.execute('ATTACH DATABASE ? AS catalog', (f'file:{catalog}?mode=ro',))
+    return conn
+
+def _open_write_connection(path: str, catalog: Optional[str] = None) -> sqlite3.Connection:
+    """Open a read-write connection for the writer pool (attaching the catalog to shards)."""
+    conn = sqlite3.connect(path, check_same_thread=False, factory=query_log.connection_class())
+    conn.row_factory = sqlite3.Row
+    if catalog:
+        conn.execute('ATTACH DATABASE ? AS catalog', (catalog,))
+    return conn
+
+class ConnectionPool:
+    """A fixed-size pool of SQLite connections to one database file, usable from any thread."""
+
+    def __init__(self, opener: Callable[..., sqlite3.Connection], path: str, size: int,
+                 catalog: Optional[str] = None):
+        self._opener = opener
+        self._path = path
+        self._catalog = catalog
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, waiting if all of them are in use."""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._opener(self._path, self._catalog)
+            try:
+                yield conn
+            finally:
+                # Never hand the next borrower a half-finished transaction
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pools: Dict[Tuple[str, str, Optional[str]], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(kind: str, path: str, catalog: Optional[str] = None) -> ConnectionPool:
+    key = (kind, path, catalog)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                if kind == 'read':
+                    pool = ConnectionPool(_open_read_connection, path, READ_POOL_SIZE, catalog)
+                else:
+                    pool = ConnectionPool(_open_write_connection, path, WRITE_POOL_SIZE, catalog)
+                _pools[key] = pool
+    return pool
+
+def read_connection():
+    """Borrow a pooled read-only connection: `with read_connection() as conn: ...`"""
+    return _get_pool('read', DATABASE).connection()
+
+def write_connection():
+    """Borrow a pooled read-write connection: `with write_connection() as conn: ...`"""
+    return _get_pool('write', DATABASE).connection()
+
+def close_connection_pools() -> None:
+    """Close every pooled connection (e.g. before the database file is replaced)."""
+    global _data_version_conn, _data_version_generation
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+    with _data_version_lock:
+        if _data_version_conn is not None:
+            _data_version_conn.close()
+            _data_version_conn = None
+        _data_version_generation += 1
+
+def set_slow_query_threshold(threshold_ms: Optional[float]) -> None:
+    """
+    Turn the slow-query log on for statements slower than threshold_ms, or off with None.
+
+    Pooled connections are closed so every connection opened from now on is
+    (or is no longer) timed.
+    """
+    query_log.set_threshold(threshold_ms)
+    close_connection_pools()
+
+# A connection that never writes, so its PRAGMA data_version moves on every
+# commit made by any other connection (in this process or another one)
+_data_version_conn: Optional[sqlite3.Connection] = None
+_data_version_generation = 0
+_data_version_lock = threading.Lock()
+
+def get_data_version() -> Tuple[int, int]:
+    """
+    Get a token that changes whenever anything is committed to DATABASE.
+
+    data_version values are only comparable on one connection, so the token
+    also carries a generation that moves whenever that connection is reopened.
+
+    Returns:
+        tuple: (generation, data_version)
+    """
+    global _data_version_conn
+    with _data_version_lock:
+        if _data_version_conn is None:
+            _data_version_conn = _open_read_connection(DATABASE)
+        version = _data_version_conn.execute('PRAGMA data_version').fetchone()[0]
+        return _data_version_generation, version
+
+# Sharding: patron-scoped tables (borrow_records, borrow_records_archive,
+# patrons) live in one of SHARD_COUNT files chosen by a hash of patron_id.
+# books and the other catalog tables stay in DATABASE, which shard
+# connections ATTACH so queries can still join on books. Note that in WAL
+# mode a transaction spanning a shard and the catalog is atomic per file.
+
+def shard_for_patron(patron_id: str) -> int:
+    """Get the shard holding a patron's records (stable across processes, unlike hash())."""
+    return zlib.crc32(patron_id.encode()) % SHARD_COUNT
+
+def shard_path(shard: int) -> str:
+    """Get the database file of a shard; with a single shard that is DATABASE itself."""
+    if SHARD_COUNT == 1:
+        return DATABASE
+    root, ext = os.path.splitext(DATABASE)
+    return f'{root}_shard{shard}{ext}'
+
+def _catalog_for(path: str) -> Optional[str]:
+    """The catalog file a connection to path has to attach, if any."""
+    return None if path == DATABASE else DATABASE
+
+def shard_read_connection(shard: int):
+    """Borrow a pooled read-only connection to a shard: `with shard_read_connection(n) as conn: ...`"""
+    path = shard_path(shard)
+    return _get_pool('read', path, _catalog_for(path)).connection()
+
+def shard_write_connection(shard: int):
+    """Borrow a pooled read-write connection to a shard."""
+    path = shard_path(shard)
+    return _get_pool('write', path, _catalog_for(path)).connection()
+
+def open_shard_connection(shard: int) -> sqlite3.Connection:
+    """Open a dedicated (unpooled) read-write connection to a shard, e.g. for a writer thread."""
+    path = shard_path(shard)
+    return _open_write_connection(path, _catalog_for(path))
+
+_scatter_executor: Optional[ThreadPoolExecutor] = None
+
+def scatter_gather(query: Callable[[sqlite3.Connection], T]) -> List[T]:
+    """
+    Run query(conn) on every shard in parallel and return the per-shard results.
+
+    Args:
+        query: Function given a read-only shard connection
+    """
+    global _scatter_executor
+    if SHARD_COUNT == 1:
+        with shard_read_connection(0) as conn:
+            return [query(conn)]
+
+    with _pools_lock:
+        if _scatter_executor is None:
+            _scatter_executor = ThreadPoolExecutor(max_workers=SCATTER_WORKERS, thread_name_prefix='shard-query')
+
+    def run(shard):
+        with shard_read_connection(shard) as conn:
+            return query(conn)
+
+    return list(_scatter_executor.map(run, range(SHARD_COUNT)))
+
+def _create_patron_tables(conn: sqlite3.Connection) -> bool:
+    """
+    Create the patron-scoped tables on a shard (or the single database).
+
+    Returns:
+        bool: True if the patrons table did not exist yet
+    """
     # Create borrow_records table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS borrow_records (
@@ -41,12 +242,303 @@ def init_database():
             borrow_date TEXT NOT NULL,
             due_date TEXT NOT NULL,
             return_date TEXT,
+            fee_paid REAL NOT NULL DEFAULT 0,
             FOREIGN KEY (book_id) REFERENCES books (id)
         )
     ''')
-    
-    conn.commit()
-    conn.close()
+    # Late fees paid while the loan is open, deducted from the fee assessed at its return
+    if 'fee_paid' not in [column[1] for column in conn.execute('PRAGMA table_info(borrow_records)')]:
+        conn.execute('ALTER TABLE borrow_records ADD COLUMN fee_paid REAL NOT NULL DEFAULT 0')
+
+    # Date-range exports of the borrow history scan this index instead of the table
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_borrow_date
+        ON borrow_records (borrow_date)
+    ''')
+
+    # Overdue and due-soon reports range-scan open loans by due date; the
+    # partial index leaves returned loans out, so it stays small
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_due
+        ON borrow_records (due_date, patron_id, id) WHERE return_date IS NULL
+    ''')
+
+    # A patron's open loans (single and bulk lookups by patron_id)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_patron
+        ON borrow_records (patron_id, borrow_date) WHERE return_date IS NULL
+    ''')
+
+    # A patron's returned loans; with the open-loan index above (and the
+    # archive's) it pages a patron's history by (borrow_date, id)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_returned_patron
+        ON borrow_records (patron_id, borrow_date) WHERE return_date IS NOT NULL
+    ''')
+
+    # Open loans per book, counted by the inventory reconciliation
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_book
+        ON borrow_records (book_id) WHERE return_date IS NULL
+    ''')
+
+    # Create borrow_records_archive table (returned loans moved out of the hot table)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS borrow_records_archive (
+            id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT NOT NULL,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_archive_patron
+        ON borrow_records_archive (patron_id, borrow_date)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_archive_borrow_date
+        ON borrow_records_archive (borrow_date)
+    ''')
+
+    # Create patrons table (denormalized counters kept in step with borrow_records)
+    cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patrons'")
+    patrons_is_new = cursor.fetchone() is None
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patrons (
+            patron_id TEXT PRIMARY KEY,
+            active_loans INTEGER NOT NULL DEFAULT 0,
+            outstanding_fees REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    return patrons_is_new
+
+def _schema_version(path: str) -> int:
+    """PRAGMA user_version of a database file (0 if it does not exist yet)."""
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+def _request_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Ask for auto_vacuum=INCREMENTAL, which a new file takes with its first
+    table. Existing files are left alone: converting them needs a full VACUUM,
+    which is done on demand by enable_incremental_vacuum (see `cli.py maintenance`),
+    never at worker startup.
+    """
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+def _open_setup_connection(path: str) -> sqlite3.Connection:
+    """
+    Open a connection for init_database and take the file's write lock.
+
+    The busy timeout is long enough to wait out another worker's whole
+    setup. auto_vacuum is asked for first because a pragma issued inside
+    the transaction would not reach a new file; asking takes no lock.
+    """
+    conn = sqlite3.connect(path, timeout=SETUP_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    _request_incremental_vacuum(conn)
+    conn.execute('BEGIN IMMEDIATE')
+    return conn
+
+def _move_patron_rows_to_shards(conn: sqlite3.Connection, shard_conns: List[sqlite3.Connection]) -> int:
+    """
+    Move the patron-scoped tables of the catalog file into the shards
+    (inside the setup transactions), keeping their ids so reminders still
+    point at their loans, then drop them from the catalog file. Loan
+    counters are rebuilt afterwards.
+
+    Returns:
+        int: number of rows moved
+    """
+    moved = 0
+    for table in ('borrow_records', 'borrow_records_archive', 'patrons'):
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is None:
+            continue
+        columns = [column[1] for column in conn.execute(f'PRAGMA table_info({table})')]
+        # The shards commit before the catalog file drops its copy, so a setup
+        # interrupted in between finds the rows already moved on the next start
+        insert = f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            by_shard: Dict[int, List[Tuple]] = {}
+            for row in rows:
+                by_shard.setdefault(shard_for_patron(row['patron_id']), []).append(tuple(row))
+            for shard, shard_rows in by_shard.items():
+                shard_conns[shard].executemany(insert, shard_rows)
+            moved += len(rows)
+        conn.execute(f'DROP TABLE {table}')
+    return moved
+
+def schema_is_current() -> bool:
+    """Check whether the database and every shard file carry SCHEMA_VERSION."""
+    paths = [shard_path(shard) for shard in range(SHARD_COUNT)] if SHARD_COUNT > 1 else []
+    return all(_schema_version(path) == SCHEMA_VERSION for path in paths + [DATABASE])
+
+def init_database():
+    """
+    Initialize the database (and any shard files) with required tables.
+
+    Every app worker calls this at startup; once the schema is at
+    SCHEMA_VERSION it returns after reading one pragma per file. Otherwise
+    it takes the write lock of every file first (shards before the catalog,
+    the order borrows take them in), so workers starting together queue
+    there and the ones that get the locks after the first find the setup
+    done. Tables, counter rebuilds and the user_version stamp are all
+    written in those transactions, so a setup interrupted part way leaves
+    nothing behind and is redone on the next start.
+    """
+    if schema_is_current():
+        return
+
+    shard_conns = [_open_setup_connection(shard_path(shard))
+                   for shard in range(SHARD_COUNT)] if SHARD_COUNT > 1 else []
+    conn = _open_setup_connection(DATABASE)
+    conns = shard_conns + [conn]
+    try:
+        if all(c.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION for c in conns):
+            for c in conns:
+                c.rollback()
+            return
+
+        # Create books table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS books (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                isbn TEXT UNIQUE NOT NULL,
+                total_copies INTEGER NOT NULL,
+                available_copies INTEGER NOT NULL
+            )
+        ''')
+
+        # Create library_meta table (key/value settings such as the catalog version)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS library_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO library_meta (key, value) VALUES ('catalog_version', ?)
+        ''', (uuid.uuid4().hex,))
+
+        # Create holds table (waiting list per book; a returned copy goes to the
+        # oldest waiting hold and is kept for that patron while the hold is ready)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS holds (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                book_id INTEGER NOT NULL,
+                patron_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'waiting',
+                created_at TEXT NOT NULL,
+                ready_at TEXT,
+                FOREIGN KEY (book_id) REFERENCES books (id)
+            )
+        ''')
+        # One active hold per patron and book; also serves the patron's hold lookup
+        conn.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_active
+            ON holds (book_id, patron_id) WHERE status IN ('waiting', 'ready')
+        ''')
+        # The queue itself: waiting holds of a book in arrival order
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_holds_queue
+            ON holds (book_id, id) WHERE status = 'waiting'
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_holds_ready
+            ON holds (ready_at) WHERE status = 'ready'
+        ''')
+
+        # Create reminder_outbox table (due-date reminders waiting for the notifier)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS reminder_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patron_id TEXT NOT NULL,
+                loan_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                remind_on TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                sent_at TEXT,
+                UNIQUE (patron_id, loan_id, kind, remind_on)
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_reminder_outbox_pending
+            ON reminder_outbox (id) WHERE sent_at IS NULL
+        ''')
+
+        # Create book_popularity table (borrow counts per book and calendar period,
+        # bumped by every borrow so top-k lists never aggregate borrow_records)
+        cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'book_popularity'")
+        popularity_is_new = cursor.fetchone() is None
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS book_popularity (
+                period TEXT NOT NULL,
+                book_id INTEGER NOT NULL,
+                borrow_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, book_id)
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_book_popularity_rank
+            ON book_popularity (period, borrow_count DESC, book_id)
+        ''')
+
+        patron_conns = shard_conns or [conn]
+        counters_are_new = False
+        for patron_conn in patron_conns:
+            counters_are_new = _create_patron_tables(patron_conn) or counters_are_new
+        # Sharding turned on for a database that kept everything in one file
+        if shard_conns and _move_patron_rows_to_shards(conn, shard_conns):
+            counters_are_new = True
+
+        # Databases created before the patrons table existed need their counters seeded
+        if counters_are_new:
+            for patron_conn in patron_conns:
+                _rebuild_patron_counters_on(patron_conn)
+        if popularity_is_new:
+            _write_book_popularity(conn, _tally_book_popularity(itertools.chain.from_iterable(
+                patron_conn.execute('''
+                    SELECT book_id, borrow_date FROM borrow_records
+                    UNION ALL
+                    SELECT book_id, borrow_date FROM borrow_records_archive
+                ''') for patron_conn in patron_conns)))
+
+        # Shards first: the catalog's stamp is what tells later starts the setup is done
+        for c in conns:
+            c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            c.commit()
+
+        # WAL lets the read-only pool keep reading while a writer commits. The
+        # journal mode cannot change inside a transaction; this waits out any
+        # other connection with the same long busy timeout, and is a no-op on
+        # files already in WAL mode
+        for c in conns:
+            c.execute('PRAGMA journal_mode = WAL')
+    finally:
+        for c in conns:
+            c.close()
+
+def bump_catalog_version(conn: sqlite3.Connection) -> None:
+    """Mark the catalog as changed so cached search structures get rebuilt."""
+    conn.execute('''
+        INSERT OR REPLACE INTO library_meta (key, value) VALUES ('catalog_version', ?)
+    ''', (uuid.uuid4().hex,))
 
 def add_sample_data():
     """Add sample data to the database if it's empty."""
@@ -67,56 +559,270 @@ def add_sample_data():
                 VALUES (?, ?, ?, ?, ?)
             ''', (title, author, isbn, copies, copies))
         
-        # Make 1984 unavailable by adding a borrow record
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
-        
-        # Update available copies for 1984
-        conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
-        
+        bump_catalog_version(conn)
         conn.commit()
     
     conn.close()
 
+    if book_count == 0:
+        # Make 1984 unavailable by adding a borrow record (on the patron's shard)
+        record_borrow('123456', 3,
+                      datetime.now() - timedelta(days=5),
+                      datetime.now() + timedelta(days=9),
+                      max_loans=5)
+
 # Helper Functions for Database Operations
 
 def get_all_books() -> List[Dict]:
     """Get all books from the database."""
-    conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
-    conn.close()
+    with read_connection() as conn:
+        books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
     return [dict(book) for book in books]
 
+def _iter_query(sql: str, params: Tuple = (), batch_size: int = FETCH_BATCH_SIZE,
+                path: Optional[str] = None) -> Iterator[Dict]:
+    """Yield the rows of a query on DATABASE (or a shard path) as dicts, batch_size rows at a time."""
+    # A dedicated read-only connection, so a slow consumer does not hold a pooled one
+    path = path or DATABASE
+    conn = _open_read_connection(path, _catalog_for(path))
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
+
+def iter_books(batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Dict]:
+    """Yield all books ordered by title without loading the whole table."""
+    return _iter_query('SELECT * FROM books ORDER BY title', (), batch_size)
+
+def iter_borrow_records(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Dict]:
+    """
+    Yield borrow records (live and archived) ordered by borrow date without
+    loading the whole history.
+
+    Args:
+        start: Only records borrowed at or after this time
+        end: Only records borrowed before this time
+    """
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append('borrow_date >= ?')
+        params.append(start.isoformat())
+    if end is not None:
+        conditions.append('borrow_date < ?')
+        params.append(end.isoformat())
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    # Each table of each shard is read in borrow_date order from its own index and merged here
+    streams = [
+        _iter_query(f'''
+            SELECT id, patron_id, book_id, borrow_date, due_date, return_date
+            FROM {table} {where}
+            ORDER BY borrow_date, id
+        ''', tuple(params), batch_size, shard_path(shard))
+        for shard in range(SHARD_COUNT)
+        for table in ('borrow_records', 'borrow_records_archive')
+    ]
+    return heapq.merge(*streams, key=lambda record: (record['borrow_date'], record['id']))
+
+def get_patron_borrow_history(patron_id: str) -> List[Dict]:
+    """Get every book a patron has borrowed, including archived loans, oldest first."""
+    with shard_read_connection(shard_for_patron(patron_id)) as conn:
+        records = conn.execute('''
+            SELECT br.book_id, b.title, b.author, br.borrow_date
+            FROM (
+                SELECT book_id, borrow_date FROM borrow_records WHERE patron_id = ?
+                UNION ALL
+                SELECT book_id, borrow_date FROM borrow_records_archive WHERE patron_id = ?
+            ) br
+            JOIN books b ON br.book_id = b.id
+            ORDER BY br.borrow_date
+        ''', (patron_id, patron_id)).fetchall()
+    return [dict(record) for record in records]
+
+def get_patron_borrow_history_page(patron_id: str, before: Optional[Tuple[str, int]] = None,
+                                   limit: int = 20) -> List[Dict]:
+    """
+    Get one page of a patron's loans, including archived ones, newest first.
+
+    Args:
+        patron_id: Patron whose history to read
+        before: Keyset cursor, the (borrow_date, id) of the last loan of the previous page
+        limit: Maximum loans to return
+
+    Returns:
+        list: id, book_id, title, author and the ISO borrow/due/return dates of each loan
+    """
+    conditions = 'br.patron_id = ?'
+    params: List = [patron_id]
+    if before is not None:
+        conditions += ' AND (br.borrow_date, br.id) < (?, ?)'
+        params.extend(before)
+    params.append(limit)
+
+    # Open, returned and archived loans each walk their own (patron_id, borrow_date)
+    # index backwards and stop after limit rows
+    sources = [
+        ('borrow_records', ' AND br.return_date IS NULL'),
+        ('borrow_records', ' AND br.return_date IS NOT NULL'),
+        ('borrow_records_archive', ''),
+    ]
+    with shard_read_connection(shard_for_patron(patron_id)) as conn:
+        streams = [[dict(record) for record in conn.execute(f'''
+            SELECT br.id, br.book_id, b.title, b.author, br.borrow_date, br.due_date, br.return_date
+            FROM {table} br
+            JOIN books b ON br.book_id = b.id
+            WHERE {conditions}{returned}
+            ORDER BY br.borrow_date DESC, br.id DESC
+            LIMIT ?
+        ''', tuple(params))] for table, returned in sources]
+
+    merged = heapq.merge(*streams, key=lambda record: (record['borrow_date'], record['id']), reverse=True)
+    return list(itertools.islice(merged, limit))
+
+def get_book_borrow_history(book_id: int) -> List[Dict]:
+    """Get every loan of a book across all shards (including archived loans), oldest first."""
+    def query(conn):
+        return [dict(record) for record in conn.execute('''
+            SELECT id, patron_id, book_id, borrow_date, due_date, return_date FROM borrow_records
+            WHERE book_id = ?
+            UNION ALL
+            SELECT id, patron_id, book_id, borrow_date, due_date, return_date FROM borrow_records_archive
+            WHERE book_id = ?
+            ORDER BY borrow_date
+        ''', (book_id, book_id))]
+
+    return list(heapq.merge(*scatter_gather(query), key=lambda record: record['borrow_date']))
+
+def get_open_loans_due(due_from: Optional[datetime], due_before: datetime,
+                       after: Optional[Tuple[str, str, int]] = None, limit: int = 100) -> List[Dict]:
+    """
+    Get one page of unreturned loans due in [due_from, due_before) across all
+    shards, ordered by (due_date, patron_id, id).
+
+    Args:
+        due_from: Earliest due date (None for no lower bound)
+        due_before: Only loans due before this time
+        after: Keyset cursor, the (due_date, patron_id, id) of the last loan of the previous page
+        limit: Maximum loans to return
+    """
+    conditions = ['br.return_date IS NULL', 'br.due_date < ?']
+    params: List = [due_before.isoformat()]
+    if due_from is not None:
+        conditions.append('br.due_date >= ?')
+        params.append(due_from.isoformat())
+    if after is not None:
+        conditions.append('(br.due_date, br.patron_id, br.id) > (?, ?, ?)')
+        params.extend(after)
+    params.append(limit)
+
+    # Each shard walks idx_borrow_records_open_due from the cursor and stops after limit rows
+    def query(conn):
+        return [dict(record) for record in conn.execute(f'''
+            SELECT br.id, br.patron_id, br.book_id, b.title, br.borrow_date, br.due_date
+            FROM borrow_records br INDEXED BY idx_borrow_records_open_due
+            JOIN books b ON br.book_id = b.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY br.due_date, br.patron_id, br.id
+            LIMIT ?
+        ''', tuple(params))]
+
+    merged = heapq.merge(*scatter_gather(query),
+                         key=lambda record: (record['due_date'], record['patron_id'], record['id']))
+    return list(itertools.islice(merged, limit))
+
+def archive_returned_borrow_records(returned_before: datetime, batch_size: int, shard: int = 0) -> int:
+    """
+    Move one batch of returned borrow records of a shard into borrow_records_archive.
+
+    Args:
+        returned_before: Only records returned before this time are moved
+        batch_size: Maximum number of records moved in this transaction
+        shard: Shard to archive
+
+    Returns:
+        int: number of records moved
+    """
+    with shard_write_connection(shard) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        ids = [row['id'] for row in conn.execute('''
+            SELECT id FROM borrow_records
+            WHERE return_date IS NOT NULL AND return_date < ?
+            ORDER BY id LIMIT ?
+        ''', (returned_before.isoformat(), batch_size)).fetchall()]
+        if ids:
+            placeholders = ','.join('?' * len(ids))
+            conn.execute(f'''
+                INSERT INTO borrow_records_archive (id, patron_id, book_id, borrow_date, due_date, return_date)
+                SELECT id, patron_id, book_id, borrow_date, due_date, return_date
+                FROM borrow_records WHERE id IN ({placeholders})
+            ''', ids)
+            conn.execute(f'DELETE FROM borrow_records WHERE id IN ({placeholders})', ids)
+        conn.commit()
+        return len(ids)
+
 def get_book_by_id(book_id: int) -> Optional[Dict]:
     """Get a specific book by ID."""
-    conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
-    conn.close()
+    with read_connection() as conn:
+        book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
     return dict(book) if book else None
 
 def get_book_by_isbn(isbn: str) -> Optional[Dict]:
     """Get a specific book by ISBN."""
-    conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
-    conn.close()
+    with read_connection() as conn:
+        book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
     return dict(book) if book else None
 
+def get_books_by_ids(book_ids: List[int]) -> List[Dict]:
+    """Get several books by ID with a single query, in the order the IDs were given."""
+    if not book_ids:
+        return []
+    placeholders = ','.join('?' * len(book_ids))
+    with read_connection() as conn:
+        books = conn.execute(f'SELECT * FROM books WHERE id IN ({placeholders})', list(book_ids)).fetchall()
+    by_id = {book['id']: dict(book) for book in books}
+    return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+def get_catalog_version() -> str:
+    """Get the token that changes whenever a book is added to the catalog."""
+    with read_connection() as conn:
+        row = conn.execute("SELECT value FROM library_meta WHERE key = 'catalog_version'").fetchone()
+    return row['value'] if row else ''
+
+def get_meta_value(key: str) -> Optional[str]:
+    """Get a library_meta setting, or None if it was never set."""
+    with read_connection() as conn:
+        row = conn.execute('SELECT value FROM library_meta WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else None
+
+def set_meta_value(key: str, value: str) -> bool:
+    """Store a library_meta setting."""
+    try:
+        with write_connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO library_meta (key, value) VALUES (?, ?)', (key, value))
+            conn.commit()
+        return True
+    except Exception as e:
+        return False
+
 def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     """Get currently borrowed books for a patron."""
-    conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
-        FROM borrow_records br 
-        JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ? AND br.return_date IS NULL
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
-    conn.close()
-    
+    with shard_read_connection(shard_for_patron(patron_id)) as conn:
+        records = conn.execute('''
+            SELECT br.*, b.title, b.author
+            FROM borrow_records br
+            JOIN books b ON br.book_id = b.id
+            WHERE br.patron_id = ? AND br.return_date IS NULL
+            ORDER BY br.borrow_date
+        ''', (patron_id,)).fetchall()
+
     borrowed_books = []
     for record in records:
         borrowed_books.append({
@@ -130,73 +836,779 @@ def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     
     return borrowed_books
 
+def get_borrowed_books_for_patrons(patron_ids: List[str], chunk_size: int = 500) -> Dict[str, List[Dict]]:
+    """
+    Get the currently borrowed books of many patrons with one IN query per
+    shard (per chunk_size patrons), in the same shape as get_patron_borrowed_books.
+
+    Returns:
+        dict: patron_id -> list of borrowed books (patrons without loans map to [])
+    """
+    by_shard: Dict[int, List[str]] = {}
+    for patron_id in dict.fromkeys(patron_ids):
+        by_shard.setdefault(shard_for_patron(patron_id), []).append(patron_id)
+
+    now = datetime.now()
+    borrowed: Dict[str, List[Dict]] = {patron_id: [] for patron_id in patron_ids}
+    for shard, shard_patrons in by_shard.items():
+        with shard_read_connection(shard) as conn:
+            for start in range(0, len(shard_patrons), chunk_size):
+                chunk = shard_patrons[start:start + chunk_size]
+                records = conn.execute(f'''
+                    SELECT br.patron_id, br.book_id, br.borrow_date, br.due_date, b.title, b.author
+                    FROM borrow_records br
+                    JOIN books b ON br.book_id = b.id
+                    WHERE br.patron_id IN ({', '.join('?' * len(chunk))}) AND br.return_date IS NULL
+                    ORDER BY br.patron_id, br.borrow_date
+                ''', tuple(chunk)).fetchall()
+                for record in records:
+                    due_date = datetime.fromisoformat(record['due_date'])
+                    borrowed[record['patron_id']].append({
+                        'book_id': record['book_id'],
+                        'title': record['title'],
+                        'author': record['author'],
+                        'borrow_date': datetime.fromisoformat(record['borrow_date']),
+                        'due_date': due_date,
+                        'is_overdue': now > due_date
+                    })
+    return borrowed
+
 def get_patron_borrow_count(patron_id: str) -> int:
-    """Get the number of books currently borrowed by a patron."""
-    conn = get_db_connection()
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
-    ''', (patron_id,)).fetchone()['count']
-    conn.close()
-    return count
+    """Get the number of books currently borrowed by a patron (from the patrons counter)."""
+    with shard_read_connection(shard_for_patron(patron_id)) as conn:
+        row = conn.execute('SELECT active_loans FROM patrons WHERE patron_id = ?', (patron_id,)).fetchone()
+    return row['active_loans'] if row else 0
 
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO books (title, author, isbn, total_copies, available_copies)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (title, author, isbn, total_copies, available_copies))
-        conn.commit()
-        conn.close()
+        with write_connection() as conn:
+            conn.execute('''
+                INSERT INTO books (title, author, isbn, total_copies, available_copies)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (title, author, isbn, total_copies, available_copies))
+            bump_catalog_version(conn)
+            conn.commit()
         return True
     except Exception as e:
-        conn.close()
         return False
 
-def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
-    """Insert a new borrow record into the database."""
-    conn = get_db_connection()
+def update_book_availability(book_id: int, change: int) -> bool:
+    """
+    Update the available copies of a book by a given amount (+1 for return, -1 for borrow).
+
+    Returns False, changing nothing, if the result would be negative or above total_copies.
+    """
     try:
+        with write_connection() as conn:
+            updated = conn.execute('''
+                UPDATE books SET available_copies = available_copies + ?
+                WHERE id = ? AND available_copies + ? BETWEEN 0 AND total_copies
+            ''', (change, book_id, change)).rowcount
+            conn.commit()
+        return updated == 1
+    except Exception as e:
+        return False
+
+
+# Transactional borrow/return with per-patron counters
+
+def _run_in_transaction(work: Callable[[sqlite3.Connection], Tuple[bool, str]],
+                        conn: Optional[sqlite3.Connection] = None, shard: int = 0) -> Tuple[bool, str]:
+    """
+    Run work(conn) atomically; it returns (success, reason) and is rolled back on failure.
+
+    With conn given, the work joins the caller's transaction as a savepoint and
+    the caller commits; otherwise it runs in its own BEGIN IMMEDIATE transaction
+    on a connection to the given shard.
+    """
+    if conn is not None:
+        conn.execute('SAVEPOINT library_op')
+        try:
+            result = work(conn)
+        except Exception:
+            result = (False, 'error')
+        if not result[0]:
+            conn.execute('ROLLBACK TO library_op')
+        conn.execute('RELEASE library_op')
+        return result
+
+    with shard_write_connection(shard) as conn:
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            result = work(conn)
+            if result[0]:
+                conn.commit()
+            else:
+                conn.rollback()
+            return result
+        except Exception as e:
+            conn.rollback()
+            return False, 'error'
+
+def record_borrow(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime,
+                  max_loans: int, conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, str]:
+    """
+    Create a borrow record, take a copy and bump the patron's loan counter and
+    the book's popularity counters in one transaction.
+
+    The copy and loan-limit checks are re-done inside the transaction, so
+    concurrent borrows can never overdraw a book or exceed max_loans.
+
+    A copy kept for the patron's ready hold is used before the shelf copies.
+
+    Returns:
+        tuple: (success, reason) with reason one of '', 'limit', 'unavailable', 'error'
+    """
+    def work(conn):
+        conn.execute('INSERT OR IGNORE INTO patrons (patron_id) VALUES (?)', (patron_id,))
+        updated = conn.execute('''
+            UPDATE patrons SET active_loans = active_loans + 1
+            WHERE patron_id = ? AND active_loans < ?
+        ''', (patron_id, max_loans)).rowcount
+        if not updated:
+            return False, 'limit'
+
+        collected = conn.execute('''
+            UPDATE holds SET status = 'fulfilled'
+            WHERE book_id = ? AND patron_id = ? AND status = 'ready'
+        ''', (book_id, patron_id)).rowcount
+        if not collected:
+            updated = conn.execute('''
+                UPDATE books SET available_copies = available_copies - 1
+                WHERE id = ? AND available_copies > 0
+            ''', (book_id,)).rowcount
+            if not updated:
+                return False, 'unavailable'
+            conn.execute('''
+                UPDATE holds SET status = 'fulfilled'
+                WHERE book_id = ? AND patron_id = ? AND status = 'waiting'
+            ''', (book_id, patron_id))
+
         conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
         ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        conn.close()
-        return False
+        bump_book_popularity(conn, book_id, borrow_date)
+        return True, ''
 
-def update_book_availability(book_id: int, change: int) -> bool:
-    """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
-    conn = get_db_connection()
-    try:
+    return _run_in_transaction(work, conn, shard_for_patron(patron_id))
+
+def record_return(patron_id: str, book_id: int, return_date: datetime, late_fee: float = 0.0,
+                  conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, str]:
+    """
+    Close the patron's oldest open loan of a book, pass the copy to the next
+    hold (or put it back on the shelf) and update the patron's counters (one
+    fewer loan, the part of late_fee not already paid on the loan added to
+    outstanding fees).
+
+    Returns:
+        tuple: (success, reason) with reason one of '', 'held' (the copy went
+        to a hold), 'not_borrowed', 'error'
+    """
+    def work(conn):
+        loan = _oldest_open_loan(conn, patron_id, book_id)
+        if loan is None:
+            return False, 'not_borrowed'
+        conn.execute('UPDATE borrow_records SET return_date = ? WHERE id = ?',
+                     (return_date.isoformat(), loan['id']))
+
+        held_for = _release_copy(conn, book_id, return_date)
         conn.execute('''
-            UPDATE books SET available_copies = available_copies + ? WHERE id = ?
-        ''', (change, book_id))
+            UPDATE patrons
+            SET active_loans = MAX(active_loans - 1, 0), outstanding_fees = outstanding_fees + ?
+            WHERE patron_id = ?
+        ''', (max(late_fee - loan['fee_paid'], 0.0), patron_id))
+        return True, 'held' if held_for else ''
+
+    return _run_in_transaction(work, conn, shard_for_patron(patron_id))
+
+def record_fee_payment(patron_id: str, book_id: int, amount: float,
+                       conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, str]:
+    """
+    Record a late-fee payment the gateway accepted.
+
+    A payment for a book still on loan is kept on that loan (fee_paid) and
+    deducted from the fee assessed when it comes back; otherwise it settles
+    the patron's outstanding (assessed) fees.
+
+    Returns:
+        tuple: (success, reason) with reason one of '', 'error'
+    """
+    def work(conn):
+        loan = _oldest_open_loan(conn, patron_id, book_id)
+        if loan is not None:
+            conn.execute('UPDATE borrow_records SET fee_paid = fee_paid + ? WHERE id = ?', (amount, loan['id']))
+        else:
+            conn.execute('''
+                UPDATE patrons SET outstanding_fees = MAX(outstanding_fees - ?, 0) WHERE patron_id = ?
+            ''', (amount, patron_id))
+        return True, ''
+
+    return _run_in_transaction(work, conn, shard_for_patron(patron_id))
+
+def get_late_fee_paid(patron_id: str, book_id: int) -> float:
+    """Late fees already paid on the patron's oldest open loan of a book (0 if there is none)."""
+    with shard_read_connection(shard_for_patron(patron_id)) as conn:
+        loan = _oldest_open_loan(conn, patron_id, book_id)
+    return loan['fee_paid'] if loan else 0.0
+
+def _oldest_open_loan(conn: sqlite3.Connection, patron_id: str, book_id: int) -> Optional[sqlite3.Row]:
+    """The id and fee_paid of the patron's oldest open loan of a book, the one returns and fees apply to."""
+    return conn.execute('''
+        SELECT id, fee_paid FROM borrow_records
+        WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+        ORDER BY borrow_date LIMIT 1
+    ''', (patron_id, book_id)).fetchone()
+
+def record_borrows(patron_id: str, book_ids: List[int], borrow_date: datetime, due_date: datetime,
+                   max_loans: int, conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, List[str]]:
+    """
+    Borrow several books for one patron in a single transaction.
+
+    Each book runs record_borrow as its own savepoint, so a book that cannot
+    be borrowed is skipped without undoing the others.
+
+    Returns:
+        tuple: (True, one record_borrow reason per book) once committed, or
+        (False, 'error') when the transaction failed as a whole
+    """
+    reasons: List[str] = []
+
+    def work(conn):
+        reasons.clear()
+        for book_id in book_ids:
+            reasons.append(record_borrow(patron_id, book_id, borrow_date, due_date, max_loans, conn=conn)[1])
+        return True, ''
+
+    success, reason = _run_in_transaction(work, conn, shard_for_patron(patron_id))
+    return (True, reasons) if success else (False, reason)
+
+def record_returns(patron_id: str, returns: List[Tuple[int, float]], return_date: datetime,
+                   conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, List[str]]:
+    """
+    Return several books for one patron in a single transaction.
+
+    Args:
+        returns: (book_id, late_fee) per book, as passed to record_return
+
+    Returns:
+        tuple: (True, one record_return reason per book) once committed, or
+        (False, 'error') when the transaction failed as a whole
+    """
+    reasons: List[str] = []
+
+    def work(conn):
+        reasons.clear()
+        for book_id, late_fee in returns:
+            reasons.append(record_return(patron_id, book_id, return_date, late_fee, conn=conn)[1])
+        return True, ''
+
+    success, reason = _run_in_transaction(work, conn, shard_for_patron(patron_id))
+    return (True, reasons) if success else (False, reason)
+
+def _release_copy(conn: sqlite3.Connection, book_id: int, now: datetime) -> Optional[str]:
+    """
+    Give a freed copy of a book to its oldest waiting hold, or put it back on
+    the shelf when nobody is waiting.
+
+    Returns:
+        str: patron_id of the hold that got the copy, or None
+    """
+    hold = conn.execute('''
+        SELECT id, patron_id FROM holds
+        WHERE book_id = ? AND status = 'waiting'
+        ORDER BY id LIMIT 1
+    ''', (book_id,)).fetchone()
+    if hold:
+        conn.execute("UPDATE holds SET status = 'ready', ready_at = ? WHERE id = ?",
+                     (now.isoformat(), hold['id']))
+        return hold['patron_id']
+
+    conn.execute('''
+        UPDATE books SET available_copies = available_copies + 1
+        WHERE id = ? AND available_copies < total_copies
+    ''', (book_id,))
+    return None
+
+def place_hold(patron_id: str, book_id: int, now: datetime,
+               conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, str]:
+    """
+    Put a patron on a book's waiting list.
+
+    Returns:
+        tuple: (success, reason) with reason one of '', 'available' (a copy is
+        on the shelf), 'duplicate', 'error'
+    """
+    def work(conn):
+        book = conn.execute('SELECT available_copies FROM books WHERE id = ?', (book_id,)).fetchone()
+        if book is None or book['available_copies'] > 0:
+            return False, 'available'
+        try:
+            conn.execute('''
+                INSERT INTO holds (book_id, patron_id, status, created_at)
+                VALUES (?, ?, 'waiting', ?)
+            ''', (book_id, patron_id, now.isoformat()))
+        except sqlite3.IntegrityError:
+            return False, 'duplicate'
+        return True, ''
+
+    return _run_in_transaction(work, conn, shard_for_patron(patron_id))
+
+def cancel_hold(patron_id: str, book_id: int, now: datetime,
+                conn: Optional[sqlite3.Connection] = None) -> Tuple[bool, str]:
+    """
+    Cancel a patron's hold; a copy kept for it goes to the next hold.
+
+    Returns:
+        tuple: (success, reason) with reason one of '', 'no_hold', 'error'
+    """
+    def work(conn):
+        hold = conn.execute('''
+            SELECT id, status FROM holds
+            WHERE book_id = ? AND patron_id = ? AND status IN ('waiting', 'ready')
+        ''', (book_id, patron_id)).fetchone()
+        if hold is None:
+            return False, 'no_hold'
+        conn.execute("UPDATE holds SET status = 'cancelled' WHERE id = ?", (hold['id'],))
+        if hold['status'] == 'ready':
+            _release_copy(conn, book_id, now)
+        return True, ''
+
+    return _run_in_transaction(work, conn, shard_for_patron(patron_id))
+
+def get_hold(patron_id: str, book_id: int) -> Optional[Dict]:
+    """
+    Get a patron's active hold on a book.
+
+    Returns:
+        dict: status ('waiting' or 'ready'), created_at, ready_at and position
+        (1 = next in line, 0 once the copy is ready), or None without a hold
+    """
+    with read_connection() as conn:
+        hold = conn.execute('''
+            SELECT id, status, created_at, ready_at FROM holds
+            WHERE book_id = ? AND patron_id = ? AND status IN ('waiting', 'ready')
+        ''', (book_id, patron_id)).fetchone()
+        if hold is None:
+            return None
+        position = 0
+        if hold['status'] == 'waiting':
+            # A range count on idx_holds_queue, not a scan of the holds table
+            position = conn.execute('''
+                SELECT COUNT(*) AS position FROM holds
+                WHERE book_id = ? AND status = 'waiting' AND id <= ?
+            ''', (book_id, hold['id'])).fetchone()['position']
+    return {'status': hold['status'], 'created_at': hold['created_at'],
+            'ready_at': hold['ready_at'], 'position': position}
+
+def expire_ready_holds(ready_before: datetime, now: datetime) -> int:
+    """
+    Expire ready holds that were not collected in time and pass their copies on.
+
+    Returns:
+        int: number of holds expired
+    """
+    with write_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = conn.execute('''
+                SELECT id, book_id FROM holds
+                WHERE status = 'ready' AND ready_at < ?
+            ''', (ready_before.isoformat(),)).fetchall()
+            for hold in expired:
+                conn.execute("UPDATE holds SET status = 'expired' WHERE id = ?", (hold['id'],))
+                _release_copy(conn, hold['book_id'], now)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(expired)
+
+def get_patron_counters(patron_id: str) -> Dict:
+    """Get a patron's active loan count and outstanding (assessed, unpaid) late fees."""
+    with shard_read_connection(shard_for_patron(patron_id)) as conn:
+        row = conn.execute('''
+            SELECT active_loans, outstanding_fees FROM patrons WHERE patron_id = ?
+        ''', (patron_id,)).fetchone()
+    if not row:
+        return {'active_loans': 0, 'outstanding_fees': 0.0}
+    return {'active_loans': row['active_loans'], 'outstanding_fees': row['outstanding_fees']}
+
+def rebuild_patron_counters() -> int:
+    """
+    Recompute every patron's active loan count from borrow_records in one
+    aggregate pass per shard and fix the counters that drifted.
+
+    Outstanding fees are not derivable from borrow_records and are left as is.
+
+    Returns:
+        int: number of patrons whose counter was corrected
+    """
+    corrected = 0
+    for shard in range(SHARD_COUNT):
+        with shard_write_connection(shard) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            corrected += _rebuild_patron_counters_on(conn)
+            conn.commit()
+    return corrected
+
+def _rebuild_patron_counters_on(conn: sqlite3.Connection) -> int:
+    """Fix the drifted active loan counters of one shard (inside the caller's transaction)."""
+    actual = {row['patron_id']: row['count'] for row in conn.execute('''
+        SELECT patron_id, COUNT(*) AS count FROM borrow_records
+        WHERE return_date IS NULL GROUP BY patron_id
+    ''')}
+    stored = {row['patron_id']: row['active_loans'] for row in conn.execute(
+        'SELECT patron_id, active_loans FROM patrons')}
+
+    drifted = [(patron_id, actual.get(patron_id, 0))
+               for patron_id in set(actual) | set(stored)
+               if actual.get(patron_id, 0) != stored.get(patron_id)]
+    conn.executemany('INSERT OR IGNORE INTO patrons (patron_id) VALUES (?)',
+                     [(patron_id,) for patron_id, _ in drifted])
+    conn.executemany('UPDATE patrons SET active_loans = ? WHERE patron_id = ?',
+                     [(count, patron_id) for patron_id, count in drifted])
+    return len(drifted)
+
+def insert_reminders(reminders: List[Tuple[str, int, str, str, str]]) -> int:
+    """
+    Queue reminders in the outbox in one transaction, skipping ones already queued.
+
+    Args:
+        reminders: (patron_id, loan_id, kind, remind_on, message) tuples
+
+    Returns:
+        int: number of reminders newly queued
+    """
+    created_at = datetime.now().isoformat()
+    with write_connection() as conn:
+        before = conn.total_changes
+        conn.executemany('''
+            INSERT OR IGNORE INTO reminder_outbox (patron_id, loan_id, kind, remind_on, message, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [reminder + (created_at,) for reminder in reminders])
         conn.commit()
-        conn.close()
+        return conn.total_changes - before
+
+def get_pending_reminders(after_id: int = 0, limit: int = 100) -> List[Dict]:
+    """Get up to limit unsent reminders with an id above after_id, oldest first."""
+    with read_connection() as conn:
+        rows = conn.execute('''
+            SELECT id, patron_id, loan_id, kind, remind_on, message FROM reminder_outbox
+            WHERE sent_at IS NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def mark_reminders_sent(reminder_ids: List[int], sent_at: datetime) -> bool:
+    """Mark outbox reminders as delivered."""
+    try:
+        with write_connection() as conn:
+            conn.executemany('UPDATE reminder_outbox SET sent_at = ? WHERE id = ?',
+                             [(sent_at.isoformat(), reminder_id) for reminder_id in reminder_ids])
+            conn.commit()
         return True
     except Exception as e:
-        conn.close()
         return False
 
-def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
-    """Update the return date for a borrow record."""
-    conn = get_db_connection()
-    try:
-        conn.execute('''
-            UPDATE borrow_records 
-            SET return_date = ? 
-            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
+def popularity_periods(when: datetime) -> List[str]:
+    """
+    Keys of the popularity periods a borrow at `when` counts towards: the
+    calendar week (starting Monday), the calendar month and all time.
+    """
+    week_start = (when - timedelta(days=when.weekday())).date()
+    return [f'week:{week_start.isoformat()}', f'month:{when:%Y-%m}', 'all']
+
+def bump_book_popularity(conn: sqlite3.Connection, book_id: int, borrow_date: datetime) -> None:
+    """Count one borrow of a book in each of its popularity periods (inside the caller's transaction)."""
+    conn.executemany('''
+        INSERT INTO book_popularity (period, book_id, borrow_count) VALUES (?, ?, 1)
+        ON CONFLICT (period, book_id) DO UPDATE SET borrow_count = borrow_count + 1
+    ''', [(period, book_id) for period in popularity_periods(borrow_date)])
+
+def get_top_books(period: str, limit: int = 10) -> List[Dict]:
+    """
+    Get the most borrowed books of a popularity period, most borrowed first.
+
+    Reads the first `limit` entries of idx_book_popularity_rank, so the cost
+    does not depend on how many loans or books there are.
+    """
+    with read_connection() as conn:
+        rows = conn.execute('''
+            SELECT p.book_id, b.title, b.author, p.borrow_count
+            FROM book_popularity p
+            JOIN books b ON p.book_id = b.id
+            WHERE p.period = ?
+            ORDER BY p.borrow_count DESC, p.book_id
+            LIMIT ?
+        ''', (period, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def rebuild_book_popularity() -> int:
+    """
+    Recompute book_popularity from the full borrow history (live and
+    archived) in one streaming pass, e.g. for databases created before the
+    counters existed.
+
+    Returns:
+        int: number of counter rows written
+    """
+    counts = _tally_book_popularity(iter_borrow_records())
+    with write_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        _write_book_popularity(conn, counts)
         conn.commit()
+    return len(counts)
+
+def _tally_book_popularity(records) -> Dict[Tuple[str, int], int]:
+    """Count borrows per (period, book_id) from rows with book_id and borrow_date."""
+    counts: Dict[Tuple[str, int], int] = {}
+    for record in records:
+        for period in popularity_periods(datetime.fromisoformat(record['borrow_date'])):
+            key = (period, record['book_id'])
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+def _write_book_popularity(conn: sqlite3.Connection, counts: Dict[Tuple[str, int], int]) -> None:
+    """Replace book_popularity with counts (inside the caller's transaction)."""
+    conn.execute('DELETE FROM book_popularity')
+    conn.executemany('''
+        INSERT INTO book_popularity (period, book_id, borrow_count) VALUES (?, ?, ?)
+    ''', [(period, book_id, count) for (period, book_id), count in counts.items()])
+
+def _count_copies_out(book_ids: Optional[List[int]] = None,
+                      catalog_conn: Optional[sqlite3.Connection] = None) -> Dict[int, int]:
+    """
+    Count the copies that are not on the shelf per book: open loans on every
+    shard plus copies kept for ready holds.
+
+    Args:
+        book_ids: Only count these books (None for all books)
+        catalog_conn: Connection to count on when everything lives in one file
+    """
+    book_filter = ''
+    params: Tuple = ()
+    if book_ids is not None:
+        book_filter = f"AND book_id IN ({', '.join('?' * len(book_ids))})"
+        params = tuple(book_ids)
+
+    def count(conn, sql):
+        return [(row[0], row[1]) for row in conn.execute(sql, params)]
+
+    loans_sql = f'''
+        SELECT book_id, COUNT(*) FROM borrow_records
+        WHERE return_date IS NULL {book_filter} GROUP BY book_id
+    '''
+    holds_sql = f'''
+        SELECT book_id, COUNT(*) FROM holds
+        WHERE status = 'ready' {book_filter} GROUP BY book_id
+    '''
+
+    if catalog_conn is not None and SHARD_COUNT == 1:
+        per_source = [count(catalog_conn, loans_sql), count(catalog_conn, holds_sql)]
+    else:
+        per_source = scatter_gather(lambda conn: count(conn, loans_sql))
+        if catalog_conn is not None:
+            per_source.append(count(catalog_conn, holds_sql))
+        else:
+            with read_connection() as conn:
+                per_source.append(count(conn, holds_sql))
+
+    copies_out: Dict[int, int] = {}
+    for rows in per_source:
+        for book_id, out in rows:
+            copies_out[book_id] = copies_out.get(book_id, 0) + out
+    return copies_out
+
+def _expected_available(total_copies: int, copies_out: int) -> int:
+    """Copies that should be on the shelf, kept between 0 and total_copies."""
+    return max(0, min(total_copies, total_copies - copies_out))
+
+def reconcile_book_availability(batch_size: int = 500) -> int:
+    """
+    Audit available_copies of every book against the open loans and ready
+    holds and repair the books that drifted.
+
+    The audit is one GROUP BY per shard plus one pass over books, all on
+    read-only connections, so borrows are not blocked. Drifted books are
+    then re-counted and repaired batch_size at a time, each batch in a short
+    write transaction on the catalog so no borrow or return can change a
+    book between its count and its repair.
+
+    Returns:
+        int: number of books whose available_copies was corrected
+    """
+    copies_out = _count_copies_out()
+    drifted = [book['id'] for book in _iter_query('SELECT id, total_copies, available_copies FROM books')
+               if book['available_copies'] != _expected_available(book['total_copies'],
+                                                                  copies_out.get(book['id'], 0))]
+
+    corrected = 0
+    for start in range(0, len(drifted), batch_size):
+        batch = drifted[start:start + batch_size]
+        with write_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                batch_out = _count_copies_out(batch, conn)
+                placeholders = ', '.join('?' * len(batch))
+                books = conn.execute(f'''
+                    SELECT id, total_copies, available_copies FROM books WHERE id IN ({placeholders})
+                ''', tuple(batch)).fetchall()
+                repairs = []
+                for book in books:
+                    expected = _expected_available(book['total_copies'], batch_out.get(book['id'], 0))
+                    if expected != book['available_copies']:
+                        repairs.append((expected, book['id']))
+                conn.executemany('UPDATE books SET available_copies = ? WHERE id = ?', repairs)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        corrected += len(repairs)
+    return corrected
+
+# Online backup
+
+def copy_database_file(source: str, target: str, pages: int = -1, pause: float = 0.0) -> int:
+    """
+    Copy a database file with SQLite's online backup API while it is in use.
+
+    The source is read inside one read transaction, so the copy is the
+    snapshot taken when the copy started: commits made meanwhile (which WAL
+    mode does not block) neither tear it nor restart it.
+
+    Args:
+        source: Database file to copy
+        target: File to copy it into (created, or overwritten page by page)
+        pages: Pages copied per step (-1 copies everything in one step)
+        pause: Seconds to sleep between steps
+
+    Returns:
+        int: number of pages copied
+    """
+    source_conn = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+    target_conn = sqlite3.connect(target)
+    copied = 0
+
+    def between_steps(status: int, remaining: int, total: int) -> None:
+        nonlocal copied
+        copied = total - remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source_conn.execute('BEGIN')
+        source_conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source_conn.backup(target_conn, pages=pages, progress=between_steps)
+        source_conn.rollback()
+        return copied
+    finally:
+        source_conn.close()
+        target_conn.close()
+
+def check_database_file(path: str) -> List[str]:
+    """Run PRAGMA integrity_check on a database file; a sound file gives ['ok']."""
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            return [row[0] for row in conn.execute('PRAGMA integrity_check')]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+
+def set_journal_mode(path: str, mode: str) -> str:
+    """Set the journal mode of a database file (e.g. DELETE for a self-contained copy)."""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f'PRAGMA journal_mode = {mode}').fetchone()[0]
+    finally:
         conn.close()
-        return True
-    except Exception as e:
-        conn.close()
+
+# Maintenance (each helper works on the main schema of a pooled write connection)
+
+def maintenance_connections() -> List[Tuple[str, Callable]]:
+    """Every database file with a function borrowing a write connection to it."""
+    files = [(DATABASE, write_connection)]
+    if SHARD_COUNT > 1:
+        files += [(shard_path(shard), lambda shard=shard: shard_write_connection(shard))
+                  for shard in range(SHARD_COUNT)]
+    return files
+
+def get_file_stats(conn: sqlite3.Connection, path: str) -> Dict:
+    """Size of a database file and its WAL, with its page and freelist counts."""
+    wal = path + '-wal'
+    return {
+        'file_bytes': os.path.getsize(path),
+        'wal_bytes': os.path.getsize(wal) if os.path.exists(wal) else 0,
+        'page_size': conn.execute('PRAGMA main.page_size').fetchone()[0],
+        'page_count': conn.execute('PRAGMA main.page_count').fetchone()[0],
+        'freelist_pages': conn.execute('PRAGMA main.freelist_count').fetchone()[0],
+        'auto_vacuum': conn.execute('PRAGMA main.auto_vacuum').fetchone()[0],
+    }
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Convert a file created without auto_vacuum=INCREMENTAL with a one-off
+    VACUUM, which rewrites the whole file.
+
+    Returns:
+        bool: True if the file was converted, False if it already was incremental
+    """
+    if conn.execute('PRAGMA main.auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
         return False
+    conn.execute('PRAGMA main.auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM main')
+    return True
+
+def optimize_statistics(conn: sqlite3.Connection, analyze: bool = False) -> str:
+    """
+    Refresh the query planner's statistics.
+
+    A file that has never been analyzed (or analyze=True) gets a full ANALYZE;
+    otherwise PRAGMA optimize re-analyzes only the tables that need it.
+
+    Returns:
+        str: 'analyze' or 'optimize'
+    """
+    has_stats = conn.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone()
+    if analyze or has_stats is None:
+        conn.execute('ANALYZE main')
+        return 'analyze'
+    conn.execute('PRAGMA main.optimize')
+    return 'optimize'
+
+def incremental_vacuum(conn: sqlite3.Connection, step_pages: int, max_pages: Optional[int] = None) -> int:
+    """
+    Hand free pages back to the file system, step_pages per transaction.
+
+    Only files with auto_vacuum=INCREMENTAL (see init_database) shrink.
+
+    Returns:
+        int: number of pages freed
+    """
+    freed = 0
+    while max_pages is None or freed < max_pages:
+        before = conn.execute('PRAGMA main.freelist_count').fetchone()[0]
+        if before == 0:
+            break
+        pages = step_pages if max_pages is None else min(step_pages, max_pages - freed)
+        conn.execute(f'PRAGMA main.incremental_vacuum({int(pages)})').fetchall()
+        after = conn.execute('PRAGMA main.freelist_count').fetchone()[0]
+        if after >= before:
+            break
+        freed += before - after
+    return freed
+
+def checkpoint_wal(conn: sqlite3.Connection, mode: str = 'PASSIVE') -> Dict:
+    """
+    Copy the WAL back into the database file (TRUNCATE also empties the WAL file).
 
+    Returns:
+        dict: busy (1 if readers or writers kept it from finishing), wal_frames, checkpointed_frames
+    """
+    busy, wal_frames, checkpointed = conn.execute(f'PRAGMA main.wal_checkpoint({mode})').fetchone()
+    return {'busy': busy, 'wal_frames': wal_frames, 'checkpointed_frames': checkpointed}
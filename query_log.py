@@ -0,0 +1,228 @@
+"""
+Query Log Module - Opt-in slow-query log for SQLite statements
+
+Once a threshold is set, database.py opens its connections as TimedConnection,
+whose cursors time every statement from execute() until its rows have been
+read. Statements slower than the threshold are written as one JSON line to
+the "library.slow_query" logger together with their EXPLAIN QUERY PLAN
+(full table scans flagged) and kept for the metrics endpoint. Parameter
+values are never recorded, only their shape.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+SLOW_QUERY_HISTORY = 100  # most recent slow statements kept for the metrics endpoint
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+logger = logging.getLogger("library.slow_query")
+
+_threshold: Optional[float] = None  # seconds; None keeps the log off
+_recent: Deque[Dict] = deque(maxlen=SLOW_QUERY_HISTORY)
+_counts = {"statements": 0, "slow_statements": 0, "full_scan_statements": 0}
+_lock = threading.Lock()
+
+
+def set_threshold(threshold_ms: Optional[float]) -> None:
+    """Log statements slower than threshold_ms (0 logs every statement), or turn the log off with None."""
+    global _threshold
+    _threshold = None if threshold_ms is None else threshold_ms / 1000
+
+
+def connection_class() -> type:
+    """The sqlite3 connection factory database.py should open connections with."""
+    return sqlite3.Connection if _threshold is None else TimedConnection
+
+
+def clear() -> None:
+    """Forget the recorded slow statements and counters."""
+    with _lock:
+        _recent.clear()
+        for key in _counts:
+            _counts[key] = 0
+
+
+def get_slow_query_stats() -> Dict:
+    """
+    Slow-query metrics.
+
+    Returns:
+        dict: threshold_ms (None when off), statements timed, slow_statements,
+        full_scan_statements and the most recent slow statements, newest first
+    """
+    with _lock:
+        return {
+            "threshold_ms": None if _threshold is None else _threshold * 1000,
+            **_counts,
+            "recent": list(reversed(_recent)),
+        }
+
+
+def parameters_shape(parameters, many: bool = False) -> str:
+    """Describe bound parameters without their values, e.g. "positional(3)" or "named(book_id, patron_id)"."""
+    if many:
+        parameters = list(parameters)
+        inner = parameters_shape(parameters[0]) if parameters else "none"
+        return f"many({len(parameters)}) x {inner}"
+    if not parameters:
+        return "none"
+    if isinstance(parameters, dict):
+        return f"named({', '.join(sorted(parameters))})"
+    return f"positional({len(parameters)})"
+
+
+def full_table_scans(plan: List[str]) -> List[str]:
+    """Tables a query plan reads from start to end without an index."""
+    scans = []
+    for detail in plan:
+        words = detail.split()
+        if len(words) >= 2 and words[0] == "SCAN" and "USING" not in words and words[1] != "CONSTANT":
+            scans.append(words[1])
+    return scans
+
+
+def _explain(conn: sqlite3.Connection, sql: str, parameters) -> List[str]:
+    """EXPLAIN QUERY PLAN details of a statement, on a plain (untimed) cursor."""
+    if not EXPLAINABLE.match(sql):
+        return []
+    try:
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters or ()).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[3] for row in rows]
+
+
+def _record(conn: sqlite3.Connection, sql: str, parameters, shape: str, rows: int, elapsed: float) -> None:
+    threshold = _threshold
+    slow = threshold is not None and elapsed >= threshold
+    with _lock:
+        _counts["statements"] += 1
+    if not slow:
+        return
+
+    plan = _explain(conn, sql, parameters)
+    entry = {
+        "event": "slow_query",
+        "sql": " ".join(sql.split()),
+        "parameters": shape,
+        "rows": rows,
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "plan": plan,
+        "full_scans": full_table_scans(plan),
+    }
+    with _lock:
+        _counts["slow_statements"] += 1
+        if entry["full_scans"]:
+            _counts["full_scan_statements"] += 1
+        _recent.append(entry)
+    logger.warning(json.dumps(entry))
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement, including the time spent reading its rows.
+
+    A statement is finished when its rows run out, the cursor runs another
+    statement or is closed, or (for rows that are never all read) when the
+    cursor is released.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__(connection)
+        self._statement = None  # [sql, parameters, shape, rows read, seconds so far]
+
+    def _timed(self, call, *args):
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            if self._statement is not None:
+                self._statement[4] += time.perf_counter() - start
+
+    def _finish(self) -> None:
+        statement, self._statement = self._statement, None
+        if statement is not None:
+            sql, parameters, shape, rows, elapsed = statement
+            if self.description is None:
+                rows = max(self.rowcount, 0)
+            _record(self.connection, sql, parameters, shape, rows, elapsed)
+
+    def _read(self, rows: int) -> None:
+        if self._statement is not None:
+            self._statement[3] += rows
+
+    def execute(self, sql: str, parameters=()):
+        self._finish()
+        self._statement = [sql, parameters, parameters_shape(parameters), 0, 0.0]
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        self._finish()
+        seq_of_parameters = list(seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        self._statement = [sql, first, parameters_shape(seq_of_parameters, many=True), 0, 0.0]
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._read(1)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._read(len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._read(len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        self._read(1)
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those made by execute(), are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
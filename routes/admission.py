@@ -0,0 +1,132 @@
+"""
+Admission control for the write endpoints
+
+Each blueprint gets its own AdmissionController: a fixed number of write
+requests run at once, a few more may wait briefly for a slot, and the rest
+are turned away at once with 503 and Retry-After. Requests therefore queue
+for the SQLite write lock in front of the worker, not inside it, and reads
+such as /catalog keep their threads.
+"""
+
+import functools
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import Flask, current_app, jsonify, request
+from werkzeug.exceptions import ServiceUnavailable
+
+# Per-blueprint limits (override or disable with the ADMISSION app setting)
+DEFAULT_ADMISSION_LIMITS = {
+    'borrowing': {'max_in_flight': 4, 'max_queue': 16, 'queue_timeout': 0.5},
+    'catalog': {'max_in_flight': 2, 'max_queue': 4, 'queue_timeout': 0.5},
+    'api': {'max_in_flight': 4, 'max_queue': 16, 'queue_timeout': 0.5},
+}
+RETRY_AFTER_SECONDS = 1
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class AdmissionController:
+    """At most max_in_flight requests at once, with up to max_queue more waiting up to queue_timeout seconds."""
+
+    def __init__(self, max_in_flight: int, max_queue: int = 0, queue_timeout: float = 0.0):
+        if max_in_flight <= 0 or max_queue < 0 or queue_timeout < 0:
+            raise ValueError('max_in_flight must be positive, max_queue and queue_timeout non-negative')
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._slot_freed = threading.Condition()
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if there is room; False if the request should be turned away."""
+        with self._slot_freed:
+            if self.in_flight >= self.max_in_flight:
+                if self.waiting >= self.max_queue:
+                    self.rejected_queue_full += 1
+                    return False
+                self.waiting += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.in_flight >= self.max_in_flight:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected_timeout += 1
+                            return False
+                        self._slot_freed.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self) -> None:
+        """Give a slot back to the next waiting request."""
+        with self._slot_freed:
+            self.in_flight -= 1
+            self._slot_freed.notify()
+
+    def stats(self) -> Dict:
+        """Limits, current in-flight and queue depth, and admission/rejection counts."""
+        with self._slot_freed:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+            }
+
+
+def init_admission(app: Flask) -> Dict[str, AdmissionController]:
+    """
+    Create the controllers for an app from DEFAULT_ADMISSION_LIMITS and app.config['ADMISSION'].
+
+    ADMISSION maps a blueprint name to the limits to change, or to None to
+    turn admission control off for that blueprint.
+    """
+    limits = {name: dict(settings) for name, settings in DEFAULT_ADMISSION_LIMITS.items()}
+    for name, settings in (app.config.get('ADMISSION') or {}).items():
+        if settings is None:
+            limits.pop(name, None)
+        else:
+            limits[name] = {**limits.get(name, {}), **settings}
+
+    controllers = {name: AdmissionController(**settings) for name, settings in limits.items()}
+    app.extensions['admission'] = controllers
+    return controllers
+
+
+def get_admission_stats() -> Dict[str, Dict]:
+    """Stats of the current app's controllers, by blueprint."""
+    controllers = current_app.extensions.get('admission', {})
+    return {name: controller.stats() for name, controller in controllers.items()}
+
+
+def _overloaded():
+    message = 'The server is busy with other updates, please try again shortly.'
+    if request.blueprint == 'api':
+        return jsonify({'error': message}), 503, {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    raise ServiceUnavailable(message, retry_after=RETRY_AFTER_SECONDS)
+
+
+def write_admission(view):
+    """Put a write view's POSTs behind its blueprint's admission controller."""
+    @functools.wraps(view)
+    def admitted_view(*args, **kwargs):
+        controller: Optional[AdmissionController] = current_app.extensions.get('admission', {}).get(request.blueprint)
+        if controller is None or request.method in SAFE_METHODS:
+            return view(*args, **kwargs)
+        if not controller.acquire():
+            return _overloaded()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            controller.release()
+    return admitted_view
@@ -1,20 +1,270 @@
 """
 API Routes - JSON API endpoints
+
+Each endpoint's work is a plain *_response function returning (payload,
+status), shared with the async variant of this API in async_api_routes.
 """
 
+import sqlite3
+from typing import Dict, Mapping, Tuple
+
 from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+from query_log import get_slow_query_stats
+from services.backup_service import backup_database
+from services.maintenance_service import get_last_maintenance_report
+from services.library_service import (
+    MAX_BULK_FEE_LOOKUPS, POPULAR_PERIODS, borrow_books_by_patron, calculate_late_fee_for_book,
+    calculate_late_fees_bulk, calculate_late_fees_for_patrons, get_hold_status, get_patron_history_page,
+    get_patron_status, get_popular_books, return_books_by_patron, search_books_in_catalog
+)
+from services.overdue_service import DUE_SOON_DAYS, MAX_DUE_SOON_DAYS, REPORT_KINDS, get_due_report
+from routes.admission import get_admission_stats, write_admission
+from routes.pagination import decode_cursor, encode_cursor, parse_limit_offset
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+Response = Tuple[Dict, int]
+
+
+def _is_patron_id(value) -> bool:
+    return isinstance(value, str) and value.isdigit() and len(value) == 6
+
+
+def late_fee_response(patron_id: str, book_id: int) -> Response:
+    """Late fee for one loan."""
+    result = calculate_late_fee_for_book(patron_id, book_id)
+    return result, 501 if 'not implemented' in result.get('status', '') else 200
+
+
+def bulk_late_fees_response(data) -> Response:
+    """Late fees for the pairs or patrons in a JSON body."""
+    if not isinstance(data, dict) or ('items' in data) == ('patrons' in data):
+        return {'error': 'Send a JSON object with either "items" or "patrons"'}, 400
+
+    entries = data.get('items', data.get('patrons'))
+    if not isinstance(entries, list) or not entries:
+        return {'error': 'items/patrons must be a non-empty list'}, 400
+    if len(entries) > MAX_BULK_FEE_LOOKUPS:
+        return {'error': f'At most {MAX_BULK_FEE_LOOKUPS} lookups per request'}, 400
+
+    if 'patrons' in data:
+        if not all(_is_patron_id(patron_id) for patron_id in entries):
+            return {'error': 'Patron IDs must be exactly 6 digits'}, 400
+        patrons = calculate_late_fees_for_patrons(entries)
+        return {'patrons': patrons, 'count': len(patrons)}, 200
+
+    pairs = []
+    for item in entries:
+        if (not isinstance(item, dict) or not _is_patron_id(item.get('patron_id'))
+                or not isinstance(item.get('book_id'), int) or isinstance(item.get('book_id'), bool)):
+            return {'error': 'Each item needs a 6-digit patron_id and an integer book_id'}, 400
+        pairs.append((item['patron_id'], item['book_id']))
+
+    results = calculate_late_fees_bulk(pairs)
+    return {'results': results, 'count': len(results)}, 200
+
+
+def _batch_response(data, process) -> Response:
+    """Run a checkout/return batch from a {"patron_id", "book_ids"} JSON body."""
+    if not isinstance(data, dict) or not isinstance(data.get('patron_id'), str):
+        return {'error': 'Send a JSON object with "patron_id" and "book_ids"'}, 400
+    book_ids = data.get('book_ids')
+    if (not isinstance(book_ids, list)
+            or not all(isinstance(book_id, int) and not isinstance(book_id, bool) for book_id in book_ids)):
+        return {'error': 'book_ids must be a list of integers'}, 400
+
+    success, message, results = process(data['patron_id'], book_ids)
+    if not results:
+        return {'error': message}, 400
+    return {'success': success, 'message': message, 'results': results}, 200
+
+
+def checkout_response(data) -> Response:
+    """Borrow the books in a JSON body for one patron."""
+    return _batch_response(data, borrow_books_by_patron)
+
+
+def return_response(data) -> Response:
+    """Return the books in a JSON body for one patron."""
+    return _batch_response(data, return_books_by_patron)
+
+
+def search_response(args: Mapping) -> Response:
+    """One page of catalog search results for the q/type/fuzzy/limit/offset parameters."""
+    search_term = args.get('q', '').strip()
+    search_type = args.get('type', 'title')
+    fuzzy = args.get('fuzzy', '').lower() in ('1', 'true', 'on', 'yes')
+
+    if not search_term:
+        return {'error': 'Search term is required'}, 400
+
+    try:
+        limit, offset = parse_limit_offset(args)
+    except ValueError:
+        return {'error': 'limit and offset must be non-negative integers'}, 400
+
+    # Use business logic function; one extra row tells us whether another page exists
+    books = search_books_in_catalog(search_term, search_type, fuzzy=fuzzy, limit=limit + 1, offset=offset)
+    has_more = len(books) > limit
+    books = books[:limit]
+
+    return {
+        'search_term': search_term,
+        'search_type': search_type,
+        'fuzzy': fuzzy,
+        'results': books,
+        'count': len(books),
+        'limit': limit,
+        'offset': offset,
+        'next_offset': offset + limit if has_more else None
+    }, 200
+
+
+def overdue_response(args: Mapping) -> Response:
+    """One page of the overdue or due-soon report for the report/days/limit/cursor parameters."""
+    kind = args.get('report', 'overdue')
+    if kind not in REPORT_KINDS:
+        return {'error': f"report must be one of: {', '.join(REPORT_KINDS)}"}, 400
+
+    try:
+        limit, _ = parse_limit_offset(args)
+        days = int(args.get('days', DUE_SOON_DAYS))
+        if not 0 <= days <= MAX_DUE_SOON_DAYS:
+            raise ValueError(f'days must be between 0 and {MAX_DUE_SOON_DAYS}')
+        after = decode_cursor(args.get('cursor'))
+        if after is not None and (len(after) != 3 or not isinstance(after[0], str)
+                                  or not isinstance(after[1], str) or not isinstance(after[2], int)):
+            raise ValueError('invalid cursor')
+    except ValueError:
+        return {'error': f'limit, days (0-{MAX_DUE_SOON_DAYS}) and cursor must be valid'}, 400
+
+    page = get_due_report(kind, due_within_days=days, limit=limit, after=after)
+
+    return {
+        'report': kind,
+        'loans': page['loans'],
+        'count': len(page['loans']),
+        'limit': limit,
+        'next_cursor': encode_cursor(page['next_cursor'])
+    }, 200
+
+
+def hold_status_response(patron_id: str, book_id: int) -> Response:
+    """A patron's place on a book's waiting list."""
+    return get_hold_status(patron_id, book_id), 200
+
+
+def popular_response(args: Mapping) -> Response:
+    """Most borrowed books for the period/limit parameters."""
+    period = args.get('period', 'week')
+    if period not in POPULAR_PERIODS:
+        return {'error': f"period must be one of: {', '.join(POPULAR_PERIODS)}"}, 400
+
+    try:
+        limit, _ = parse_limit_offset(args, default_limit=10)
+    except ValueError:
+        return {'error': 'limit must be a positive integer'}, 400
+
+    books = get_popular_books(period, limit)
+    return {'period': period, 'results': books, 'count': len(books)}, 200
+
+
+def _history_page(patron_id: str, args: Mapping) -> Dict:
+    """
+    One page of a patron's history for the limit/cursor parameters.
+
+    Raises:
+        ValueError: if limit or cursor is invalid
+    """
+    limit, _ = parse_limit_offset(args)
+    before = decode_cursor(args.get('cursor'))
+    if before is not None and (len(before) != 2 or not isinstance(before[0], str)
+                               or not isinstance(before[1], int)):
+        raise ValueError('invalid cursor')
+    page = get_patron_history_page(patron_id, limit, before)
+    return {'records': page['records'], 'count': len(page['records']), 'limit': limit,
+            'next_cursor': encode_cursor(page['next_cursor'])}
+
+
+def patron_status_response(patron_id: str, args: Mapping) -> Response:
+    """A patron's current loans and fee totals, with the first page of their history."""
+    if not _is_patron_id(patron_id):
+        return {'error': 'Invalid patron ID. Must be exactly 6 digits.'}, 400
+    try:
+        history = _history_page(patron_id, args)
+    except ValueError:
+        return {'error': 'limit and cursor must be valid'}, 400
+    return {**get_patron_status(patron_id), 'history': history}, 200
+
+
+def patron_history_response(patron_id: str, args: Mapping) -> Response:
+    """One page of a patron's borrowing history, newest first."""
+    if not _is_patron_id(patron_id):
+        return {'error': 'Invalid patron ID. Must be exactly 6 digits.'}, 400
+    try:
+        return {'patron_id': patron_id, **_history_page(patron_id, args)}, 200
+    except ValueError:
+        return {'error': 'limit and cursor must be valid'}, 400
+
+
+def metrics_response() -> Response:
+    """Operational metrics of this process."""
+    return {
+        'slow_queries': get_slow_query_stats(),
+        'maintenance': get_last_maintenance_report(),
+        'admission': get_admission_stats(),
+    }, 200
+
+
+def backup_response() -> Response:
+    """Take an online backup into the backup directory, unless one is already running."""
+    try:
+        report = backup_database(blocking=False)
+    except (RuntimeError, sqlite3.Error, OSError) as e:
+        return {'error': f'Backup failed: {e}'}, 500
+    if report is None:
+        return {'error': 'A backup is already running.'}, 409
+    return report, 201
+
+
 @api_bp.route('/late_fee/<patron_id>/<int:book_id>')
 def get_late_fee(patron_id, book_id):
     """
     Calculate late fee for a specific book borrowed by a patron.
     API endpoint for R4: Late Fee Calculation
     """
-    result = calculate_late_fee_for_book(patron_id, book_id)
-    return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
+    payload, status = late_fee_response(patron_id, book_id)
+    return jsonify(payload), status
+
+@api_bp.route('/late_fees', methods=['POST'])
+def bulk_late_fees_api():
+    """
+    Calculate late fees for many loans in one request.
+    JSON body: {"items": [{"patron_id": "123456", "book_id": 1}, ...]}
+    or {"patrons": ["123456", ...]} for every current loan of those patrons.
+    """
+    payload, status = bulk_late_fees_response(request.get_json(silent=True))
+    return jsonify(payload), status
+
+@api_bp.route('/checkout', methods=['POST'])
+@write_admission
+def checkout_api():
+    """
+    Check out several books for a patron in one request.
+    JSON body: {"patron_id": "123456", "book_ids": [1, 2, 3]}
+    """
+    payload, status = checkout_response(request.get_json(silent=True))
+    return jsonify(payload), status
+
+@api_bp.route('/return', methods=['POST'])
+@write_admission
+def return_api():
+    """
+    Return several books for a patron in one request.
+    JSON body: {"patron_id": "123456", "book_ids": [1, 2, 3]}
+    """
+    payload, status = return_response(request.get_json(silent=True))
+    return jsonify(payload), status
 
 @api_bp.route('/search')
 def search_books_api():
@@ -22,18 +272,71 @@ def search_books_api():
     Search for books via API endpoint.
     Alternative API interface for R5: Book Search Functionality
     """
-    search_term = request.args.get('q', '').strip()
-    search_type = request.args.get('type', 'title')
-    
-    if not search_term:
-        return jsonify({'error': 'Search term is required'}), 400
-    
-    # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
-    
-    return jsonify({
-        'search_term': search_term,
-        'search_type': search_type,
-        'results': books,
-        'count': len(books)
-    })
+    payload, status = search_response(request.args)
+    return jsonify(payload), status
+
+@api_bp.route('/overdue')
+def overdue_report_api():
+    """
+    Page through overdue (or due-soon) loans across all patrons.
+    Query parameters: report=overdue|due_soon, days, limit, cursor.
+    """
+    payload, status = overdue_response(request.args)
+    return jsonify(payload), status
+
+@api_bp.route('/holds/<patron_id>/<int:book_id>')
+def hold_status_api(patron_id, book_id):
+    """
+    Get a patron's place on a book's waiting list.
+    """
+    payload, status = hold_status_response(patron_id, book_id)
+    return jsonify(payload), status
+
+@api_bp.route('/popular')
+def popular_books_api():
+    """
+    Most borrowed books of the current week, the current month or all time.
+    Query parameters: period=week|month|all, limit.
+    """
+    payload, status = popular_response(request.args)
+    return jsonify(payload), status
+
+@api_bp.route('/patron/<patron_id>/status')
+def patron_status_api(patron_id):
+    """
+    Patron status (R7): current loans with their fees, the fee total and the
+    first page of the borrowing history (newest first).
+    Query parameters: limit, cursor (next_cursor of the history to continue
+    with /api/patron/<patron_id>/history).
+    """
+    payload, status = patron_status_response(patron_id, request.args)
+    return jsonify(payload), status
+
+@api_bp.route('/patron/<patron_id>/history')
+def patron_history_api(patron_id):
+    """
+    Page through a patron's borrowing history, newest first.
+    Query parameters: limit, cursor.
+    """
+    payload, status = patron_history_response(patron_id, request.args)
+    return jsonify(payload), status
+
+@api_bp.route('/metrics')
+def metrics_api():
+    """
+    Operational metrics of this worker process (slow statements and their
+    plans, the last maintenance run, write admission queues and rejections).
+    """
+    payload, status = metrics_response()
+    return jsonify(payload), status
+
+@api_bp.route('/backup', methods=['POST'])
+@write_admission
+def backup_api():
+    """
+    Take an online backup of the database while it keeps serving requests.
+    Backups are written to the server's backup directory; restore them with
+    `python cli.py restore <path>`. Answers 409 while another backup runs.
+    """
+    payload, status = backup_response()
+    return jsonify(payload), status
@@ -0,0 +1,142 @@
+"""
+Async API Routes - JSON API endpoints with bounded database concurrency
+
+Mirrors the /api endpoints under /api/async with `async def` views. Database
+work runs on a small bounded executor so a burst of clients queues for a
+fixed number of SQLite connections instead of opening one per request, and
+payment gateway calls wait on their own executor so slow network round
+trips never hold a database slot.
+
+Flask is a WSGI framework: each of these views still occupies one server
+worker thread while it runs, so they do not let a worker hold more open
+connections than its thread count.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, jsonify, request
+from services import library_service
+from services.library_service import charge_late_fee_payment, prepare_late_fee_payment, record_late_fee_payment
+from routes.api_routes import (
+    bulk_late_fees_response, hold_status_response, late_fee_response, overdue_response,
+    patron_history_response, patron_status_response, popular_response, search_response
+)
+
+async_api_bp = Blueprint('async_api', __name__, url_prefix='/api/async')
+
+DB_EXECUTOR_WORKERS = 8
+GATEWAY_EXECUTOR_WORKERS = 32
+
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='api-db')
+gateway_executor = ThreadPoolExecutor(max_workers=GATEWAY_EXECUTOR_WORKERS, thread_name_prefix='api-gateway')
+
+
+async def run_db(func, *args):
+    """
+    Run a blocking database call on the bounded database executor.
+
+    Args:
+        func: Callable doing the database work
+        *args: Arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    return await asyncio.get_running_loop().run_in_executor(db_executor, func, *args)
+
+
+async def run_gateway(func, *args):
+    """
+    Run a blocking payment gateway call on the gateway executor.
+
+    Args:
+        func: Callable making the gateway request
+        *args: Arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    return await asyncio.get_running_loop().run_in_executor(gateway_executor, func, *args)
+
+
+@async_api_bp.route('/late_fee/<patron_id>/<int:book_id>')
+async def get_late_fee(patron_id, book_id):
+    """
+    Calculate late fee for a specific book borrowed by a patron.
+    """
+    payload, status = await run_db(late_fee_response, patron_id, book_id)
+    return jsonify(payload), status
+
+@async_api_bp.route('/late_fees', methods=['POST'])
+async def bulk_late_fees_api():
+    """
+    Calculate late fees for many loans in one request (same body as /api/late_fees).
+    """
+    payload, status = await run_db(bulk_late_fees_response, request.get_json(silent=True))
+    return jsonify(payload), status
+
+@async_api_bp.route('/late_fee/<patron_id>/<int:book_id>/pay', methods=['POST'])
+async def pay_late_fee_api(patron_id, book_id):
+    """
+    Pay the late fee for one loan through the payment gateway.
+    """
+    payment, error = await run_db(prepare_late_fee_payment, patron_id, book_id)
+    if payment is None:
+        return jsonify({'success': False, 'message': error, 'transaction_id': None}), 400
+
+    # Only the gateway round trip waits on the gateway executor
+    gateway = library_service.PaymentGateway()
+    success, message, transaction_id = await run_gateway(charge_late_fee_payment, payment, gateway)
+    if success:
+        await run_db(record_late_fee_payment, patron_id, book_id, payment['amount'])
+    return jsonify({'success': success, 'message': message, 'transaction_id': transaction_id}), \
+        200 if success else 400
+
+@async_api_bp.route('/search')
+async def search_books_api():
+    """
+    Search for books (same parameters as /api/search).
+    """
+    payload, status = await run_db(search_response, request.args.copy())
+    return jsonify(payload), status
+
+@async_api_bp.route('/overdue')
+async def overdue_report_api():
+    """
+    Page through overdue (or due-soon) loans (same parameters as /api/overdue).
+    """
+    payload, status = await run_db(overdue_response, request.args.copy())
+    return jsonify(payload), status
+
+@async_api_bp.route('/holds/<patron_id>/<int:book_id>')
+async def hold_status_api(patron_id, book_id):
+    """
+    Get a patron's place on a book's waiting list.
+    """
+    payload, status = await run_db(hold_status_response, patron_id, book_id)
+    return jsonify(payload), status
+
+@async_api_bp.route('/popular')
+async def popular_books_api():
+    """
+    Most borrowed books (same parameters as /api/popular).
+    """
+    payload, status = await run_db(popular_response, request.args.copy())
+    return jsonify(payload), status
+
+@async_api_bp.route('/patron/<patron_id>/status')
+async def patron_status_api(patron_id):
+    """
+    Patron status with the first history page (same parameters as /api/patron/<patron_id>/status).
+    """
+    payload, status = await run_db(patron_status_response, patron_id, request.args.copy())
+    return jsonify(payload), status
+
+@async_api_bp.route('/patron/<patron_id>/history')
+async def patron_history_api(patron_id):
+    """
+    Page through a patron's borrowing history (same parameters as /api/patron/<patron_id>/history).
+    """
+    payload, status = await run_db(patron_history_response, patron_id, request.args.copy())
+    return jsonify(payload), status
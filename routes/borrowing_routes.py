@@ -3,11 +3,13 @@ Borrowing Routes - Book borrowing and returning endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from services.library_service import borrow_book_by_patron, return_book_by_patron
+from routes.admission import write_admission
+from services.library_service import borrow_book_by_patron, place_hold_for_patron, return_book_by_patron
 
 borrowing_bp = Blueprint('borrowing', __name__)
 
 @borrowing_bp.route('/borrow', methods=['POST'])
+@write_admission
 def borrow_book():
     """
     Process book borrowing request.
@@ -27,7 +29,27 @@ def borrow_book():
     flash(message, 'success' if success else 'error')
     return redirect(url_for('catalog.catalog'))
 
+@borrowing_bp.route('/hold', methods=['POST'])
+@write_admission
+def place_hold():
+    """
+    Join the waiting list of an unavailable book.
+    """
+    patron_id = request.form.get('patron_id', '').strip()
+    
+    try:
+        book_id = int(request.form.get('book_id', ''))
+    except (ValueError, TypeError):
+        flash('Invalid book ID.', 'error')
+        return redirect(url_for('catalog.catalog'))
+    
+    success, message = place_hold_for_patron(patron_id, book_id)
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('catalog.catalog'))
+
 @borrowing_bp.route('/return', methods=['GET', 'POST'])
+@write_admission
 def return_book():
     """
     Process book return.
@@ -3,8 +3,9 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
-from services.library_service import add_book_to_catalog
+from routes.admission import write_admission
+from services.catalog_snapshot import get_catalog_snapshot
+from services.library_service import POPULAR_PERIODS, add_book_to_catalog, get_popular_books
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -19,10 +20,12 @@ def catalog():
     Display all books in the catalog.
     Implements R2: Book Catalog Display
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    books = get_catalog_snapshot().books()
+    popular = {period: get_popular_books(period, limit=5) for period in POPULAR_PERIODS}
+    return render_template('catalog.html', books=books, popular=popular)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
+@write_admission
 def add_book():
     """
     Add a new book to the catalog.
@@ -0,0 +1,29 @@
+"""
+Export Routes - Streaming catalog and borrow history downloads
+"""
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services.export_service import EXPORT_COLUMNS, EXPORT_FORMATS, export_table, parse_date_range
+
+export_bp = Blueprint('export', __name__, url_prefix='/export')
+
+@export_bp.route('/<table>.<fmt>')
+def export(table, fmt):
+    """
+    Stream a whole table as JSON Lines or CSV.
+    Borrow records can be limited with ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive).
+    """
+    if table not in EXPORT_COLUMNS or fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unknown export'}), 404
+    
+    try:
+        start, end = parse_date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    
+    chunks = export_table(table, fmt, start, end)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={table}.{fmt}'}
+    )
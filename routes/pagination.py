@@ -0,0 +1,49 @@
+"""
+Pagination helpers shared by the route blueprints
+"""
+
+import base64
+import json
+from typing import Optional, Tuple
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
+def parse_limit_offset(args, default_limit: int = DEFAULT_PAGE_LIMIT) -> Tuple[int, int]:
+    """
+    Read limit/offset query parameters, clamping limit to MAX_PAGE_LIMIT.
+
+    Raises:
+        ValueError: if either parameter is not a non-negative integer (or limit is 0)
+    """
+    limit = int(args.get('limit', default_limit))
+    offset = int(args.get('offset', 0))
+    if limit <= 0 or offset < 0:
+        raise ValueError('limit must be positive and offset non-negative')
+    return min(limit, MAX_PAGE_LIMIT), offset
+
+
+def encode_cursor(key: Optional[Tuple]) -> Optional[str]:
+    """Turn a keyset position such as (due_date, patron_id, id) into an opaque URL-safe cursor."""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple]:
+    """
+    Turn a cursor from encode_cursor back into its keyset position.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('invalid cursor') from e
+    if not isinstance(key, list):
+        raise ValueError('invalid cursor')
+    return tuple(key)
@@ -4,6 +4,7 @@ Search Routes - Book search functionality
 
 from flask import Blueprint, render_template, request, flash
 from services.library_service import search_books_in_catalog
+from routes.pagination import parse_limit_offset
 
 search_bp = Blueprint('search', __name__)
 
@@ -15,14 +16,23 @@ def search_books():
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'on', 'yes')
     
     if not search_term:
-        return render_template('search.html', books=[], search_term='', search_type=search_type)
+        return render_template('search.html', books=[], search_term='', search_type=search_type, fuzzy=fuzzy)
     
-    # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    try:
+        limit, offset = parse_limit_offset(request.args)
+    except ValueError:
+        limit, offset = parse_limit_offset({})
+    
+    # Use business logic function; one extra row tells us whether another page exists
+    books = search_books_in_catalog(search_term, search_type, fuzzy=fuzzy, limit=limit + 1, offset=offset)
+    has_more = len(books) > limit
+    books = books[:limit]
     
     if not books:
         flash('Search functionality is not yet implemented.', 'error')
     
-    return render_template('search.html', books=books, search_term=search_term, search_type=search_type)
+    return render_template('search.html', books=books, search_term=search_term, search_type=search_type,
+                           fuzzy=fuzzy, limit=limit, offset=offset, has_more=has_more)
@@ -0,0 +1,48 @@
+"""
+Archive Service Module - Moves old returned loans out of borrow_records
+Active-loan queries only ever need unreturned records, so returned records
+past the retention window are moved to borrow_records_archive in small
+transactions. Patron history and exports read both tables.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import database
+from database import archive_returned_borrow_records
+
+ARCHIVE_AFTER_DAYS = 90  # returned loans older than this leave the hot table
+ARCHIVE_BATCH_SIZE = 500  # records moved per transaction
+
+
+def archive_returned_records(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                             max_batches: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """
+    Archive returned borrow records in batches.
+
+    Each batch is its own short transaction on one shard, so borrows and
+    returns can interleave with a long archival run.
+
+    Args:
+        older_than_days: Records returned more than this many days ago are archived
+        batch_size: Records moved per transaction
+        max_batches: Stop after this many batches per shard (None to archive everything eligible)
+        now: Reference time (defaults to the current time)
+
+    Returns:
+        int: total number of records archived
+    """
+    if older_than_days < 0 or batch_size <= 0:
+        raise ValueError("older_than_days must be non-negative and batch_size positive")
+
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    total = 0
+    for shard in range(database.SHARD_COUNT):
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = archive_returned_borrow_records(cutoff, batch_size, shard)
+            total += moved
+            batches += 1
+            if moved < batch_size:
+                break
+    return total
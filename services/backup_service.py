@@ -0,0 +1,161 @@
+"""
+Backup Service Module - Online backups and restores of the database files
+Backups are taken with SQLite's backup API a few pages at a time, with a
+pause between steps, so borrows and returns keep committing while even a
+large database is copied. Every copy is checked with PRAGMA integrity_check
+before it replaces a previous backup, and again before it is restored.
+Backups taken by one process run one at a time.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import database
+from database import check_database_file, close_connection_pools, copy_database_file, set_journal_mode
+from services.fee_memo import late_fee_memo
+
+BACKUP_DIR = "backups"  # where backups without an explicit path are written
+BACKUP_PAGES = 256  # pages copied per step (1 MiB with the default 4 KiB pages)
+BACKUP_PAUSE = 0.01  # seconds between steps, left to the app's own writes
+
+_backup_lock = threading.Lock()
+
+
+def backup_files(path: str) -> List[Tuple[str, str]]:
+    """
+    Pair each live database file with its file in the backup at path.
+
+    With sharding the shards are backed up next to path the way shard_path
+    places them next to DATABASE.
+    """
+    pairs = [(database.DATABASE, path)]
+    if database.SHARD_COUNT > 1:
+        root, ext = os.path.splitext(path)
+        pairs += [(database.shard_path(shard), f"{root}_shard{shard}{ext}")
+                  for shard in range(database.SHARD_COUNT)]
+    return pairs
+
+
+def default_backup_path(now: Optional[datetime] = None) -> str:
+    """A timestamped backup file in BACKUP_DIR."""
+    return os.path.join(BACKUP_DIR, f"library-{(now or datetime.now()):%Y%m%d-%H%M%S}.db")
+
+
+def verify_backup(path: str) -> Dict[str, List[str]]:
+    """
+    Check every file of a backup.
+
+    Returns:
+        dict: file -> its problems (empty for sound files)
+    """
+    problems = {}
+    for _, backup in backup_files(path):
+        if not os.path.exists(backup):
+            problems[backup] = ["file is missing"]
+            continue
+        result = check_database_file(backup)
+        problems[backup] = [] if result == ["ok"] else result
+    return problems
+
+
+def backup_database(path: Optional[str] = None, pages: int = BACKUP_PAGES, pause: float = BACKUP_PAUSE,
+                    blocking: bool = True) -> Optional[Dict]:
+    """
+    Take an online backup of the database (and its shards).
+
+    Each file is copied to a temporary .partial file of its own next to the
+    target, switched to a rollback journal so the backup is self-contained,
+    checked, and only then moved into place. With sharding each file is its
+    own consistent snapshot.
+
+    Args:
+        path: Backup file to write (defaults to a timestamped file in BACKUP_DIR)
+        pages: Pages copied per step
+        pause: Seconds to sleep between steps
+        blocking: Wait for a backup already running in this process (False returns None instead)
+
+    Returns:
+        dict: path, files written, pages copied and elapsed_ms, or None if not blocking and a backup is running
+
+    Raises:
+        ValueError: if pages is not positive or pause is negative
+        RuntimeError: if a copy fails its integrity check (the previous backup is kept)
+        sqlite3.Error, OSError: if a file cannot be read or written
+    """
+    if pages <= 0 or pause < 0:
+        raise ValueError("pages must be positive and pause non-negative")
+    if not _backup_lock.acquire(blocking):
+        return None
+    try:
+        return _backup_files(path or default_backup_path(), pages, pause)
+    finally:
+        _backup_lock.release()
+
+
+def _backup_files(path: str, pages: int, pause: float) -> Dict:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    copied = 0
+    for source, backup in backup_files(path):
+        fd, partial = tempfile.mkstemp(prefix=os.path.basename(backup) + ".", suffix=".partial",
+                                       dir=os.path.dirname(backup) or ".")
+        os.close(fd)
+        try:
+            copied += copy_database_file(source, partial, pages, pause)
+            set_journal_mode(partial, "DELETE")
+            problems = check_database_file(partial)
+            if problems != ["ok"]:
+                raise RuntimeError(f"Backup of {source} failed its integrity check: {'; '.join(problems)}")
+            os.replace(partial, backup)
+        except BaseException:
+            os.remove(partial)
+            raise
+
+    return {
+        "path": path,
+        "files": [backup for _, backup in backup_files(path)],
+        "pages": copied,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def restore_database(path: str) -> Dict:
+    """
+    Replace the live database (and its shards) with a verified backup.
+
+    The backup API writes the pages through SQLite's locks, so connections
+    open elsewhere see either the old or the restored database. Caches kept
+    by other processes (e.g. the late-fee memo) are not cleared, so restart
+    the app workers afterwards.
+
+    Returns:
+        dict: path, files restored, pages copied and elapsed_ms
+
+    Raises:
+        ValueError: if any file of the backup is missing or fails its integrity check
+    """
+    problems = {backup: found for backup, found in verify_backup(path).items() if found}
+    if problems:
+        raise ValueError("; ".join(f"{backup}: {', '.join(found)}" for backup, found in problems.items()))
+
+    start = time.perf_counter()
+    copied = 0
+    close_connection_pools()
+    for live, backup in backup_files(path):
+        copied += copy_database_file(backup, live)
+    close_connection_pools()
+    late_fee_memo.clear()
+
+    return {
+        "path": path,
+        "files": [live for live, _ in backup_files(path)],
+        "pages": copied,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
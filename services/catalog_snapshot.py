@@ -0,0 +1,224 @@
+"""
+Catalog Snapshot Module - Compact in-process copy of the books table
+Stores the catalog column-wise (integer arrays and packed UTF-8 strings) so
+catalog-wide reads and title/author searches do not build a dict per book.
+Books are read through small BookView objects that look like the dicts
+returned by database.get_all_books().
+"""
+
+import bisect
+import heapq
+import threading
+from array import array
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from database import get_data_version, read_connection
+
+BOOK_FIELDS = ("id", "title", "author", "isbn", "total_copies", "available_copies")
+SEARCH_FIELDS = ("title", "author")
+SEPARATOR = 0  # byte ending every packed string
+
+
+class PackedStrings:
+    """Many strings stored as NUL-terminated UTF-8 in one bytearray, with an array of start offsets."""
+
+    __slots__ = ("data", "starts")
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.data = bytearray()
+        self.starts = array("I")  # 32-bit offsets: up to 4 GiB of text per column
+        self.extend(values)
+
+    def extend(self, values: Iterable[str]) -> None:
+        """Append strings (a NUL inside a value is dropped)."""
+        for value in values:
+            self.starts.append(len(self.data))
+            self.data += value.encode().replace(b"\0", b"")
+            self.data.append(SEPARATOR)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> str:
+        start = self.starts[index]
+        return self.data[start:self.data.index(SEPARATOR, start)].decode()
+
+    def find(self, term: str) -> Iterator[int]:
+        """Yield the index of every string containing term, in storage order."""
+        needle = term.encode().replace(b"\0", b"")
+        position = self.data.find(needle)
+        while position != -1 and position < len(self.data):
+            yield bisect.bisect_right(self.starts, position) - 1
+            # Skip the rest of that string, so each one is reported once
+            position = self.data.find(needle, self.data.index(SEPARATOR, position + len(needle)) + 1)
+
+
+class BookView(Mapping):
+    """Read-only, dict-like view of one book in a CatalogSnapshot."""
+
+    __slots__ = ("_snapshot", "_row")
+
+    def __init__(self, snapshot: "CatalogSnapshot", row: int):
+        self._snapshot = snapshot
+        self._row = row
+
+    def __getitem__(self, key: str):
+        if key not in BOOK_FIELDS:
+            raise KeyError(key)
+        return getattr(self._snapshot, key)[self._row]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(BOOK_FIELDS)
+
+    def __len__(self) -> int:
+        return len(BOOK_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"BookView({dict(self)!r})"
+
+
+class CatalogSnapshot:
+    """
+    Column-wise copy of the books table, ordered by ID.
+
+    Books are only ever appended, so catching up with the database reads the
+    new rows plus the two copy counters of every book in one narrow scan;
+    the counters are swapped in as fresh arrays, never edited in place.
+    """
+
+    __slots__ = ("token", "id", "title", "author", "isbn", "total_copies", "available_copies",
+                 "_lowered", "_title_order", "_title_rank")
+
+    def __init__(self, token: Tuple[int, int]):
+        self.token = token
+        self.id = array("q")
+        self.title = PackedStrings()
+        self.author = PackedStrings()
+        self.isbn = PackedStrings()
+        self.total_copies = array("i")
+        self.available_copies = array("i")
+        self._lowered = {field: PackedStrings() for field in SEARCH_FIELDS}
+        self._title_order = array("i")  # rows sorted by (title, id), like ORDER BY title
+        self._title_rank = array("i")  # position of each row in _title_order
+
+    def refresh(self, token: Tuple[int, int]) -> bool:
+        """
+        Catch up with the database as of token.
+
+        Returns:
+            bool: False when existing books changed, so a full reload is needed
+        """
+        last_id = self.id[-1] if self.id else 0
+        new_rows = []
+        total_copies, available_copies = array("i"), array("i")
+        with read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute('''
+                SELECT id, total_copies, available_copies,
+                       CASE WHEN id > ?1 THEN title END,
+                       CASE WHEN id > ?1 THEN author END,
+                       CASE WHEN id > ?1 THEN isbn END
+                FROM books ORDER BY id
+            ''', (last_id,))
+            for row, (book_id, total, available, title, author, isbn) in enumerate(cursor):
+                if book_id > last_id:
+                    new_rows.append((book_id, title, author, isbn))
+                elif row >= len(self.id) or self.id[row] != book_id:
+                    return False
+                total_copies.append(total)
+                available_copies.append(available)
+        if len(total_copies) != len(self.id) + len(new_rows):
+            return False
+
+        if new_rows:
+            self._append(new_rows)
+        self.total_copies = total_copies
+        self.available_copies = available_copies
+        self.token = token
+        return True
+
+    def _append(self, rows: List[Tuple[int, str, str, str]]) -> None:
+        first_row = len(self.id)
+        self.id.extend(book_id for book_id, _, _, _ in rows)
+        self.title.extend(title for _, title, _, _ in rows)
+        self.author.extend(author for _, _, author, _ in rows)
+        self.isbn.extend(isbn for _, _, _, isbn in rows)
+        self._lowered["title"].extend(title.lower() for _, title, _, _ in rows)
+        self._lowered["author"].extend(author.lower() for _, _, author, _ in rows)
+
+        title_order = array("i", self._title_order)
+        sort_key = lambda row: (self.title[row], self.id[row])
+        for row in range(first_row, len(self.id)):
+            title_order.insert(bisect.bisect(title_order, sort_key(row), key=sort_key), row)
+        title_rank = array("i", bytes(title_order.itemsize * len(title_order)))
+        for rank, row in enumerate(title_order):
+            title_rank[row] = rank
+        self._title_rank, self._title_order = title_rank, title_order
+
+    def __len__(self) -> int:
+        return len(self._title_order)
+
+    def books(self) -> List[BookView]:
+        """All books ordered by title, as views."""
+        return [BookView(self, row) for row in self._title_order]
+
+    def search(self, term: str, field: str, limit: Optional[int] = None, offset: int = 0) -> List[BookView]:
+        """
+        Books whose field contains term (case-insensitive), ordered by title.
+
+        Args:
+            term: Text to look for
+            field: "title" or "author"
+            limit: Maximum number of results (None for all)
+            offset: Number of leading results to skip
+
+        Returns:
+            list of views; only limit + offset matches are ranked
+        """
+        if field not in self._lowered:
+            return []
+        rank = self._title_rank
+        # Rows appended after this call started have no rank yet
+        matches = (row for row in self._lowered[field].find(term.lower()) if row < len(rank))
+        if limit is None:
+            ordered = sorted(matches, key=rank.__getitem__)[offset:]
+        else:
+            ordered = heapq.nsmallest(offset + limit, matches, key=rank.__getitem__)[offset:]
+        return [BookView(self, row) for row in ordered]
+
+    def books_by_ids(self, book_ids: List[int]) -> List[BookView]:
+        """Books with the given IDs, in that order (unknown IDs are skipped)."""
+        views = (self.get(book_id) for book_id in book_ids)
+        return [view for view in views if view is not None]
+
+    def get(self, book_id: int) -> Optional[BookView]:
+        """The book with an ID, or None."""
+        row = bisect.bisect_left(self.id, book_id)
+        if row < len(self._title_rank) and self.id[row] == book_id:
+            return BookView(self, row)
+        return None
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog_snapshot() -> CatalogSnapshot:
+    """Get the shared catalog snapshot, catching up first if anything was committed since it was read."""
+    global _snapshot
+    token = get_data_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.token == token:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.token[0] != token[0] or not snapshot.refresh(token):
+            # A new snapshot reads every book in one statement, which cannot fail the checks
+            snapshot = CatalogSnapshot(token)
+            snapshot.refresh(token)
+            _snapshot = snapshot
+        return snapshot
+
@@ -0,0 +1,102 @@
+"""
+Export Service Module - Streaming exports of the catalog and borrow history
+Rows are pulled from the database in batches and encoded in chunks, so
+memory use stays the same no matter how large the tables are.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database import iter_books, iter_borrow_records
+
+EXPORT_COLUMNS = {
+    "books": ["id", "title", "author", "isbn", "total_copies", "available_copies"],
+    "borrow_records": ["id", "patron_id", "book_id", "borrow_date", "due_date", "return_date"],
+}
+EXPORT_FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+}
+CHUNK_ROWS = 200  # rows encoded into each yielded chunk
+
+
+def parse_date_range(start: Optional[str], end: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Turn inclusive YYYY-MM-DD bounds into a [start, end) datetime range.
+
+    Raises:
+        ValueError: if a bound is not a valid ISO date
+    """
+    start_dt = datetime.combine(date.fromisoformat(start), datetime.min.time()) if start else None
+    end_dt = datetime.combine(date.fromisoformat(end) + timedelta(days=1), datetime.min.time()) if end else None
+    return start_dt, end_dt
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[str]:
+    """Join encoded rows into chunks of CHUNK_ROWS lines."""
+    chunk: List[str] = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def iter_jsonl(rows: Iterable[Dict]) -> Iterator[str]:
+    """Encode rows as JSON Lines."""
+    return _chunked(json.dumps(row) + "\n" for row in rows)
+
+
+def iter_csv(rows: Iterable[Dict], columns: List[str]) -> Iterator[str]:
+    """Encode rows as CSV with a header line."""
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Header only, when there were no rows
+        if buffer.getvalue():
+            yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+def export_table(table: str, fmt: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Iterator[str]:
+    """
+    Stream a table export.
+
+    Args:
+        table: "books" or "borrow_records"
+        fmt: "jsonl" or "csv"
+        start: Only borrow records borrowed at or after this time
+        end: Only borrow records borrowed before this time
+
+    Returns:
+        iterator of text chunks
+
+    Raises:
+        ValueError: for an unknown table or format
+    """
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown export table: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    if table == "books":
+        rows = iter_books()
+    else:
+        rows = iter_borrow_records(start, end)
+
+    if fmt == "csv":
+        return iter_csv(rows, EXPORT_COLUMNS[table])
+    return iter_jsonl(rows)
@@ -0,0 +1,78 @@
+"""
+Fee Memo Module - Same-day memoization of late-fee lookups
+A loan's late fee only changes when another full day passes since its due
+date, so fee lookups are remembered until then (and never past midnight).
+The memo is bounded and per process; writes that change a loan invalidate
+its entry.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+LATE_FEE_MEMO_SIZE = 10000  # entries kept before the least recently used is dropped
+
+
+class DailyMemo:
+    """
+    Bounded LRU memo whose entries all expire at midnight.
+
+    Each entry may also carry its own earlier expiry time.
+    """
+
+    def __init__(self, maxsize: int = LATE_FEE_MEMO_SIZE, clock: Callable[[], datetime] = datetime.now):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Dict, Optional[datetime]]]" = OrderedDict()
+        self._day = clock().date()
+        self._lock = threading.Lock()
+
+    def _roll_over(self, now: datetime) -> None:
+        """Drop everything once the calendar day changes."""
+        if now.date() != self._day:
+            self._entries.clear()
+            self._day = now.date()
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """Get a copy of a remembered value, or None if it is missing or expired."""
+        now = self.clock()
+        with self._lock:
+            self._roll_over(now)
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and now >= entry[1]):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, key: Hashable, value: Dict, expires_at: Optional[datetime] = None) -> None:
+        """Remember a value for the rest of the day (or until expires_at, if earlier)."""
+        now = self.clock()
+        with self._lock:
+            self._roll_over(now)
+            self._entries[key] = (dict(value), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget one value."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget every value."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Late-fee results keyed by (patron_id, book_id), the loan calculate_late_fee_for_book assesses
+late_fee_memo = DailyMemo()
@@ -0,0 +1,22 @@
+"""
+Jobs Module - The background jobs run by the scheduler
+Used by create_app (SCHEDULER=True) and by `python cli.py worker`, so both
+run the same jobs.
+"""
+
+from database import reconcile_book_availability
+from services.library_service import HOLD_EXPIRY_INTERVAL, expire_uncollected_holds
+from services.maintenance_service import MAINTENANCE_CHECK_INTERVAL, QuietMaintenance
+from services.reminder_service import REMINDER_INTERVAL, run_reminders
+from services.scheduler import Scheduler
+
+INVENTORY_AUDIT_INTERVAL = 24 * 3600  # seconds between available_copies reconciliations
+
+
+def register_jobs(scheduler: Scheduler, reminder_interval: float = REMINDER_INTERVAL) -> Scheduler:
+    """Add every background job to a scheduler."""
+    scheduler.add_job('reminders', reminder_interval, run_reminders)
+    scheduler.add_job('expire_holds', HOLD_EXPIRY_INTERVAL, expire_uncollected_holds)
+    scheduler.add_job('reconcile_inventory', INVENTORY_AUDIT_INTERVAL, reconcile_book_availability)
+    scheduler.add_job('maintenance', MAINTENANCE_CHECK_INTERVAL, QuietMaintenance())
+    return scheduler
@@ -6,11 +6,52 @@ Contains all the core business logic for the Library Management System
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from database import (
-    get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
-    insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books, get_patron_borrowed_books, get_db_connection
+    get_book_by_id, get_book_by_isbn, get_patron_borrow_count, insert_book, get_patron_borrowed_books,
+    get_books_by_ids, get_patron_borrow_history, get_patron_borrow_history_page, record_borrow, record_return,
+    record_borrows, record_returns, record_fee_payment, get_late_fee_paid,
+    shard_for_patron, place_hold, cancel_hold, get_hold, expire_ready_holds,
+    get_top_books, popularity_periods, get_borrowed_books_for_patrons
 )
+from services.catalog_snapshot import get_catalog_snapshot
+from services.fee_memo import late_fee_memo
 from services.payment_service import PaymentGateway
+from services.search_index import get_search_index
+from services.write_queue import get_write_queue
+
+MAX_BORROWED_BOOKS = 5
+LOAN_PERIOD_DAYS = 14
+MAX_LATE_FEE = 15.0
+HOLD_PICKUP_DAYS = 3  # a copy kept for a hold goes to the next patron after this
+HOLD_EXPIRY_INTERVAL = 3600  # seconds between scheduled hold-expiry runs
+POPULAR_PERIODS = ("week", "month", "all")
+MAX_BULK_FEE_LOOKUPS = 500  # patron/book pairs (or patrons) per bulk late-fee request
+
+BORROW_FAILURE_MESSAGES = {
+    "limit": "You have reached the maximum borrowing limit of 5 books.",
+    "unavailable": "This book is currently not available.",
+}
+
+def _apply_write(operation, patron_id: str, *args) -> Tuple[bool, str]:
+    """
+    Run a patron's transactional database write such as record_borrow, through
+    the group-commit write queue when it is running.
+
+    Like a direct write it always returns (success, reason): a write the
+    queue could not apply is (False, 'error'), and one refused because the
+    queue stopped is run directly instead.
+    """
+    write_queue = get_write_queue()
+    if write_queue is None or not write_queue.is_running():
+        return operation(patron_id, *args)
+    try:
+        return write_queue.submit(lambda conn: operation(patron_id, *args, conn=conn), shard_for_patron(patron_id))
+    except RuntimeError:
+        # The queue stopped before applying the write
+        return operation(patron_id, *args)
+    except Exception:
+        # Withdrawn after the timeout, or its batch was rolled back
+        return False, 'error'
+
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
     Add a new book to the catalog.
@@ -78,26 +119,26 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not book:
         return False, "Book not found."
     
+    # A copy kept for the patron's ready hold counts as available to them
     if book['available_copies'] <= 0:
-        return False, "This book is currently not available."
+        hold = get_hold(patron_id, book_id)
+        if not hold or hold['status'] != 'ready':
+            return False, "This book is currently not available. Place a hold to join the waiting list."
     
-    # Check patron's current borrowed books count
+    # Check patron's current borrowed books count (a primary-key lookup on the patrons counter)
     current_borrowed = get_patron_borrow_count(patron_id)
-    if current_borrowed >= 5:
+    if current_borrowed >= MAX_BORROWED_BOOKS:
         return False, "You have reached the maximum borrowing limit of 5 books."
     
     # Create borrow record
     borrow_date = datetime.now()
-    due_date = borrow_date + timedelta(days=14)
-    
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
-        return False, "Database error occurred while creating borrow record."
+    due_date = borrow_date + timedelta(days=LOAN_PERIOD_DAYS)
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
+    # Insert borrow record, update availability and the patron counter in one transaction
+    success, reason = _apply_write(record_borrow, patron_id, book_id, borrow_date, due_date, MAX_BORROWED_BOOKS)
+    if not success:
+        return False, BORROW_FAILURE_MESSAGES.get(reason, "Database error occurred while creating borrow record.")
+    late_fee_memo.invalidate((patron_id, book_id))
     
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
@@ -111,63 +152,367 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
     borrowed_books = get_patron_borrowed_books(patron_id)
-    borrowed_ids = [borrowed["book_id"] for borrowed in borrowed_books]
+    loans = [borrowed for borrowed in borrowed_books if borrowed["book_id"] == book_id]
 
-    if book_id not in borrowed_ids:
+    if not loans:
         return False, f"Patron ID {patron_id} did not borrow Book ID {book_id} or has been retrned try again"
     
 
     return_date = datetime.now()
+    fee, _ = compute_late_fee(loans[0]["due_date"], return_date)
+
+    success, reason = _apply_write(record_return, patron_id, book_id, return_date, fee)
+    if not success:
+        if reason == "not_borrowed":
+            return False, f"Patron ID {patron_id} did not borrow Book ID {book_id} or has been retrned try again"
+        return False, "Database error occurred while recording the return."
+    late_fee_memo.invalidate((patron_id, book_id))
+
+    message = f"Book {book_id} returned sucessfully by patron ID:{patron_id}"
+    if fee > 0:
+        message += f". Late fee owed: ${fee:.2f}"
+    if reason == "held":
+        message += ". The copy is being held for the next patron on the waiting list"
+    return True, message
+
+def borrow_books_by_patron(patron_id: str, book_ids: List[int]) -> Tuple[bool, str, List[Dict]]:
+    """
+    Check out a stack of books for a patron at once.
+
+    The books are fetched with one query, the borrowing limit is checked once
+    for the whole stack and all loans are recorded in one transaction; a book
+    that is missing or unavailable fails on its own without blocking the rest.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books to borrow
+
+    Returns:
+        tuple: (success: bool, message: str, results: list of
+        {'book_id', 'success', 'message'} in the order of book_ids)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits.", []
+    if not book_ids:
+        return False, "No books given.", []
+
+    books = {book['id']: book for book in get_books_by_ids(book_ids)}
+    found = [index for index, book_id in enumerate(book_ids) if book_id in books]
+
+    current_borrowed = get_patron_borrow_count(patron_id)
+    if current_borrowed + len(found) > MAX_BORROWED_BOOKS:
+        return False, (f"Borrowing {len(found)} books would exceed the maximum borrowing limit of "
+                       f"{MAX_BORROWED_BOOKS} books (currently borrowed: {current_borrowed})."), []
+
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=LOAN_PERIOD_DAYS)
+    reasons = []
+    if found:
+        success, reasons = _apply_write(record_borrows, patron_id, [book_ids[index] for index in found],
+                                        borrow_date, due_date, MAX_BORROWED_BOOKS)
+        if not success:
+            return False, "Database error occurred while creating borrow records.", []
+
+    outcomes = dict(zip(found, reasons))
+    results = []
+    for index, book_id in enumerate(book_ids):
+        reason = outcomes.get(index, 'not_found')
+        if reason == '':
+            late_fee_memo.invalidate((patron_id, book_id))
+            results.append({'book_id': book_id, 'success': True,
+                            'message': f'Successfully borrowed "{books[book_id]["title"]}".'})
+        elif reason == 'not_found':
+            results.append({'book_id': book_id, 'success': False, 'message': "Book not found."})
+        else:
+            message = BORROW_FAILURE_MESSAGES.get(reason, "Database error occurred while creating borrow record.")
+            if reason == 'unavailable':
+                message += " Place a hold to join the waiting list."
+            results.append({'book_id': book_id, 'success': False, 'message': message})
+
+    borrowed = sum(result['success'] for result in results)
+    return borrowed > 0, f'Borrowed {borrowed} of {len(book_ids)} books. Due date: {due_date.strftime("%Y-%m-%d")}.', results
 
-    update_borrow_record_return_date(patron_id, book_id, return_date)
-    update_book_availability(book_id, +1)
-    return True, f"Book {book_id} returned sucessfully by patron ID:{patron_id}"
+def return_books_by_patron(patron_id: str, book_ids: List[int]) -> Tuple[bool, str, List[Dict]]:
+    """
+    Return a stack of books for a patron at once, in one transaction.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books being returned
+
+    Returns:
+        tuple: (success: bool, message: str, results: list of
+        {'book_id', 'success', 'message', 'late_fee'} in the order of book_ids)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits.", []
+    if not book_ids:
+        return False, "No books given.", []
+    if len(book_ids) > MAX_BORROWED_BOOKS:
+        return False, f"At most {MAX_BORROWED_BOOKS} books can be returned at once.", []
+
+    # Match each returned book to the patron's oldest open loan of it (one query for all)
+    open_loans: Dict[int, List[Dict]] = {}
+    for loan in get_patron_borrowed_books(patron_id):
+        open_loans.setdefault(loan['book_id'], []).append(loan)
+
+    return_date = datetime.now()
+    returning = []  # positions in book_ids that match an open loan
+    returns = []
+    for index, book_id in enumerate(book_ids):
+        loans = open_loans.get(book_id)
+        if loans:
+            returning.append(index)
+            returns.append((book_id, compute_late_fee(loans.pop(0)['due_date'], return_date)[0]))
+
+    reasons = []
+    if returns:
+        success, reasons = _apply_write(record_returns, patron_id, returns, return_date)
+        if not success:
+            return False, "Database error occurred while recording the returns.", []
+
+    outcomes = {index: (reason, fee) for index, (_, fee), reason in zip(returning, returns, reasons)}
+    results = []
+    for index, book_id in enumerate(book_ids):
+        reason, fee = outcomes.get(index, ('not_borrowed', 0.0))
+        if reason in ('', 'held'):
+            late_fee_memo.invalidate((patron_id, book_id))
+            message = f"Book {book_id} returned sucessfully"
+            if reason == 'held':
+                message += ". The copy is being held for the next patron on the waiting list"
+            results.append({'book_id': book_id, 'success': True, 'message': message, 'late_fee': fee})
+        else:
+            results.append({'book_id': book_id, 'success': False, 'late_fee': 0.0,
+                            'message': f"Patron ID {patron_id} did not borrow Book ID {book_id} or has been retrned try again"})
+
+    returned = [result for result in results if result['success']]
+    message = f"Returned {len(returned)} of {len(book_ids)} books"
+    total_fee = sum(result['late_fee'] for result in returned)
+    if total_fee > 0:
+        message += f". Late fees owed: ${total_fee:.2f}"
+    return bool(returned), message + ".", results
+
+def place_hold_for_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Put a patron on the waiting list of an unavailable book.
+    
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the book to hold
+        
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+    
+    book = get_book_by_id(book_id)
+    if not book:
+        return False, "Book not found."
+    
+    success, reason = _apply_write(place_hold, patron_id, book_id, datetime.now())
+    if not success:
+        if reason == "available":
+            return False, "This book is available, so it can be borrowed right away."
+        if reason == "duplicate":
+            return False, "You already have a hold on this book."
+        return False, "Database error occurred while placing the hold."
+    
+    hold = get_hold(patron_id, book_id)
+    return True, f'Hold placed on "{book["title"]}". You are number {hold["position"]} on the waiting list.'
 
+def cancel_hold_for_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Cancel a patron's hold on a book.
+    
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+    
+    success, reason = _apply_write(cancel_hold, patron_id, book_id, datetime.now())
+    if not success:
+        if reason == "no_hold":
+            return False, "You have no hold on this book."
+        return False, "Database error occurred while cancelling the hold."
+    return True, "Hold cancelled."
 
+def get_hold_status(patron_id: str, book_id: int) -> Dict:
     """
-    Process book return by a patron.
+    Get a patron's place on a book's waiting list.
     
-    TODO: Implement R4 as per requirements
+    Returns:
+        dict: status ('waiting', 'ready' or 'none'), position and, for a
+        ready hold, the date the copy is kept until
     """
-    return False, "Book return functionality is not yet implemented."
+    hold = get_hold(patron_id, book_id)
+    if hold is None:
+        return {"status": "none", "position": None}
+    
+    result = {"status": hold["status"], "position": hold["position"]}
+    if hold["status"] == "ready":
+        pickup_by = datetime.fromisoformat(hold["ready_at"]) + timedelta(days=HOLD_PICKUP_DAYS)
+        result["pickup_by"] = pickup_by.strftime("%Y-%m-%d")
+    return result
 
-def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
+def expire_uncollected_holds(now: Optional[datetime] = None) -> int:
+    """
+    Pass copies kept for more than HOLD_PICKUP_DAYS on to the next hold.
     
-    borrowed_books = get_patron_borrowed_books(patron_id)
-    for record in borrowed_books:
+    Returns:
+        int: number of holds expired
+    """
+    now = now or datetime.now()
+    return expire_ready_holds(now - timedelta(days=HOLD_PICKUP_DAYS), now)
 
-        if record["book_id"] == book_id:
-            due_date = record["due_date"]
-            return_date = record.get("return_date") or datetime.now()
+def compute_late_fee(due_date: datetime, as_of: datetime) -> Tuple[float, int]:
+    """
+    Late fee for a loan due at due_date, assessed at as_of.
+    $0.50/day for the first 7 days overdue, $1.00/day after that, capped at $15.00.
 
+    Returns:
+        tuple: (fee: float, days_overdue: int)
+    """
+    days_overdue = (as_of - due_date).days
 
-            days_overdue = (return_date - due_date).days
+    if days_overdue < 0:
+        days_overdue = 0
 
-            if days_overdue < 0:
-                days_overdue = 0
+    if days_overdue <= 7:
+        fee = days_overdue * 0.5
 
-            if days_overdue <= 7:
-                fee = days_overdue * 0.5
+    else:
+        fee = (7 * 0.5) + ((days_overdue - 7) * 1.0)
 
-            else:
-                fee = (7 * 0.5) + ((days_overdue - 7) * 1.0)
+    if fee > MAX_LATE_FEE:
+        fee = MAX_LATE_FEE
+
+    return fee, days_overdue
+
+def _assess_late_fee(borrowed_books: List[Dict], book_id: int, now: datetime) -> Tuple[Dict, Optional[datetime]]:
+    """
+    Late fee of the patron's first loan of book_id among borrowed_books.
 
-            if fee > 15:
-                fee = 15.0
+    Returns:
+        tuple: (fee info dict, time the result changes, or None if it only changes with the day)
+    """
+    for record in borrowed_books:
+
+        if record["book_id"] == book_id:
+            due_date = record["due_date"]
+            return_date = record.get("return_date") or now
+
+
+            fee, days_overdue = compute_late_fee(due_date, return_date)
 
             if days_overdue == 0:
                 status = "Retrned on time"  
             else:
                 status =f"{days_overdue} days overdue"
 
-            return {"fee": fee, "days_overdue": days_overdue, "status": status}
+            # An open loan's fee changes once another full day has passed since the due date
+            expires_at = None if record.get("return_date") else due_date + timedelta(days=days_overdue + 1)
+            return {"fee": fee, "days_overdue": days_overdue, "status": status}, expires_at
     
-    return {"fee": 0, "days_overdue": 0, "status": "Book not found for this patron"}
-   
+    return {"fee": 0, "days_overdue": 0, "status": "Book not found for this patron"}, None
+
+def _memoized_late_fee(patron_id: str, book_id: int, borrowed_books: Optional[List[Dict]] = None) -> Dict:
+    """Late fee info from the daily memo, assessing (and remembering) it on a miss."""
+    key = (patron_id, book_id)
+    result = late_fee_memo.get(key)
+    if result is None:
+        if borrowed_books is None:
+            borrowed_books = get_patron_borrowed_books(patron_id)
+        result, expires_at = _assess_late_fee(borrowed_books, book_id, datetime.now())
+        late_fee_memo.put(key, result, expires_at)
+    return result
 
-def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
+def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
+    """
+    Late fee a patron currently owes for a borrowed book.
+    Repeated lookups on the same day are answered from the late-fee memo.
+    
+    Returns:
+        dict: fee, days_overdue and status
+    """
+    return _memoized_late_fee(patron_id, book_id)
+
+def calculate_late_fees_bulk(pairs: List[Tuple[str, int]]) -> List[Dict]:
+    """
+    Late fees for many (patron_id, book_id) pairs at once.
+    Pairs not in the late-fee memo are resolved with one query for all their patrons.
+    
+    Returns:
+        list: patron_id, book_id, fee, days_overdue and status per pair, in input order
+    """
+    results = {}
+    misses = []
+    for pair in pairs:
+        cached = late_fee_memo.get(pair)
+        if cached is None:
+            misses.append(pair)
+        else:
+            results[pair] = cached
+    
+    if misses:
+        borrowed = get_borrowed_books_for_patrons([patron_id for patron_id, _ in misses])
+        now = datetime.now()
+        for pair in misses:
+            result, expires_at = _assess_late_fee(borrowed[pair[0]], pair[1], now)
+            late_fee_memo.put(pair, result, expires_at)
+            results[pair] = result
+    
+    return [{"patron_id": patron_id, "book_id": book_id, **results[(patron_id, book_id)]}
+            for patron_id, book_id in pairs]
+
+def calculate_late_fees_for_patrons(patron_ids: List[str]) -> List[Dict]:
+    """
+    Late fees of every current loan of many patrons, read with one query.
+    
+    Returns:
+        list: per patron, patron_id, loans (book_id, title, due_date, fee,
+        days_overdue) and total_fees, in input order
+    """
+    borrowed = get_borrowed_books_for_patrons(patron_ids)
+    now = datetime.now()
+    
+    report = []
+    for patron_id in dict.fromkeys(patron_ids):
+        loans = []
+        for loan in borrowed[patron_id]:
+            fee, days_overdue = compute_late_fee(loan["due_date"], now)
+            loans.append({
+                "book_id": loan["book_id"],
+                "title": loan["title"],
+                "due_date": loan["due_date"].strftime("%Y-%m-%d"),
+                "fee": fee,
+                "days_overdue": days_overdue,
+            })
+        report.append({"patron_id": patron_id, "loans": loans,
+                       "total_fees": sum(loan["fee"] for loan in loans)})
+    return report
    
 
+def search_books_in_catalog(search_term: str, search_type: str, fuzzy: bool = False,
+                            limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+    """
+    Search the catalog by title, author or ISBN.
+
+    With fuzzy=True, title/author searches also tolerate typos ("Fitzgerld")
+    and results are ranked by similarity instead of title.
+
+    Args:
+        search_term: Text to look for
+        search_type: "title", "author" or "isbn"
+        fuzzy: Tolerate typos in title/author searches
+        limit: Maximum number of results to return (None for all)
+        offset: Number of leading results to skip
+
+    Returns:
+        list of book dicts; only limit + offset matches are ever held in memory
+    """
+
     results = []
 
     if search_type not in ["isbn", "title", "author"]:
@@ -181,22 +526,18 @@ def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
         book = get_book_by_isbn(search_term)
         if book:
             results.append(book)
+        return results[offset:] if limit is None else results[offset:offset + limit]
 
 
-    elif search_type == "title":
-        books = get_all_books()
-        for book in books:
-            if search_term.lower() in book["title"].lower():
-                results.append(book)
-
+    snapshot = get_catalog_snapshot()
+    if fuzzy:
+        ranked = get_search_index().search(search_term, search_type, limit=limit, offset=offset)
+        return [dict(book) for book in snapshot.books_by_ids([book_id for _, book_id in ranked])]
 
-    elif search_type == "author":
-        books = get_all_books()
-        for book in books:
-            if search_term.lower() in book["author"].lower():
-                results.append(book)
 
-    return results
+    # Title/author: partial, case-insensitive match over the packed catalog snapshot,
+    # keeping only the first offset + limit matches by title in a bounded heap
+    return [dict(book) for book in snapshot.search(search_term, search_type, limit=limit, offset=offset)]
 
 
     """
@@ -207,8 +548,32 @@ def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
     
 
 
-def get_patron_status_report(patron_id: str) -> Dict:
+def get_popular_books(period: str = "week", limit: int = 10, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Get the most borrowed books of the current week, the current month or all time.
+    
+    Args:
+        period: "week", "month" or "all"
+        limit: Maximum number of books
+        now: Reference time that picks the current week/month (defaults to now)
+        
+    Returns:
+        list: books (book_id, title, author, borrow_count), most borrowed first
+        
+    Raises:
+        ValueError: for an unknown period
+    """
+    if period not in POPULAR_PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    
+    # popularity_periods lists the week, month and all-time keys in that order
+    period_key = popularity_periods(now or datetime.now())[POPULAR_PERIODS.index(period)]
+    return get_top_books(period_key, limit)
 
+def get_patron_status_report(patron_id: str) -> Dict:
+    """
+    Get status report for a patron: current loans, total fees and the whole borrowing history.
+    """
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
@@ -217,19 +582,11 @@ def get_patron_status_report(patron_id: str) -> Dict:
 
     for book in borrowed_books:
         
-        fee_info= calculate_late_fee_for_book(patron_id, book["book_id"])
-        total_fees += fee_info["fee_amount"]
+        fee_info = _memoized_late_fee(patron_id, book["book_id"], borrowed_books)
+        total_fees += fee_info["fee"]
 
         
-    conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.book_id, b.title, b.author
-        FROM borrow_records br
-        JOIN books b ON br.book_id = b.id
-        WHERE br.patron_id = ?
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
-    conn.close()
+    records = get_patron_borrow_history(patron_id)
 
     borrow_history = []
     for record in records:
@@ -251,12 +608,76 @@ def get_patron_status_report(patron_id: str) -> Dict:
     }
 
     return report
+
+def get_patron_status(patron_id: str) -> Dict:
     """
-    Get status report for a patron.
-    
-    TODO: Implement R7 as per requirements
+    Current loans and fee totals of a patron, without the borrowing history
+    (see get_patron_history_page). Dates are ISO strings, so the result is
+    JSON-ready.
+
+    Raises:
+        ValueError: if patron_id is not 6 digits
     """
-  
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        raise ValueError("Invalid patron ID. Must be exactly 6 digits.")
+
+    borrowed_books = get_patron_borrowed_books(patron_id)
+    loans = []
+    total_fees = 0.0
+    for book in borrowed_books:
+        fee_info = _memoized_late_fee(patron_id, book["book_id"], borrowed_books)
+        total_fees += fee_info["fee"]
+        loans.append({
+            "book_id": book["book_id"],
+            "title": book["title"],
+            "author": book["author"],
+            "borrow_date": book["borrow_date"].isoformat(),
+            "due_date": book["due_date"].isoformat(),
+            "is_overdue": book["is_overdue"],
+            "fee": fee_info["fee"],
+            "days_overdue": fee_info["days_overdue"],
+        })
+
+    return {
+        "patron_id": patron_id,
+        "borrowed_books": loans,
+        "books_borrowed_count": len(loans),
+        "total_fees": round(total_fees, 2),
+    }
+
+def get_patron_history_page(patron_id: str, limit: int = 20,
+                            before: Optional[Tuple[str, int]] = None) -> Dict:
+    """
+    Get one page of a patron's borrowing history (archived loans included), newest first.
+
+    Args:
+        patron_id: 6-digit library card ID
+        limit: Maximum loans on the page
+        before: Cursor returned as next_cursor by the previous page
+
+    Returns:
+        dict: records (dates as ISO strings) and next_cursor (None on the last page)
+
+    Raises:
+        ValueError: if patron_id is not 6 digits
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        raise ValueError("Invalid patron ID. Must be exactly 6 digits.")
+
+    # One extra row tells us whether another page exists
+    records = get_patron_borrow_history_page(patron_id, before, limit + 1)
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = records[-1]
+        next_cursor = (last["borrow_date"], last["id"])
+    return {
+        "records": [{key: value for key, value in record.items() if key != "id"} for record in records],
+        "next_cursor": next_cursor,
+    }
+
 def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
@@ -278,39 +699,65 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         mock_gateway.process_payment.return_value = (True, "txn_123", "Success")
         success, msg, txn = pay_late_fees("123456", 1, mock_gateway)
     """
+    payment, error = prepare_late_fee_payment(patron_id, book_id)
+    if payment is None:
+        return False, error, None
+    
+    # Use provided gateway or create new one
+    if payment_gateway is None:
+        payment_gateway = PaymentGateway()
+    
+    success, message, transaction_id = charge_late_fee_payment(payment, payment_gateway)
+    if success:
+        record_late_fee_payment(patron_id, book_id, payment["amount"])
+    return success, message, transaction_id
+
+def prepare_late_fee_payment(patron_id: str, book_id: int) -> Tuple[Optional[Dict], str]:
+    """
+    Database half of a late-fee payment before the gateway is called.
+
+    Returns:
+        tuple: (process_payment keyword arguments, "") or (None, error message)
+    """
     # Validate patron ID
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
-        return False, "Invalid patron ID. Must be exactly 6 digits.", None
+        return None, "Invalid patron ID. Must be exactly 6 digits."
     
     # Calculate late fee first
     fee_info = calculate_late_fee_for_book(patron_id, book_id)
     
     # Check if there's a fee to pay
-    if not fee_info or 'fee_amount' not in fee_info:
-        return False, "Unable to calculate late fees.", None
+    if not fee_info or 'fee' not in fee_info:
+        return None, "Unable to calculate late fees."
     
-    fee_amount = fee_info.get('fee_amount', 0.0)
+    # Only the part not already paid on this loan
+    fee_amount = fee_info.get('fee', 0.0) - get_late_fee_paid(patron_id, book_id)
     
     if fee_amount <= 0:
-        return False, "No late fees to pay for this book.", None
+        return None, "No late fees to pay for this book."
     
     # Get book details for payment description
     book = get_book_by_id(book_id)
     if not book:
-        return False, "Book not found.", None
-    
-    # Use provided gateway or create new one
-    if payment_gateway is None:
-        payment_gateway = PaymentGateway()
+        return None, "Book not found."
     
+    return {
+        "patron_id": patron_id,
+        "amount": fee_amount,
+        "description": f"Late fees for '{book['title']}'"
+    }, ""
+
+def charge_late_fee_payment(payment: Dict, payment_gateway: PaymentGateway) -> Tuple[bool, str, Optional[str]]:
+    """
+    Gateway half of a late-fee payment (no database work, so it can wait on the network).
+
+    Returns:
+        tuple: (success: bool, message: str, transaction_id: Optional[str])
+    """
     # Process payment through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN THEIR TESTS!
     try:
-        success, transaction_id, message = payment_gateway.process_payment(
-            patron_id=patron_id,
-            amount=fee_amount,
-            description=f"Late fees for '{book['title']}'"
-        )
+        success, transaction_id, message = payment_gateway.process_payment(**payment)
         
         if success:
             return True, f"Payment successful! {message}", transaction_id
@@ -321,6 +768,17 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         # Handle payment gateway errors
         return False, f"Payment processing error: {str(e)}", None
 
+def record_late_fee_payment(patron_id: str, book_id: int, amount: float) -> bool:
+    """
+    Database half of a late-fee payment after the gateway accepted it.
+
+    Returns:
+        bool: True if the payment was recorded
+    """
+    success, _ = _apply_write(record_fee_payment, patron_id, book_id, amount)
+    late_fee_memo.invalidate((patron_id, book_id))
+    return success
+
 
 def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None) -> Tuple[bool, str]:
     """
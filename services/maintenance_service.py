@@ -0,0 +1,114 @@
+"""
+Maintenance Service Module - Planner statistics, incremental vacuum and WAL checkpoints
+Churn on borrow_records leaves free pages behind and planner statistics
+out of date. A maintenance run refreshes the statistics, hands free pages
+back a batch at a time and checkpoints the WAL, for the catalog file and
+every shard, and reports the file sizes and the time each step took.
+The scheduled job only runs it after a quiet spell without commits.
+Files created before auto_vacuum=INCREMENTAL was the default only shrink
+after a one-off conversion (a full VACUUM), which is run on request only.
+"""
+
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from database import (
+    checkpoint_wal, enable_incremental_vacuum, get_data_version, get_file_stats, incremental_vacuum,
+    maintenance_connections, optimize_statistics
+)
+
+MAINTENANCE_CHECK_INTERVAL = 300  # seconds between checks for a quiet spell (no commits since the last check)
+MAINTENANCE_INTERVAL = 24 * 3600  # least seconds between two maintenance runs
+VACUUM_STEP_PAGES = 500  # free pages handed back per incremental_vacuum transaction
+CHECKPOINT_MODE = "TRUNCATE"  # also empties the WAL file; only run when the database is quiet
+
+logger = logging.getLogger("library.maintenance")
+
+_last_report: Optional[Dict] = None
+
+
+def _timed(step: Callable[[], object]):
+    """Run step() and return its result with the milliseconds it took."""
+    start = time.perf_counter()
+    result = step()
+    return result, round((time.perf_counter() - start) * 1000, 3)
+
+
+def run_maintenance(analyze: bool = False, vacuum_pages: Optional[int] = None,
+                    checkpoint_mode: str = CHECKPOINT_MODE, convert: bool = False) -> Dict:
+    """
+    Run every maintenance step on each database file.
+
+    Args:
+        analyze: Run a full ANALYZE instead of PRAGMA optimize
+        vacuum_pages: Most pages to free per file (None frees every free page)
+        checkpoint_mode: PASSIVE, FULL, RESTART or TRUNCATE
+        convert: First switch files without auto_vacuum=INCREMENTAL over with a full VACUUM
+            (rewrites the file, so keep it for an operator-run pass)
+
+    Returns:
+        dict: files, each with its stats before and after and the ms per step, and elapsed_ms
+    """
+    global _last_report
+    if checkpoint_mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError("checkpoint_mode must be PASSIVE, FULL, RESTART or TRUNCATE")
+
+    start = time.perf_counter()
+    files = []
+    for path, connection in maintenance_connections():
+        with connection() as conn:
+            before = get_file_stats(conn, path)
+            steps_ms, converted = {}, False
+            if convert:
+                converted, steps_ms["enable_incremental_vacuum"] = _timed(lambda: enable_incremental_vacuum(conn))
+            statistics, steps_ms["optimize"] = _timed(lambda: optimize_statistics(conn, analyze))
+            freed, steps_ms["incremental_vacuum"] = _timed(
+                lambda: incremental_vacuum(conn, VACUUM_STEP_PAGES, vacuum_pages))
+            checkpoint, steps_ms["wal_checkpoint"] = _timed(lambda: checkpoint_wal(conn, checkpoint_mode))
+            files.append({
+                "path": path,
+                "before": before,
+                "after": get_file_stats(conn, path),
+                "statistics": statistics,
+                "converted": converted,
+                "freed_pages": freed,
+                "checkpoint": checkpoint,
+                "steps_ms": steps_ms,
+            })
+
+    report = {"files": files, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+    _last_report = report
+    logger.info(json.dumps({"event": "maintenance", **report}))
+    return report
+
+
+def get_last_maintenance_report() -> Optional[Dict]:
+    """The report of the last maintenance run in this process, or None."""
+    return _last_report
+
+
+class QuietMaintenance:
+    """
+    Scheduled job that runs maintenance once the database has gone a whole
+    check interval without a commit, and at most once per min_interval.
+    """
+
+    def __init__(self, min_interval: float = MAINTENANCE_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self.min_interval = min_interval
+        self.clock = clock
+        self._token = None
+        self._last_run: Optional[float] = None
+
+    def __call__(self) -> Optional[Dict]:
+        token = get_data_version()
+        quiet, self._token = token == self._token, token
+        if not quiet or (self._last_run is not None and self.clock() - self._last_run < self.min_interval):
+            return None
+
+        report = run_maintenance()
+        self._last_run = self.clock()
+        # Maintenance commits too; the next quiet spell is measured from here
+        self._token = get_data_version()
+        return report
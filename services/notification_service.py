@@ -0,0 +1,32 @@
+"""
+Notification Service Module - Delivery of patron reminders
+This module simulates an external email/SMS provider. The reminder job
+only depends on send_reminder(), so a real provider can be dropped in by
+passing a different notifier object.
+"""
+
+from typing import Dict, List
+
+
+class NotificationService:
+    """
+    Simulates an external notification provider.
+    Sent messages are kept in memory instead of leaving the process.
+    """
+
+    def __init__(self):
+        self.sent: List[Dict] = []
+
+    def send_reminder(self, patron_id: str, message: str) -> bool:
+        """
+        Send a reminder to a patron.
+
+        Args:
+            patron_id: 6-digit patron ID
+            message: Reminder text
+
+        Returns:
+            bool: True if the provider accepted the message
+        """
+        self.sent.append({"patron_id": patron_id, "message": message})
+        return True
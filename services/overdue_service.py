@@ -0,0 +1,90 @@
+"""
+Overdue Service Module - Overdue and due-soon loan reports
+Open loans are range-scanned by due date through a partial index and
+paged with a keyset cursor, so a report over every patron never sorts or
+loads the whole borrow history. Fees are computed in memory per page.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from database import get_open_loans_due
+from services.library_service import compute_late_fee
+
+REPORT_KINDS = ("overdue", "due_soon")
+DUE_SOON_DAYS = 3  # "due soon" looks this many days ahead
+MAX_DUE_SOON_DAYS = 365  # furthest "due soon" window the API accepts
+REPORT_PAGE_SIZE = 500  # loans per page when iterating a whole report
+
+LoanKey = Tuple[str, str, int]
+
+
+def _report_window(kind: str, as_of: datetime, due_within_days: int) -> Tuple[Optional[datetime], datetime]:
+    """Due-date range [due_from, due_before) covered by a report."""
+    if kind == "overdue":
+        return None, as_of
+    return as_of, as_of + timedelta(days=due_within_days)
+
+
+def get_due_report(kind: str = "overdue", as_of: Optional[datetime] = None,
+                   due_within_days: int = DUE_SOON_DAYS, limit: int = 100,
+                   after: Optional[LoanKey] = None) -> Dict:
+    """
+    Get one page of the overdue or due-soon report.
+
+    Args:
+        kind: "overdue" (due before as_of) or "due_soon" (due within due_within_days of as_of)
+        as_of: Reference time (defaults to the current time)
+        due_within_days: Look-ahead of the due-soon report
+        limit: Maximum loans on the page
+        after: Cursor returned as next_cursor by the previous page
+
+    Returns:
+        dict: loans (oldest due date first) and next_cursor (None on the last page)
+
+    Raises:
+        ValueError: for an unknown report kind
+    """
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report: {kind}")
+    as_of = as_of or datetime.now()
+    due_from, due_before = _report_window(kind, as_of, due_within_days)
+
+    # One extra row tells us whether another page exists
+    records = get_open_loans_due(due_from, due_before, after, limit + 1)
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    loans: List[Dict] = []
+    for record in records:
+        due_date = datetime.fromisoformat(record["due_date"])
+        fee, days_overdue = compute_late_fee(due_date, as_of)
+        loans.append({
+            "patron_id": record["patron_id"],
+            "book_id": record["book_id"],
+            "title": record["title"],
+            "borrow_date": record["borrow_date"],
+            "due_date": record["due_date"],
+            "days_overdue": days_overdue,
+            "fee": fee,
+        })
+
+    next_cursor = None
+    if has_more:
+        last = records[-1]
+        next_cursor = (last["due_date"], last["patron_id"], last["id"])
+    return {"loans": loans, "next_cursor": next_cursor}
+
+
+def iter_due_report(kind: str = "overdue", as_of: Optional[datetime] = None,
+                    due_within_days: int = DUE_SOON_DAYS,
+                    page_size: int = REPORT_PAGE_SIZE) -> Iterator[Dict]:
+    """Yield every loan of a report, fetching it one page at a time (e.g. for a nightly notice run)."""
+    as_of = as_of or datetime.now()
+    after = None
+    while True:
+        page = get_due_report(kind, as_of, due_within_days, page_size, after)
+        yield from page["loans"]
+        after = page["next_cursor"]
+        if after is None:
+            break
@@ -6,7 +6,6 @@ For Assignment 3: You will learn to mock this service in their tests
 since we cannot make actual payment API calls during testing.
 """
 
-import requests
 from typing import Dict, Tuple
 import time
 
@@ -31,6 +30,20 @@ class PaymentGateway:
         """
         self.api_key = api_key
         self.base_url = "https://api.payment-gateway.example.com"
+        self._session = None
+    
+    @property
+    def session(self):
+        """
+        HTTP session for the gateway API, created on first use.
+        
+        requests is imported here rather than at module load, so app workers
+        that never take a payment do not pay for importing it.
+        """
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
     
     def process_payment(self, patron_id: str, amount: float, description: str = "") -> Tuple[bool, str, str]:
         """
@@ -55,7 +68,7 @@ class PaymentGateway:
         time.sleep(0.5)
         
         # In a real implementation, this would make an HTTP request:
-        # response = requests.post(
+        # response = self.session.post(
         #     f"{self.base_url}/charges",
         #     headers={"Authorization": f"Bearer {self.api_key}"},
         #     json={
@@ -0,0 +1,122 @@
+"""
+Reminder Service Module - Due-date reminders through an outbox
+Each run scans only the open loans whose reminder became due since the
+previous run (tracked as a watermark in library_meta), using the
+due-date index, and queues the reminders in reminder_outbox in batches.
+Delivery is a separate step, so a notifier outage only delays reminders.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from database import (
+    get_meta_value, get_open_loans_due, get_pending_reminders, insert_reminders,
+    mark_reminders_sent, set_meta_value
+)
+from services.notification_service import NotificationService
+
+REMINDER_DAYS_BEFORE = 2  # due-soon reminder is sent this many days before the due date
+REMINDER_BATCH_SIZE = 500  # loans queued (or reminders delivered) per transaction
+REMINDER_INTERVAL = 3600  # seconds between scheduled runs
+WATERMARK_KEY = "reminder_watermark"
+
+
+def _iter_loan_batches(due_from: Optional[datetime], due_before: datetime,
+                       batch_size: int) -> Iterator[List[dict]]:
+    """Yield open loans due in [due_from, due_before) one keyset page at a time."""
+    after = None
+    while True:
+        loans = get_open_loans_due(due_from, due_before, after, batch_size)
+        if loans:
+            yield loans
+        if len(loans) < batch_size:
+            break
+        last = loans[-1]
+        after = (last["due_date"], last["patron_id"], last["id"])
+
+
+def queue_due_reminders(now: Optional[datetime] = None, batch_size: int = REMINDER_BATCH_SIZE) -> int:
+    """
+    Queue the reminders that became due since the previous run.
+
+    A due-soon reminder is queued once a loan is REMINDER_DAYS_BEFORE days
+    from its due date, and an overdue reminder once per day while it stays
+    unreturned. Rerunning for the same day queues nothing twice.
+
+    Args:
+        now: Reference time (defaults to the current time)
+        batch_size: Loans queued per transaction
+
+    Returns:
+        int: number of reminders queued
+    """
+    now = now or datetime.now()
+    watermark = get_meta_value(WATERMARK_KEY)
+    last_run = datetime.fromisoformat(watermark) if watermark else None
+    lead = timedelta(days=REMINDER_DAYS_BEFORE)
+    today = now.date().isoformat()
+    queued = 0
+
+    # Loans that entered the due-soon window since the last run; ones already
+    # overdue by now get an overdue reminder instead
+    due_soon_from = max(last_run + lead, now) if last_run else now
+    for loans in _iter_loan_batches(due_soon_from, now + lead, batch_size):
+        queued += insert_reminders([
+            (loan["patron_id"], loan["id"], "due_soon", today,
+             f'"{loan["title"]}" is due on {loan["due_date"][:10]}.')
+            for loan in loans
+        ])
+
+    # The first run of a day reminds every overdue loan; later runs that day
+    # only pick up loans that became overdue since the last run
+    overdue_from = last_run if last_run and last_run.date() == now.date() else None
+    for loans in _iter_loan_batches(overdue_from, now, batch_size):
+        queued += insert_reminders([
+            (loan["patron_id"], loan["id"], "overdue", today,
+             f'"{loan["title"]}" was due on {loan["due_date"][:10]}. Please return it.')
+            for loan in loans
+        ])
+
+    set_meta_value(WATERMARK_KEY, now.isoformat())
+    return queued
+
+
+def deliver_reminders(notifier=None, batch_size: int = REMINDER_BATCH_SIZE) -> int:
+    """
+    Send the queued reminders and mark the delivered ones as sent.
+
+    Reminders the notifier rejects stay queued for the next run.
+
+    Args:
+        notifier: Object with send_reminder(patron_id, message) -> bool
+            (defaults to NotificationService)
+        batch_size: Reminders marked as sent per transaction
+
+    Returns:
+        int: number of reminders delivered
+    """
+    notifier = notifier or NotificationService()
+    delivered = 0
+    after_id = 0
+    while True:
+        reminders = get_pending_reminders(after_id, batch_size)
+        if not reminders:
+            break
+        sent = [reminder["id"] for reminder in reminders
+                if notifier.send_reminder(reminder["patron_id"], reminder["message"])]
+        mark_reminders_sent(sent, datetime.now())
+        delivered += len(sent)
+        after_id = reminders[-1]["id"]
+    return delivered
+
+
+def run_reminders(now: Optional[datetime] = None, notifier=None) -> Tuple[int, int]:
+    """
+    One scheduled reminder run: queue new reminders, then deliver the outbox.
+
+    Returns:
+        tuple: (queued: int, delivered: int)
+    """
+    queued = queue_due_reminders(now)
+    delivered = deliver_reminders(notifier)
+    return queued, delivered
@@ -0,0 +1,119 @@
+"""
+Scheduler Module - In-process periodic background jobs
+A single daemon thread runs each registered job every `interval` seconds.
+Jobs are plain functions; a failing job is retried at its next interval
+without affecting the other jobs.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+TICK_SECONDS = 1.0  # how often the scheduler thread checks for due jobs
+
+
+class Job:
+    """A named function run every `interval` seconds."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = time.monotonic()
+        self.runs = 0
+        self.last_error: Optional[str] = None
+
+
+class Scheduler:
+    """Runs registered jobs on a background thread (or on demand via run_pending)."""
+
+    def __init__(self, tick: float = TICK_SECONDS):
+        self.tick = tick
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, interval: float, func: Callable[[], object], run_now: bool = True) -> Job:
+        """
+        Register (or replace) a job.
+
+        Args:
+            name: Unique job name
+            interval: Seconds between runs
+            func: Function to call with no arguments
+            run_now: Run at the next tick instead of after the first interval
+        """
+        job = Job(name, interval, func)
+        if not run_now:
+            job.next_run += interval
+        with self._lock:
+            self._jobs[name] = job
+        return job
+
+    def get_job(self, name: str) -> Optional[Job]:
+        """Get a registered job by name."""
+        with self._lock:
+            return self._jobs.get(name)
+
+    def run_pending(self, now: Optional[float] = None) -> List[str]:
+        """Run every job that is due and return their names."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [job for job in self._jobs.values() if job.next_run <= now]
+
+        for job in due:
+            try:
+                job.func()
+                job.last_error = None
+            except Exception as e:
+                job.last_error = str(e)
+            job.runs += 1
+            job.next_run = now + job.interval
+        return [job.name for job in due]
+
+    def start(self) -> None:
+        """Start the scheduler thread."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="library-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the scheduler thread once the running job (if any) finishes."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self.run_pending()
+            self._stopping.wait(self.tick)
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def start_scheduler(tick: float = TICK_SECONDS) -> Scheduler:
+    """Start the shared background scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(tick)
+        _scheduler.start()
+    return _scheduler
+
+
+def stop_scheduler() -> None:
+    """Stop the shared background scheduler."""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def get_scheduler() -> Optional[Scheduler]:
+    """Get the shared scheduler, or None when it is not running."""
+    return _scheduler
@@ -0,0 +1,404 @@
+"""
+Search Index Module - Typo-tolerant title/author search
+Keeps a trigram index over the words of every title and author so fuzzy
+lookups only compare the query against words that share trigrams with it.
+
+The index is saved to a file next to the database and memory-mapped, so
+workers share its pages and a restart only rebuilds it when the catalog
+changed since the file was written.
+"""
+
+import abc
+import bisect
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import database
+from database import get_all_books, get_catalog_version
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+INDEXED_FIELDS = ("title", "author")
+INDEX_MAGIC = b"LIBSRCH\0"
+INDEX_FORMAT = 1  # bump whenever the file layout changes
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric words."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    """Get the padded trigrams of a word (two leading blanks, one trailing)."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def default_max_distance(token: str) -> int:
+    """Allowed number of typos for a query word: none for very short words, up to two for long ones."""
+    if len(token) <= 2:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return 2
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Compute the edit distance between two words, giving up early.
+
+    Returns:
+        int distance if it is at most max_distance, otherwise None
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+        # Every path through the remaining rows costs at least the row minimum
+        if min(current) > max_distance:
+            return None
+        previous = current
+
+    distance = previous[-1]
+    return distance if distance <= max_distance else None
+
+
+
+
+class _TrigramSearch(abc.ABC):
+    """
+    Fuzzy ranking shared by the in-memory and the memory-mapped index.
+
+    Subclasses answer the lookups below; a word is identified by whatever
+    key _gram_tokens hands out and _token/_books accept.
+    """
+
+    version = ""
+
+    @abc.abstractmethod
+    def _has_field(self, field: str) -> bool:
+        """Whether the index holds a field."""
+
+    @abc.abstractmethod
+    def _gram_tokens(self, field: str, gram: str) -> Iterable:
+        """Keys of the indexed words containing a trigram."""
+
+    @abc.abstractmethod
+    def _token(self, field: str, key) -> str:
+        """The word behind a key."""
+
+    @abc.abstractmethod
+    def _books(self, field: str, key) -> Iterable[int]:
+        """Ids of the books whose field contains the word behind a key."""
+
+    @abc.abstractmethod
+    def _title_key(self, book_id: int):
+        """Sort key ordering books by lowercase title, used to break score ties."""
+
+    def _similar_tokens(self, field: str, query_token: str, max_distance: int) -> Dict[object, float]:
+        """Find indexed words within max_distance edits of query_token (or starting with it)."""
+        query_grams = trigrams(query_token)
+
+        # One edit changes at most three trigrams, so anything sharing fewer can be skipped
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for key in self._gram_tokens(field, gram):
+                shared[key] += 1
+        min_shared = max(1, len(query_grams) - 3 * max_distance)
+
+        matches = {}
+        for key, count in shared.items():
+            if count < min_shared:
+                continue
+            token = self._token(field, key)
+            similarity = 0.0
+            distance = bounded_levenshtein(query_token, token, max_distance)
+            if distance is not None:
+                similarity = 1.0 - distance / max(len(query_token), len(token))
+            if len(query_token) >= 3 and token.startswith(query_token):
+                similarity = max(similarity, len(query_token) / len(token))
+            if similarity > 0:
+                matches[key] = similarity
+        return matches
+
+    def search(self, term: str, field: str, max_distance: Optional[int] = None,
+               limit: Optional[int] = None, offset: int = 0) -> List[Tuple[float, int]]:
+        """
+        Find books whose field contains a near match for every word of term.
+
+        Args:
+            term: Search text, possibly misspelled
+            field: "title" or "author"
+            max_distance: Edit distance allowed per word (default depends on word length)
+            limit: Maximum number of results (None for all)
+            offset: Number of best results to skip
+
+        Returns:
+            list of (similarity, book_id), best match first
+        """
+        query_tokens = tokenize(term)
+        if not self._has_field(field) or not query_tokens:
+            return []
+
+        scores: Optional[Dict[int, float]] = None
+        for query_token in query_tokens:
+            allowed = default_max_distance(query_token) if max_distance is None else max_distance
+            best: Dict[int, float] = {}
+            for key, similarity in self._similar_tokens(field, query_token, allowed).items():
+                for book_id in self._books(field, key):
+                    if similarity > best.get(book_id, 0.0):
+                        best[book_id] = similarity
+
+            # A book must match every query word; keep the running total of similarities
+            if scores is None:
+                scores = best
+            else:
+                scores = {book_id: score + best[book_id] for book_id, score in scores.items() if book_id in best}
+            if not scores:
+                return []
+
+        ranked = ((score / len(query_tokens), book_id) for book_id, score in scores.items())
+        rank_key = lambda item: (-item[0], self._title_key(item[1]))
+        if limit is None:
+            return sorted(ranked, key=rank_key)[offset:]
+        return heapq.nsmallest(offset + limit, ranked, key=rank_key)[offset:]
+
+
+class TrigramIndex(_TrigramSearch):
+    """
+    Inverted index from trigrams to words and from words to book IDs, built in memory.
+
+    Only immutable book fields (ID, title, author) are stored; callers fetch
+    current rows for the matching IDs so availability is never stale.
+    """
+
+    def __init__(self, books: Iterable[Mapping], version: str = ""):
+        self.version = version
+        self.titles: Dict[int, str] = {}
+        self._postings = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self._grams = {field: defaultdict(set) for field in INDEXED_FIELDS}
+
+        for book in books:
+            self.titles[book["id"]] = book["title"]
+            for field in INDEXED_FIELDS:
+                for token in tokenize(book[field]):
+                    if token not in self._postings[field]:
+                        for gram in trigrams(token):
+                            self._grams[field][gram].add(token)
+                    self._postings[field][token].add(book["id"])
+
+    def _has_field(self, field: str) -> bool:
+        return field in self._postings
+
+    def _gram_tokens(self, field: str, gram: str) -> Iterable[str]:
+        return self._grams[field].get(gram, ())
+
+    def _token(self, field: str, key: str) -> str:
+        return key
+
+    def _books(self, field: str, key: str) -> Iterable[int]:
+        return self._postings[field][key]
+
+    def _title_key(self, book_id: int) -> str:
+        return self.titles[book_id].lower()
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to path for MappedTrigramIndex.
+
+        The file is written under a temporary name and renamed into place, so
+        workers that still map the previous file keep reading a complete one.
+        """
+        sections: Dict[str, array] = {}
+        for field in INDEXED_FIELDS:
+            tokens = sorted(self._postings[field])
+            numbers = {token: number for number, token in enumerate(tokens)}
+            grams = sorted(self._grams[field])
+            _pack_strings(sections, f"{field}.tokens", tokens)
+            _pack_lists(sections, f"{field}.postings", "q",
+                        (sorted(self._postings[field][token]) for token in tokens))
+            _pack_strings(sections, f"{field}.grams", grams)
+            _pack_lists(sections, f"{field}.gram_tokens", "I",
+                        (sorted(numbers[token] for token in self._grams[field][gram]) for gram in grams))
+        # Books are ranked by their lowercase title's place in sorted order, so ties need no strings
+        book_ids = sorted(self.titles)
+        lowered = sorted({title.lower() for title in self.titles.values()})
+        title_ranks = {title: rank for rank, title in enumerate(lowered)}
+        sections["books.ids"] = array("q", book_ids)
+        sections["books.title_ranks"] = array("I", (title_ranks[self.titles[book_id].lower()] for book_id in book_ids))
+        _write_index_file(path, self.version, sections)
+
+
+class MappedTrigramIndex(_TrigramSearch):
+    """
+    An index file written by TrigramIndex.save, read in place through a read-only mmap.
+
+    Every lookup slices the mapped arrays (binary search for trigrams), so
+    nothing is unpacked into Python objects and the pages are shared by all
+    processes mapping the same file.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as index_file:
+            self._map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        header_start = len(INDEX_MAGIC) + 4
+        if len(self._map) < header_start or self._map[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a search index file")
+        (header_size,) = struct.unpack_from("<I", self._map, len(INDEX_MAGIC))
+        header = json.loads(self._map[header_start:header_start + header_size])
+        # Arrays are stored in native byte order: the file is a local cache, not an exchange format
+        if header.get("format") != INDEX_FORMAT or header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path} was written in another index format")
+
+        self.version = header["version"]
+        data_start = _align(header_start + header_size)
+        view = memoryview(self._map)
+        self._sections = {}
+        for name, (offset, typecode, size) in header["sections"].items():
+            if data_start + offset + size > len(self._map):
+                raise ValueError(f"{path} is truncated")
+            self._sections[name] = view[data_start + offset:data_start + offset + size].cast(typecode)
+
+    def _string(self, name: str, number: int) -> str:
+        offsets = self._sections[f"{name}.offsets"]
+        return self._sections[f"{name}.data"][offsets[number]:offsets[number + 1]].tobytes().decode()
+
+    def _list(self, name: str, number: int) -> memoryview:
+        offsets = self._sections[f"{name}.offsets"]
+        return self._sections[f"{name}.values"][offsets[number]:offsets[number + 1]]
+
+    def _has_field(self, field: str) -> bool:
+        return f"{field}.tokens.offsets" in self._sections
+
+    def _gram_tokens(self, field: str, gram: str) -> Iterable[int]:
+        name = f"{field}.grams"
+        count = len(self._sections[f"{name}.offsets"]) - 1
+        number = bisect.bisect_left(range(count), gram, key=lambda n: self._string(name, n))
+        if number < count and self._string(name, number) == gram:
+            return self._list(f"{field}.gram_tokens", number)
+        return ()
+
+    def _token(self, field: str, key: int) -> str:
+        return self._string(f"{field}.tokens", key)
+
+    def _books(self, field: str, key: int) -> Iterable[int]:
+        return self._list(f"{field}.postings", key)
+
+    def _title_key(self, book_id: int) -> int:
+        return self._sections["books.title_ranks"][bisect.bisect_left(self._sections["books.ids"], book_id)]
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _pack_strings(sections: Dict[str, array], name: str, values: Iterable[str]) -> None:
+    """Store strings as one UTF-8 blob plus an array of n + 1 offsets."""
+    data = bytearray()
+    offsets = array("I", [0])
+    for value in values:
+        data += value.encode()
+        offsets.append(len(data))
+    sections[f"{name}.offsets"] = offsets
+    sections[f"{name}.data"] = array("B", data)
+
+
+def _pack_lists(sections: Dict[str, array], name: str, typecode: str, lists: Iterable[Iterable[int]]) -> None:
+    """Store integer lists as one flat array plus an array of n + 1 offsets."""
+    values = array(typecode)
+    offsets = array("I", [0])
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    sections[f"{name}.offsets"] = offsets
+    sections[f"{name}.values"] = values
+
+
+def _write_index_file(path: str, version: str, sections: Dict[str, array]) -> None:
+    """Write magic, header size, JSON header and the 8-byte aligned arrays, then rename into place."""
+    layout = {}
+    offset = 0
+    for name, values in sections.items():
+        offset = _align(offset)
+        layout[name] = [offset, values.typecode, len(values) * values.itemsize]
+        offset += len(values) * values.itemsize
+    header = json.dumps({"format": INDEX_FORMAT, "byteorder": sys.byteorder,
+                         "version": version, "sections": layout}).encode()
+    data_start = _align(len(INDEX_MAGIC) + 4 + len(header))
+
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as index_file:
+            index_file.write(INDEX_MAGIC + struct.pack("<I", len(header)) + header)
+            for name, values in sections.items():
+                index_file.write(b"\0" * (data_start + layout[name][0] - index_file.tell()))
+                values.tofile(index_file)
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def index_path() -> str:
+    """The search index file of the current database, kept next to it like its -wal file."""
+    return f"{database.DATABASE}-search"
+
+
+def open_index(path: str, version: str) -> Optional[MappedTrigramIndex]:
+    """Map a saved index if it exists, is readable and was built for this catalog version."""
+    try:
+        index = MappedTrigramIndex(path)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, struct.error):
+        # Missing, foreign, truncated or malformed: the caller rebuilds it
+        return None
+    return index if index.version == version else None
+
+
+def build_index(path: str, version: str) -> MappedTrigramIndex:
+    """Build the index from the catalog, save it to path and map the saved file."""
+    TrigramIndex(get_all_books(), version).save(path)
+    return MappedTrigramIndex(path)
+
+
+_index: Optional[MappedTrigramIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> MappedTrigramIndex:
+    """
+    Get the shared search index.
+
+    The saved file is mapped as long as it matches the catalog version; it is
+    only rebuilt (by whichever worker notices first) after the catalog changed.
+    """
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            index = _index
+            if index is None or index.version != version:
+                path = index_path()
+                index = open_index(path, version) or build_index(path, version)
+                _index = index
+    return index
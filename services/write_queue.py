@@ -0,0 +1,196 @@
+"""
+Write Queue Module - Group commit for borrow and return operations
+Request threads hand their write to a single writer thread, which applies
+queued writes together in one short transaction per shard (one fsync per
+batch instead of one per operation) and reports each caller's own result.
+A batch that fails as a whole is reported to its callers as the exception,
+and callers never wait on a writer thread that is gone.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import open_shard_connection
+
+WriteWork = Callable[[sqlite3.Connection], Tuple[bool, str]]
+
+MAX_BATCH_SIZE = 64  # writes committed together at most
+MAX_BATCH_LATENCY = 0.005  # seconds the first write of a batch may wait for company
+SUBMIT_TIMEOUT = 30.0  # seconds a caller waits for its write before giving up
+
+
+class WriteQueue:
+    """
+    Single writer thread with group commit.
+
+    Each submitted work item is a function taking the writer's connection and
+    returning (success, reason). Items run inside a savepoint of the shared
+    batch transaction (see database._run_in_transaction), so one failed item
+    is rolled back on its own while the rest of the batch still commits.
+    """
+
+    def __init__(self, max_batch_size: int = MAX_BATCH_SIZE, max_latency: float = MAX_BATCH_LATENCY):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.batches_committed = 0
+        self._pending: "queue.Queue[Tuple[WriteWork, int, Future]]" = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="library-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish the queued writes and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def is_running(self) -> bool:
+        """Check whether the writer thread is alive and accepting writes."""
+        thread = self._thread
+        return thread is not None and thread.is_alive() and not self._stopping.is_set()
+
+    def submit(self, work: WriteWork, shard: int = 0, timeout: float = SUBMIT_TIMEOUT) -> Tuple[bool, str]:
+        """
+        Queue a write against a shard and wait until its batch is committed.
+
+        A write still queued after timeout seconds is withdrawn; one the
+        writer has already started is waited for, so a caller never hears
+        "failed" about a write that may still commit.
+
+        Raises:
+            RuntimeError: if the queue is stopped or its writer thread has died
+                (the write was not applied)
+            TimeoutError: if the write was withdrawn unapplied after timeout seconds
+            Exception: whatever failed the write's batch as a whole (rolled back)
+        """
+        if not self.is_running():
+            raise RuntimeError("write queue is not running")
+        future: Future = Future()
+        self._pending.put((work, shard, future))
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise
+            return future.result()
+
+    def _next_batch(self) -> List[Tuple[WriteWork, int, Future]]:
+        """Wait for a first write, then gather more until the batch is full or max_latency passes."""
+        try:
+            batch = [self._pending.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        connections: Dict[int, sqlite3.Connection] = {}
+        by_shard: Dict[int, List[Tuple[WriteWork, Future]]] = {}
+        try:
+            while not (self._stopping.is_set() and self._pending.empty()):
+                by_shard = {}
+                for work, shard, future in self._next_batch():
+                    by_shard.setdefault(shard, []).append((work, future))
+                for shard, batch in by_shard.items():
+                    try:
+                        if shard not in connections:
+                            connections[shard] = open_shard_connection(shard)
+                        self._commit_batch(connections[shard], batch)
+                    except Exception as e:
+                        # Start the shard over on a fresh connection; this batch's callers get the error
+                        self._close_quietly(connections.pop(shard, None))
+                        self._fail(batch, e)
+        finally:
+            for conn in connections.values():
+                self._close_quietly(conn)
+            # Whatever is still waiting would otherwise wait for a writer that is gone
+            stopped = RuntimeError("write queue stopped")
+            for batch in by_shard.values():
+                self._fail(batch, stopped)
+            while True:
+                try:
+                    _, _, future = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                self._fail([(None, future)], stopped)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[WriteWork, Future]], error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    @staticmethod
+    def _close_quietly(conn: Optional[sqlite3.Connection]) -> None:
+        try:
+            if conn is not None:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[Tuple[WriteWork, Future]]) -> None:
+        # Writes whose callers gave up (see submit) are dropped
+        batch = [(work, future) for work, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for work, _ in batch:
+                results.append(work(conn))
+            conn.commit()
+            self.batches_committed += 1
+        except Exception:
+            conn.rollback()
+            results = [(False, "error")] * len(batch)
+
+        # Callers only hear back once their write is durable
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_write_queue: Optional[WriteQueue] = None
+
+
+def start_write_queue(max_batch_size: int = MAX_BATCH_SIZE, max_latency: float = MAX_BATCH_LATENCY) -> WriteQueue:
+    """Start the shared write queue used by the borrow/return services."""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue(max_batch_size, max_latency)
+        _write_queue.start()
+    return _write_queue
+
+
+def stop_write_queue() -> None:
+    """Drain and stop the shared write queue; writes then run directly again."""
+    global _write_queue
+    if _write_queue is not None:
+        _write_queue.stop()
+        _write_queue = None
+
+
+def get_write_queue() -> Optional[WriteQueue]:
+    """Get the shared write queue, or None when writes run directly."""
+    return _write_queue
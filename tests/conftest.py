@@ -1,8 +1,33 @@
 import os
 import sys
+from datetime import datetime, timedelta
+
 import pytest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from database import get_db_connection
+from app import create_app
+from database import close_connection_pools, get_db_connection, init_database, record_borrow
+from services.fee_memo import late_fee_memo
+
+
+def remove_database(db_path):
+    """Close pooled connections and delete the database with its WAL and search index files."""
+    close_connection_pools()
+    for path in (db_path, db_path + "-wal", db_path + "-shm", db_path + "-search"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def add_overdue_loan(patron_id, book_id, days_overdue):
+    """Record an open loan that is days_overdue days (and an hour) past its due date (negative: not due yet)."""
+    due = datetime.now() - timedelta(days=days_overdue, hours=1)
+    record_borrow(patron_id, book_id, due - timedelta(days=14), due, 5)
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
 
 
 @pytest.fixture(autouse=True)
@@ -14,8 +39,8 @@ def reset_database():
     db_path = "library.db"
 
 
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    remove_database(db_path)
+    late_fee_memo.clear()
 
 
     conn = get_db_connection()
@@ -45,9 +70,11 @@ def reset_database():
     conn.commit()
     conn.close()
 
+    # Remaining tables (catalog metadata, indexes, ...) come from the app schema
+    init_database()
+
   
     yield
 
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    remove_database(db_path)
 
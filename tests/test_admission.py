@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from app import create_app
+from routes import admission, borrowing_routes
+from routes.admission import AdmissionController
+
+
+def test_admits_up_to_limit_then_queues_then_rejects():
+    """Test slots, then the wait queue, then immediate rejection"""
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    assert controller.acquire()
+
+    waiter_admitted = []
+    waiter = threading.Thread(target=lambda: waiter_admitted.append(controller.acquire()))
+    waiter.start()
+    while controller.stats()["queue_depth"] == 0:
+        time.sleep(0.001)
+    assert not controller.acquire()  # queue full
+    controller.release()
+    waiter.join()
+
+    assert waiter_admitted == [True]
+    stats = controller.stats()
+    assert stats["in_flight"] == 1 and stats["queue_depth"] == 0
+    assert stats["admitted"] == 2 and stats["rejected_queue_full"] == 1
+
+
+def test_waiting_request_times_out():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.01)
+    assert controller.acquire()
+    assert not controller.acquire()
+    assert controller.stats()["rejected_timeout"] == 1
+    assert controller.stats()["queue_depth"] == 0
+
+
+@pytest.mark.parametrize("settings", [
+    {"max_in_flight": 0}, {"max_in_flight": 1, "max_queue": -1}, {"max_in_flight": 1, "queue_timeout": -1},
+])
+def test_rejects_bad_limits(settings):
+    with pytest.raises(ValueError):
+        AdmissionController(**settings)
+
+
+def test_limits_are_per_blueprint_and_configurable():
+    """Test defaults can be changed or turned off per blueprint"""
+    app = create_app({"ADMISSION": {"borrowing": {"max_in_flight": 7}, "catalog": None}})
+    controllers = app.extensions["admission"]
+    assert controllers["borrowing"].max_in_flight == 7
+    assert controllers["borrowing"].max_queue == admission.DEFAULT_ADMISSION_LIMITS["borrowing"]["max_queue"]
+    assert "catalog" not in controllers
+    assert controllers["api"] is not controllers["borrowing"]
+
+
+@pytest.fixture
+def saturated_app():
+    """An app whose write slots are all taken and whose queues take nobody."""
+    app = create_app({"ADMISSION": {name: {"max_in_flight": 1, "max_queue": 0}
+                                    for name in admission.DEFAULT_ADMISSION_LIMITS}})
+    for controller in app.extensions["admission"].values():
+        controller.acquire()
+    return app
+
+
+def test_saturated_html_writes_get_503_with_retry_after(saturated_app, monkeypatch):
+    """Test form posts are turned away without reaching the service layer"""
+    monkeypatch.setattr(borrowing_routes, "borrow_book_by_patron", lambda *args: pytest.fail("borrow ran"))
+    client = saturated_app.test_client()
+    for path, form in [("/borrow", {"patron_id": "123456", "book_id": "1"}),
+                       ("/return", {"patron_id": "123456", "book_id": "1"}),
+                       ("/add_book", {"title": "T", "author": "A", "isbn": "1234567890123", "total_copies": "1"})]:
+        response = client.post(path, data=form)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(admission.RETRY_AFTER_SECONDS)
+
+
+def test_saturated_api_writes_get_json_503(saturated_app):
+    client = saturated_app.test_client()
+    response = client.post("/api/checkout", json={"patron_id": "123456", "book_ids": [1]})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(admission.RETRY_AFTER_SECONDS)
+    assert "error" in response.get_json()
+
+
+def test_reads_are_never_held_back(saturated_app):
+    """Test reads and form pages pass while writes are saturated"""
+    client = saturated_app.test_client()
+    assert client.get("/catalog").status_code == 200
+    assert client.get("/return").status_code == 200
+    assert client.get("/add_book").status_code == 200
+    assert client.get("/api/search?q=gatsby&type=title").status_code == 200
+
+
+def test_writes_release_their_slot():
+    """Test a finished write (successful or not) frees its slot"""
+    app = create_app({"ADMISSION": {"borrowing": {"max_in_flight": 1, "max_queue": 0}}})
+    client = app.test_client()
+    for _ in range(3):
+        assert client.post("/borrow", data={"patron_id": "123456", "book_id": "1"}).status_code == 302
+    client.post("/borrow", data={"patron_id": "123456", "book_id": "nope"})
+    stats = app.extensions["admission"]["borrowing"].stats()
+    assert stats["in_flight"] == 0 and stats["admitted"] == 4
+
+
+def test_metrics_export_queue_depth_and_rejections(saturated_app):
+    client = saturated_app.test_client()
+    client.post("/borrow", data={"patron_id": "123456", "book_id": "1"})
+    stats = client.get("/api/metrics").get_json()["admission"]
+    assert stats["borrowing"]["rejected_queue_full"] == 1
+    assert stats["borrowing"]["in_flight"] == 1
+    assert stats["api"]["queue_depth"] == 0
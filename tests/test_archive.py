@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from database import get_db_connection, iter_borrow_records
+from services.archive_service import archive_returned_records
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, get_patron_status_report
+
+
+def add_returned_loan(patron_id, book_id, returned_days_ago):
+    """Insert a returned borrow record."""
+    returned = datetime.now() - timedelta(days=returned_days_ago)
+    borrowed = returned - timedelta(days=5)
+    conn = get_db_connection()
+    conn.execute('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (patron_id, book_id, borrowed.isoformat(), (borrowed + timedelta(days=14)).isoformat(),
+          returned.isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def table_count(table):
+    conn = get_db_connection()
+    count = conn.execute(f"SELECT COUNT(*) AS count FROM {table}").fetchone()["count"]
+    conn.close()
+    return count
+
+
+def test_archive_moves_only_old_returned_records():
+    """Test open loans and recent returns stay in the hot table"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_returned_loan("123456", 1, 200)
+    add_returned_loan("123456", 1, 10)
+    borrow_book_by_patron("123456", 1)
+
+    assert archive_returned_records(older_than_days=90) == 1
+    assert table_count("borrow_records") == 2
+    assert table_count("borrow_records_archive") == 1
+
+
+def test_archive_runs_in_batches():
+    """Test several batches are used and max_batches stops early"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    for _ in range(5):
+        add_returned_loan("123456", 1, 100)
+
+    assert archive_returned_records(older_than_days=90, batch_size=2, max_batches=2) == 4
+    assert archive_returned_records(older_than_days=90, batch_size=2) == 1
+    assert table_count("borrow_records") == 0
+
+
+def test_history_includes_archived_records():
+    """Test the patron report and exports still see archived loans"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 3)
+    add_returned_loan("123456", 1, 200)
+    borrow_book_by_patron("123456", 2)
+    archive_returned_records(older_than_days=90)
+
+    report = get_patron_status_report("123456")
+    assert [record["title"] for record in report["borrowing_history"]] == ["Dune", "Emma"]
+    assert len(list(iter_borrow_records())) == 2
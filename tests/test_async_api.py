@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from conftest import add_overdue_loan
+from routes import async_api_routes
+from services import library_service
+from services.payment_service import PaymentGateway
+
+
+@pytest.mark.parametrize("url", [
+    "/late_fee/111111/1",
+    "/search?q=gatsby&type=title",
+    "/search?q=orwell&type=author&limit=1",
+    "/overdue?report=overdue",
+    "/holds/111111/1",
+    "/popular?period=all",
+    "/search",
+    "/popular?period=decade",
+    "/overdue?cursor=broken",
+    "/patron/111111/status",
+    "/patron/111111/history?limit=1",
+    "/patron/abc/status",
+])
+def test_async_endpoints_match_sync(client, url):
+    """Test each async endpoint answers exactly like its /api counterpart"""
+    add_overdue_loan("111111", 1, 3)
+    sync = client.get("/api" + url)
+    library_service.late_fee_memo.clear()
+    asynchronous = client.get("/api/async" + url)
+    assert asynchronous.status_code == sync.status_code
+    assert asynchronous.get_json() == sync.get_json()
+
+
+def test_async_bulk_late_fees(client):
+    """Test the bulk endpoint takes the same body and validation"""
+    add_overdue_loan("111111", 1, 3)
+    data = client.post("/api/async/late_fees", json={"patrons": ["111111"]}).get_json()
+    assert data["patrons"][0]["total_fees"] == 1.5
+    assert client.post("/api/async/late_fees", json={"items": []}).status_code == 400
+
+
+def test_db_work_runs_on_bounded_executor(client, monkeypatch):
+    """Test database calls leave the request thread for the database executor"""
+    threads = []
+    real = async_api_routes.search_response
+    monkeypatch.setattr(async_api_routes, "search_response",
+                        lambda args: threads.append(threading.current_thread().name) or real(args))
+    assert client.get("/api/async/search?q=gatsby").status_code == 200
+    assert threads[0].startswith("api-db")
+
+
+def test_pay_late_fee_awaits_gateway(client, mocker):
+    """Test a real overdue fee is read on the database executor and charged on the gateway executor"""
+    add_overdue_loan("111111", 1, 5)
+    threads = {}
+    real_prepare = async_api_routes.prepare_late_fee_payment
+    mocker.patch.object(async_api_routes, "prepare_late_fee_payment", side_effect=lambda *args: (
+        threads.setdefault("prepare", threading.current_thread().name), real_prepare(*args))[1])
+    gateway = mocker.Mock(spec=PaymentGateway)
+    gateway.process_payment.side_effect = lambda **kwargs: (
+        threads.setdefault("gateway", threading.current_thread().name), (True, "txn_1", "Approved"))[1]
+    mocker.patch.object(library_service, "PaymentGateway", return_value=gateway)
+
+    response = client.post("/api/async/late_fee/111111/1/pay")
+    assert response.status_code == 200
+    assert response.get_json()["transaction_id"] == "txn_1"
+    assert threads["prepare"].startswith("api-db")
+    assert threads["gateway"].startswith("api-gateway")
+    gateway.process_payment.assert_called_once_with(
+        patron_id="111111", amount=2.5, description="Late fees for 'The Great Gatsby'")
+
+
+def test_pay_late_fees_reads_the_real_fee(client, mocker):
+    """Test the sync payment path charges the fee calculate_late_fee_for_book returns"""
+    add_overdue_loan("111111", 1, 5)
+    gateway = mocker.Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_2", "Approved")
+    assert library_service.pay_late_fees("111111", 1, gateway) == (True, "Payment successful! Approved", "txn_2")
+    assert gateway.process_payment.call_args.kwargs["amount"] == 2.5
+
+
+def test_pay_late_fee_without_fee(client, mocker):
+    """Test a loan with nothing owed is refused without calling the gateway"""
+    gateway = mocker.Mock(spec=PaymentGateway)
+    mocker.patch.object(library_service, "PaymentGateway", return_value=gateway)
+    response = client.post("/api/async/late_fee/111111/1/pay")
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+    gateway.process_payment.assert_not_called()
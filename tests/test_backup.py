@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import cli
+import database
+from app import create_app
+from database import check_database_file, get_all_books, get_db_connection
+from services import backup_service
+from services.backup_service import backup_database, restore_database, verify_backup
+from services.library_service import add_book_to_catalog, borrow_book_by_patron
+
+
+@pytest.fixture
+def books():
+    for i in range(200):
+        add_book_to_catalog(f"Book {i}", "Author", f"{9780000000000 + i}", 2)
+
+
+def count_books(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_is_a_sound_standalone_copy(books, tmp_path):
+    """Test the backup holds the catalog, passes integrity_check and needs no WAL file"""
+    path = str(tmp_path / "library.db")
+    report = backup_database(path, pages=4, pause=0)
+    assert report["files"] == [path]
+    assert report["pages"] > 4
+    assert count_books(path) == 200
+    assert check_database_file(path) == ["ok"]
+    assert verify_backup(path) == {path: []}
+    assert sorted(os.listdir(tmp_path)) == ["library.db"]
+
+
+def test_backup_is_a_snapshot_while_borrows_continue(books, tmp_path, monkeypatch):
+    """Test commits made between backup steps neither tear the copy nor wait for it"""
+    commits = []
+
+    def borrow_instead_of_sleeping(seconds):
+        commits.append(borrow_book_by_patron("123456", len(commits) % 4 + 1)[0])
+        add_book_to_catalog(f"Late {len(commits)}", "Author", f"{9790000000000 + len(commits)}", 1)
+
+    monkeypatch.setattr(database, "time", SimpleNamespace(sleep=borrow_instead_of_sleeping))
+    path = str(tmp_path / "library.db")
+    backup_database(path, pages=2, pause=1)
+
+    assert len(commits) > 2 and all(commits[:4])
+    assert count_books(path) == 200
+    assert check_database_file(path) == ["ok"]
+    assert len(get_all_books()) == 200 + len(commits)
+
+
+def test_restore_replaces_live_database(books, tmp_path):
+    """Test restoring a backup brings back its contents and keeps the app working"""
+    path = str(tmp_path / "library.db")
+    backup_database(path)
+    add_book_to_catalog("Added after backup", "Author", "1111111111111", 1)
+
+    report = restore_database(path)
+    assert report["pages"] > 0
+    assert len(get_all_books()) == 200
+    assert add_book_to_catalog("Added after restore", "Author", "2222222222222", 1)[0]
+    conn = get_db_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_corrupt_backup_is_not_restored(books, tmp_path):
+    """Test a damaged backup fails verification and leaves the live database alone"""
+    path = str(tmp_path / "library.db")
+    backup_database(path)
+    with open(path, "r+b") as backup_file:
+        backup_file.seek(0)
+        backup_file.write(b"not a database at all")
+
+    assert verify_backup(path)[path]
+    with pytest.raises(ValueError):
+        restore_database(path)
+    assert len(get_all_books()) == 200
+
+
+def test_missing_backup_is_reported(tmp_path):
+    path = str(tmp_path / "nothing.db")
+    assert verify_backup(path) == {path: ["file is missing"]}
+
+
+@pytest.mark.parametrize("pages, pause", [(0, 0), (10, -1)])
+def test_rejects_bad_step_settings(tmp_path, pages, pause):
+    with pytest.raises(ValueError):
+        backup_database(str(tmp_path / "library.db"), pages=pages, pause=pause)
+
+
+def test_backup_endpoint(books, tmp_path, monkeypatch):
+    """Test POST /api/backup writes a timestamped backup into the backup directory"""
+    monkeypatch.setattr(backup_service, "BACKUP_DIR", str(tmp_path))
+    response = create_app().test_client().post("/api/backup")
+    assert response.status_code == 201
+    path = response.get_json()["path"]
+    assert os.path.dirname(path) == str(tmp_path)
+    assert verify_backup(path) == {path: []}
+
+
+def test_concurrent_backup_requests_get_409(books, tmp_path, monkeypatch):
+    """Test a backup requested while one runs is turned away with 409 instead of failing"""
+    monkeypatch.setattr(backup_service, "BACKUP_DIR", str(tmp_path))
+    copy = backup_service.copy_database_file
+
+    def slow_copy(*args):
+        time.sleep(0.3)
+        return copy(*args)
+
+    monkeypatch.setattr(backup_service, "copy_database_file", slow_copy)
+    app = create_app()
+    statuses = []
+
+    def request_backup():
+        statuses.append(app.test_client().post("/api/backup").status_code)
+
+    threads = [threading.Thread(target=request_backup) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201, 409, 409, 409]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".partial")]
+
+
+def test_failed_backup_reports_500_and_leaves_no_partial_file(books, tmp_path, monkeypatch):
+    """Test a copy error is answered with 500 and its temporary file is removed"""
+    monkeypatch.setattr(backup_service, "BACKUP_DIR", str(tmp_path))
+
+    def broken_copy(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(backup_service, "copy_database_file", broken_copy)
+    response = create_app().test_client().post("/api/backup")
+    assert response.status_code == 500
+    assert "disk I/O error" in response.get_json()["error"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_backups_use_their_own_temporary_file(books, tmp_path):
+    """Test a stale .partial file from another backup is neither reused nor removed"""
+    path = str(tmp_path / "library.db")
+    (tmp_path / "library.db.partial").write_bytes(b"another backup in progress")
+    backup_database(path, pause=0)
+    assert (tmp_path / "library.db.partial").read_bytes() == b"another backup in progress"
+    assert check_database_file(path) == ["ok"]
+
+
+def test_default_backup_path():
+    assert backup_service.default_backup_path(datetime(2024, 3, 1, 9, 5, 7)).endswith("library-20240301-090507.db")
+
+
+def test_cli_backup_verify_restore(books, tmp_path, capsys):
+    """Test the backup, verify-backup and restore commands"""
+    path = str(tmp_path / "library.db")
+    assert cli.main(["backup", "--output", path, "--pages", "8", "--pause", "0"]) == 0
+    assert cli.main(["verify-backup", path]) == 0
+    add_book_to_catalog("Added after backup", "Author", "1111111111111", 1)
+    assert cli.main(["restore", path]) == 0
+    assert len(get_all_books()) == 200
+    assert "ok" in capsys.readouterr().out
+
+    os.remove(path)
+    assert cli.main(["verify-backup", path]) == 1
+    assert cli.main(["restore", path]) == 1
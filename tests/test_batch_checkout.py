@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+from database import get_book_by_id, get_patron_borrow_count, record_borrow
+from services import library_service
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, borrow_books_by_patron, return_books_by_patron
+)
+from services.write_queue import start_write_queue, stop_write_queue
+
+
+@pytest.fixture
+def books():
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 1)
+    add_book_to_catalog("Ulysses", "James Joyce", "3333333333333", 1)
+
+
+def test_checkout_stack(books, monkeypatch):
+    """Test a stack is borrowed with one book lookup and one transaction"""
+    calls = []
+    real_lookup, real_write = library_service.get_books_by_ids, library_service.record_borrows
+    monkeypatch.setattr(library_service, "get_books_by_ids", lambda ids: calls.append("lookup") or real_lookup(ids))
+    monkeypatch.setattr(library_service, "record_borrows",
+                        lambda *args, **kwargs: calls.append("write") or real_write(*args, **kwargs))
+    success, message, results = borrow_books_by_patron("123456", [1, 2, 3])
+
+    assert success
+    assert message.startswith("Borrowed 3 of 3 books")
+    assert [result["success"] for result in results] == [True, True, True]
+    assert calls == ["lookup", "write"]
+    assert get_patron_borrow_count("123456") == 3
+    assert get_book_by_id(2)["available_copies"] == 0
+
+
+def test_checkout_reports_each_book(books):
+    """Test missing and unavailable books fail on their own"""
+    borrow_book_by_patron("111111", 2)
+    success, message, results = borrow_books_by_patron("123456", [1, 2, 99, 1])
+    assert success
+    assert message.startswith("Borrowed 2 of 4 books")
+    assert [result["success"] for result in results] == [True, False, False, True]
+    assert "Place a hold" in results[1]["message"]
+    assert results[2]["message"] == "Book not found."
+    assert get_book_by_id(1)["available_copies"] == 0
+
+
+def test_checkout_limit_checked_for_whole_stack(books):
+    """Test a stack that would pass the limit is refused as a whole"""
+    add_book_to_catalog("Persuasion", "Jane Austen", "4444444444444", 3)
+    due = datetime.now() + timedelta(days=14)
+    for _ in range(3):
+        record_borrow("123456", 4, datetime.now(), due, 5)
+    success, message, results = borrow_books_by_patron("123456", [1, 2, 3, 99])
+    assert not success
+    assert "maximum borrowing limit" in message
+    assert results == []
+    assert get_book_by_id(2)["available_copies"] == 1
+
+
+def test_return_stack(books):
+    """Test a stack is returned together with its late fees"""
+    due = datetime.now() - timedelta(days=3, hours=1)
+    record_borrow("123456", 1, due - timedelta(days=14), due, 5)
+    borrow_books_by_patron("123456", [2, 3])
+
+    success, message, results = return_books_by_patron("123456", [1, 2, 3, 3])
+    assert success
+    assert message == "Returned 3 of 4 books. Late fees owed: $1.50."
+    assert [result["late_fee"] for result in results] == [1.5, 0, 0, 0.0]
+    assert results[3]["success"] is False
+    assert get_patron_borrow_count("123456") == 0
+    assert get_book_by_id(3)["available_copies"] == 1
+
+
+def test_batches_through_write_queue(books):
+    """Test batches go through the group-commit queue as a single write"""
+    queue = start_write_queue(max_latency=0.01)
+    try:
+        assert borrow_books_by_patron("123456", [1, 2])[0]
+        assert return_books_by_patron("123456", [1, 2])[0]
+        assert queue.batches_committed == 2
+    finally:
+        stop_write_queue()
+    assert get_patron_borrow_count("123456") == 0
+
+
+def test_checkout_endpoints(client):
+    """Test the JSON endpoints return per-book results"""
+    data = client.post("/api/checkout", json={"patron_id": "123456", "book_ids": [1, 2]}).get_json()
+    assert data["success"] is True
+    assert len(data["results"]) == 2
+
+    data = client.post("/api/return", json={"patron_id": "123456", "book_ids": [1, 2, 2]}).get_json()
+    assert [result["success"] for result in data["results"]] == [True, True, False]
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    {"book_ids": [1]},
+    {"patron_id": "123456", "book_ids": ["1"]},
+    {"patron_id": "123456", "book_ids": []},
+    {"patron_id": "12", "book_ids": [1]},
+])
+def test_checkout_endpoint_validation(client, body):
+    """Test malformed batches are rejected"""
+    assert client.post("/api/checkout", json=body).status_code == 400
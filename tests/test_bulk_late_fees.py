@@ -0,0 +1,83 @@
+import pytest
+from conftest import add_overdue_loan
+from database import get_borrowed_books_for_patrons, get_db_connection
+from services import library_service
+from services.library_service import add_book_to_catalog, calculate_late_fee_for_book, calculate_late_fees_bulk
+
+
+@pytest.fixture
+def books():
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 3)
+
+
+def test_bulk_matches_single_lookups(books):
+    """Test bulk results equal the per-item endpoint logic, in input order"""
+    add_overdue_loan("111111", 1, 3)
+    add_overdue_loan("222222", 2, 10)
+    pairs = [("222222", 2), ("111111", 1), ("111111", 2)]
+
+    bulk = calculate_late_fees_bulk(pairs)
+    library_service.late_fee_memo.clear()
+    assert bulk == [{"patron_id": p, "book_id": b, **calculate_late_fee_for_book(p, b)} for p, b in pairs]
+    assert [item["fee"] for item in bulk] == [6.5, 1.5, 0]
+
+
+def test_bulk_uses_one_query_for_all_patrons(books, monkeypatch):
+    """Test memo misses are loaded with a single batched lookup"""
+    add_overdue_loan("111111", 1, 3)
+    calls = []
+    monkeypatch.setattr(library_service, "get_borrowed_books_for_patrons",
+                        lambda patron_ids: calls.append(patron_ids) or get_borrowed_books_for_patrons(patron_ids))
+    calculate_late_fees_bulk([("111111", 1), ("222222", 1), ("333333", 2)])
+    calculate_late_fees_bulk([("111111", 1), ("222222", 1)])
+    assert len(calls) == 1
+
+
+def test_patron_lookup_uses_open_loan_index():
+    """Test the batched query reads the open-loan patron index"""
+    conn = get_db_connection()
+    plan = " ".join(row[3] for row in conn.execute('''
+        EXPLAIN QUERY PLAN SELECT book_id FROM borrow_records
+        WHERE patron_id IN (?, ?) AND return_date IS NULL ORDER BY patron_id, borrow_date
+    ''', ("111111", "222222")))
+    conn.close()
+    assert "idx_borrow_records_open_patron" in plan
+
+
+def test_bulk_endpoint_items(client):
+    """Test the endpoint answers many pairs at once"""
+    add_overdue_loan("111111", 1, 3)
+    response = client.post("/api/late_fees", json={"items": [
+        {"patron_id": "111111", "book_id": 1},
+        {"patron_id": "123456", "book_id": 3},
+    ]})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["count"] == 2
+    assert data["results"][0]["fee"] == 1.5
+    assert data["results"][1]["status"] == "Retrned on time"
+
+
+def test_bulk_endpoint_patrons(client):
+    """Test the patrons form lists every current loan with a total"""
+    add_overdue_loan("111111", 1, 3)
+    add_overdue_loan("111111", 2, 10)
+    data = client.post("/api/late_fees", json={"patrons": ["111111", "999999"]}).get_json()
+    assert data["patrons"][0]["total_fees"] == 8.0
+    assert len(data["patrons"][0]["loans"]) == 2
+    assert data["patrons"][1] == {"patron_id": "999999", "loans": [], "total_fees": 0}
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    {},
+    {"items": []},
+    {"items": [{"patron_id": "12", "book_id": 1}]},
+    {"items": [{"patron_id": "111111", "book_id": "1"}]},
+    {"patrons": ["abcdef"]},
+    {"items": [{"patron_id": "111111", "book_id": 1}], "patrons": ["111111"]},
+])
+def test_bulk_endpoint_validation(client, body):
+    """Test malformed requests are rejected"""
+    assert client.post("/api/late_fees", json=body).status_code == 400
@@ -0,0 +1,101 @@
+import pytest
+from app import create_app
+from database import get_all_books, get_db_connection
+from services import catalog_snapshot
+from services.catalog_snapshot import BookView, PackedStrings, get_catalog_snapshot
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, search_books_in_catalog
+
+
+@pytest.fixture
+def books():
+    add_book_to_catalog("The Hobbit", "J. R. R. Tolkien", "1111111111111", 2)
+    add_book_to_catalog("Émile", "Jean-Jacques Rousseau", "2222222222222", 1)
+    add_book_to_catalog("The Silmarillion", "J. R. R. Tolkien", "3333333333333", 1)
+    add_book_to_catalog("Dune", "Frank Herbert", "4444444444444", 3)
+
+
+def test_snapshot_matches_books_table(books):
+    """Test the snapshot lists the same books, in the same order, as get_all_books"""
+    assert get_catalog_snapshot().books() == get_all_books()
+    assert [dict(book) for book in get_catalog_snapshot().books()] == get_all_books()
+
+
+@pytest.mark.parametrize("term, field", [
+    ("the", "title"), ("É", "title"), ("tolkien", "author"), ("J. R.", "author"), ("zzz", "title"), ("", "title"),
+])
+def test_search_matches_substring_scan(books, term, field):
+    """Test snapshot search finds what a case-insensitive scan of every book finds"""
+    expected = [book for book in get_all_books() if term.lower() in book[field].lower()]
+    assert get_catalog_snapshot().search(term, field) == expected
+    assert get_catalog_snapshot().search(term, field, limit=1, offset=1) == expected[1:2]
+
+
+def test_catches_up_incrementally(books):
+    """Test new books and copy counts are picked up without reloading the snapshot"""
+    snapshot = get_catalog_snapshot()
+    add_book_to_catalog("Emma", "Jane Austen", "5555555555555", 1)
+    borrow_book_by_patron("123456", 1)
+    assert get_catalog_snapshot() is snapshot
+    assert [book["title"] for book in snapshot.search("emma", "title")] == ["Emma"]
+    assert snapshot.get(1)["available_copies"] == 1
+    assert snapshot.books() == get_all_books()
+
+
+def test_sees_commits_from_other_connections(books):
+    """Test a write on another connection (e.g. another worker) is seen on the next read"""
+    get_catalog_snapshot()
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET available_copies = 0 WHERE id = 4")
+    conn.commit()
+    conn.close()
+    assert get_catalog_snapshot().get(4)["available_copies"] == 0
+
+
+def test_unchanged_database_is_not_reread(books, monkeypatch):
+    """Test reads without commits in between do not query the books table"""
+    snapshot = get_catalog_snapshot()
+    monkeypatch.setattr(catalog_snapshot, "read_connection", lambda: pytest.fail("books table was read"))
+    assert get_catalog_snapshot() is snapshot
+
+
+def test_reloads_when_books_are_removed(books):
+    """Test a change to existing books replaces the snapshot"""
+    snapshot = get_catalog_snapshot()
+    conn = get_db_connection()
+    conn.execute("DELETE FROM books WHERE id = 2")
+    conn.commit()
+    conn.close()
+    assert get_catalog_snapshot() is not snapshot
+    assert get_catalog_snapshot().books() == get_all_books()
+
+
+def test_search_service_uses_snapshot(books):
+    """Test title/author and fuzzy searches return plain dicts from the snapshot"""
+    results = search_books_in_catalog("tolkien", "author", limit=1)
+    assert results == [get_all_books()[1]]
+    assert type(results[0]) is dict
+    assert search_books_in_catalog("Silmarilion", "title", fuzzy=True)[0]["id"] == 3
+
+
+def test_packed_strings():
+    """Test packed strings round-trip and find each string once"""
+    packed = PackedStrings(["abcabc", "Ünïcode", "", "x\0y"])
+    assert [packed[i] for i in range(len(packed))] == ["abcabc", "Ünïcode", "", "xy"]
+    assert list(packed.find("abc")) == [0]
+    assert list(packed.find("c")) == [0, 1]
+    assert list(packed.find("")) == [0, 1, 2, 3]
+
+
+def test_views_have_no_instance_dict(books):
+    """Test views are slotted so a page of them stays small"""
+    view = get_catalog_snapshot().books()[0]
+    assert isinstance(view, BookView)
+    assert not hasattr(view, "__dict__")
+
+
+def test_catalog_page_renders_from_snapshot():
+    """Test the catalog page shows the books"""
+    client = create_app().test_client()
+    page = client.get("/catalog").get_data(as_text=True)
+    assert "The Great Gatsby" in page
+    assert "Not Available" in page
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+from database import get_all_books, get_book_by_id, read_connection, write_connection
+from services.library_service import add_book_to_catalog
+
+
+def test_read_connection_is_read_only():
+    """Test the read pool cannot write"""
+    with read_connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO library_meta (key, value) VALUES ('x', 'y')")
+
+
+def test_read_pool_reuses_connections():
+    """Test the same read connection is handed out again"""
+    with read_connection() as first:
+        pass
+    with read_connection() as second:
+        assert second is first
+
+
+def test_reads_continue_while_writer_holds_lock():
+    """Test readers see the last committed data while a write transaction is open"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    with write_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE books SET available_copies = 0 WHERE id = 1")
+
+        assert get_book_by_id(1)["available_copies"] == 2
+        assert len(get_all_books()) == 1
+        conn.commit()
+
+    assert get_book_by_id(1)["available_copies"] == 0
+
+
+def test_write_pool_rolls_back_abandoned_transaction():
+    """Test a connection returned mid-transaction is rolled back"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    with pytest.raises(RuntimeError):
+        with write_connection() as conn:
+            conn.execute("UPDATE books SET available_copies = 0 WHERE id = 1")
+            raise RuntimeError("request failed")
+
+    assert get_book_by_id(1)["available_copies"] == 2
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from app import create_app
+from cli import main as cli_main
+from database import get_db_connection
+from services.export_service import CHUNK_ROWS, export_table, parse_date_range
+from services.library_service import add_book_to_catalog
+
+
+def add_history(days_ago_list):
+    """Insert returned borrow records borrowed the given number of days ago."""
+    conn = get_db_connection()
+    for days_ago in days_ago_list:
+        borrowed = datetime.now() - timedelta(days=days_ago)
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ("123456", 1, borrowed.isoformat(), (borrowed + timedelta(days=14)).isoformat(),
+              (borrowed + timedelta(days=3)).isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def test_export_books_jsonl():
+    """Test every book becomes one JSON line"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 1)
+    lines = "".join(export_table("books", "jsonl")).splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["Dune", "Emma"]
+
+
+def test_export_history_csv_is_chunked():
+    """Test large exports are split into chunks with one header"""
+    add_history(range(CHUNK_ROWS + 10))
+    chunks = list(export_table("borrow_records", "csv"))
+    assert len(chunks) == 2
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(rows) == CHUNK_ROWS + 10
+    assert rows[0]["patron_id"] == "123456"
+
+
+def test_export_history_date_range():
+    """Test only records borrowed inside the date range are exported"""
+    add_history([1, 10, 40])
+    start, end = parse_date_range((datetime.now() - timedelta(days=20)).date().isoformat(),
+                                  (datetime.now() - timedelta(days=5)).date().isoformat())
+    lines = "".join(export_table("borrow_records", "jsonl", start, end)).splitlines()
+    assert len(lines) == 1
+
+
+def test_export_empty_csv_has_header():
+    """Test an empty table still produces a header"""
+    assert "".join(export_table("borrow_records", "csv")).startswith("id,patron_id")
+
+
+def test_export_route_streams():
+    """Test the export endpoint and its validation"""
+    client = create_app().test_client()
+    response = client.get("/export/books.csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert "The Great Gatsby" in response.get_data(as_text=True)
+
+    assert client.get("/export/books.xml").status_code == 404
+    assert client.get("/export/borrow_records.csv?start=yesterday").status_code == 400
+
+
+def test_cli_export(tmp_path):
+    """Test the CLI writes an export file"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    output = tmp_path / "books.jsonl"
+    assert cli_main(["export", "books", "--output", str(output)]) == 0
+    assert json.loads(output.read_text().splitlines()[0])["isbn"] == "1111111111111"
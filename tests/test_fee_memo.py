@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+from conftest import add_overdue_loan
+from services import library_service
+from services.fee_memo import DailyMemo, late_fee_memo
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, calculate_late_fee_for_book, get_patron_status_report,
+    return_book_by_patron
+)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def count_loan_queries(monkeypatch):
+    """Count calls to get_patron_borrowed_books made by the service layer."""
+    calls = []
+    original = library_service.get_patron_borrowed_books
+    monkeypatch.setattr(library_service, "get_patron_borrowed_books",
+                        lambda patron_id: calls.append(patron_id) or original(patron_id))
+    return calls
+
+
+def test_repeated_lookups_are_served_from_memo(monkeypatch):
+    """Test only the first fee lookup of the day reads the patron's loans"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_overdue_loan("111111", 1, 3)
+    calls = count_loan_queries(monkeypatch)
+
+    first = calculate_late_fee_for_book("111111", 1)
+    assert calculate_late_fee_for_book("111111", 1) == first == {
+        "fee": 1.5, "days_overdue": 3, "status": "3 days overdue"}
+    assert len(calls) == 1
+
+
+def test_return_and_borrow_invalidate(monkeypatch):
+    """Test a return or a new borrow drops the remembered fee"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_overdue_loan("111111", 1, 3)
+    assert calculate_late_fee_for_book("111111", 1)["fee"] == 1.5
+
+    return_book_by_patron("111111", 1)
+    assert calculate_late_fee_for_book("111111", 1)["status"] == "Book not found for this patron"
+    borrow_book_by_patron("111111", 1)
+    assert calculate_late_fee_for_book("111111", 1)["status"] == "Retrned on time"
+
+
+def test_status_report_fills_memo_without_extra_queries(monkeypatch):
+    """Test the patron report assesses fees from the loans it already loaded"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 3)
+    add_overdue_loan("111111", 1, 3)
+    add_overdue_loan("111111", 2, 10)
+    calls = count_loan_queries(monkeypatch)
+
+    assert get_patron_status_report("111111")["total_fees"] == 8.0
+    calculate_late_fee_for_book("111111", 2)
+    assert len(calls) == 1
+
+
+def test_memo_rolls_over_at_midnight_and_honours_expiry():
+    """Test entries vanish with the day or at their own expiry time"""
+    clock = FakeClock(datetime(2025, 3, 10, 23, 0))
+    memo = DailyMemo(clock=clock)
+    memo.put("a", {"fee": 1.0})
+    memo.put("b", {"fee": 2.0}, expires_at=datetime(2025, 3, 10, 23, 30))
+
+    clock.now = datetime(2025, 3, 10, 23, 45)
+    assert memo.get("a") == {"fee": 1.0}
+    assert memo.get("b") is None
+    clock.now = datetime(2025, 3, 11, 0, 1)
+    assert memo.get("a") is None
+
+
+def test_memo_is_bounded():
+    """Test the least recently used entry is dropped when the memo is full"""
+    memo = DailyMemo(maxsize=2)
+    memo.put("a", {})
+    memo.put("b", {})
+    memo.get("a")
+    memo.put("c", {})
+    assert len(memo) == 2
+    assert memo.get("b") is None
+    assert memo.get("a") == {}
+
+
+def test_fee_entry_expires_when_the_fee_changes():
+    """Test an open loan's entry expires when another overdue day starts"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_overdue_loan("111111", 1, 3)
+    calculate_late_fee_for_book("111111", 1)
+    _, expires_at = late_fee_memo._entries[("111111", 1)]
+    assert timedelta(hours=22) < expires_at - datetime.now() < timedelta(hours=24)
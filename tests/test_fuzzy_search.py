@@ -0,0 +1,55 @@
+from services.library_service import add_book_to_catalog, search_books_in_catalog
+from services.search_index import TrigramIndex, bounded_levenshtein
+
+
+def test_bounded_levenshtein_within_limit():
+    """Test edit distance is returned when it is within the bound"""
+    assert bounded_levenshtein("orwel", "orwell", 1) == 1
+    assert bounded_levenshtein("fitzgerld", "fitzgerald", 2) == 1
+
+
+def test_bounded_levenshtein_gives_up():
+    """Test edit distance beyond the bound returns None"""
+    assert bounded_levenshtein("orwell", "tolkien", 2) is None
+    assert bounded_levenshtein("a", "abcd", 2) is None
+
+
+def test_fuzzy_author_misspelled():
+    """Test fuzzy search finds misspelled author names"""
+    add_book_to_catalog("The Great Gatsby", "F. Scott Fitzgerald", "9780743273565", 3)
+    add_book_to_catalog("1984", "George Orwell", "9780451524935", 1)
+
+    assert search_books_in_catalog("Fitzgerld", "author") == []
+    result = search_books_in_catalog("Fitzgerld", "author", fuzzy=True)
+    assert [book["title"] for book in result] == ["The Great Gatsby"]
+
+    result = search_books_in_catalog("Orwel", "author", fuzzy=True)
+    assert result[0]["author"] == "George Orwell"
+
+
+def test_fuzzy_ranked_by_similarity():
+    """Test the closest match comes first"""
+    add_book_to_catalog("Moby Dick", "Herman Melville", "1111111111111", 1)
+    add_book_to_catalog("Mob Rule", "Someone Else", "2222222222222", 1)
+
+    result = search_books_in_catalog("Moby", "title", fuzzy=True)
+    assert result[0]["title"] == "Moby Dick"
+    assert "Mob Rule" in [book["title"] for book in result]
+
+
+def test_fuzzy_sees_new_books():
+    """Test the index picks up books added after it was built"""
+    add_book_to_catalog("Dune", "Frank Herbert", "3333333333333", 1)
+    assert search_books_in_catalog("Herbrt", "author", fuzzy=True)[0]["title"] == "Dune"
+
+    add_book_to_catalog("Emma", "Jane Austen", "4444444444444", 1)
+    assert search_books_in_catalog("Austin", "author", fuzzy=True)[0]["title"] == "Emma"
+
+
+def test_index_requires_every_word():
+    """Test multi-word queries only match books matching all words"""
+    index = TrigramIndex([
+        {"id": 1, "title": "War and Peace", "author": "Leo Tolstoy"},
+        {"id": 2, "title": "Peace Talks", "author": "Jim Butcher"},
+    ])
+    assert [book_id for _, book_id in index.search("war peace", "title")] == [1]
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app import create_app
+from database import get_book_by_id, get_db_connection
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, cancel_hold_for_patron, expire_uncollected_holds,
+    get_hold_status, place_hold_for_patron, return_book_by_patron
+)
+
+
+@pytest.fixture
+def checked_out():
+    """A single-copy book borrowed by patron 111111."""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    borrow_book_by_patron("111111", 1)
+
+
+def test_hold_only_when_unavailable():
+    """Test a hold cannot be placed while copies are on the shelf"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    success, message = place_hold_for_patron("222222", 1)
+    assert not success
+    assert "borrowed right away" in message
+
+
+def test_queue_positions(checked_out):
+    """Test holds are queued in arrival order and duplicates are refused"""
+    assert place_hold_for_patron("222222", 1) == (True, 'Hold placed on "Dune". You are number 1 on the waiting list.')
+    assert place_hold_for_patron("333333", 1)[0]
+    assert get_hold_status("333333", 1) == {"status": "waiting", "position": 2}
+    assert not place_hold_for_patron("333333", 1)[0]
+    assert get_hold_status("444444", 1)["status"] == "none"
+
+
+def test_return_hands_copy_to_next_hold(checked_out):
+    """Test a returned copy is kept for the first waiting patron only"""
+    place_hold_for_patron("222222", 1)
+    place_hold_for_patron("333333", 1)
+
+    success, message = return_book_by_patron("111111", 1)
+    assert success
+    assert "held for the next patron" in message
+    assert get_book_by_id(1)["available_copies"] == 0
+    assert get_hold_status("222222", 1)["status"] == "ready"
+    assert get_hold_status("333333", 1)["position"] == 1
+
+    assert not borrow_book_by_patron("333333", 1)[0]
+    assert borrow_book_by_patron("222222", 1)[0]
+    assert get_hold_status("222222", 1)["status"] == "none"
+
+
+def test_cancelled_ready_hold_passes_copy_on(checked_out):
+    """Test cancelling a ready hold moves the copy down the queue, then to the shelf"""
+    place_hold_for_patron("222222", 1)
+    place_hold_for_patron("333333", 1)
+    return_book_by_patron("111111", 1)
+
+    assert cancel_hold_for_patron("222222", 1) == (True, "Hold cancelled.")
+    assert get_hold_status("333333", 1)["status"] == "ready"
+    assert cancel_hold_for_patron("333333", 1)[0]
+    assert get_book_by_id(1)["available_copies"] == 1
+    assert not cancel_hold_for_patron("333333", 1)[0]
+
+
+def test_uncollected_holds_expire(checked_out):
+    """Test a ready hold left past the pickup window goes to the next patron"""
+    place_hold_for_patron("222222", 1)
+    place_hold_for_patron("333333", 1)
+    return_book_by_patron("111111", 1)
+
+    assert expire_uncollected_holds() == 0
+    assert expire_uncollected_holds(datetime.now() + timedelta(days=4)) == 1
+    assert get_hold_status("222222", 1)["status"] == "none"
+    assert get_hold_status("333333", 1)["status"] == "ready"
+
+
+def test_position_lookup_uses_queue_index():
+    """Test the queue position is a range count on the holds index"""
+    conn = get_db_connection()
+    plan = " ".join(row[3] for row in conn.execute('''
+        EXPLAIN QUERY PLAN SELECT COUNT(*) FROM holds WHERE book_id = ? AND status = 'waiting' AND id <= ?
+    ''', (1, 10)))
+    conn.close()
+    assert "idx_holds_queue" in plan
+
+
+def test_hold_routes():
+    """Test the hold form and the hold status endpoint"""
+    client = create_app().test_client()
+    response = client.post("/hold", data={"patron_id": "222222", "book_id": "3"}, follow_redirects=True)
+    assert "You are number 1 on the waiting list" in response.get_data(as_text=True)
+    assert client.get("/api/holds/222222/3").get_json() == {"status": "waiting", "position": 1}
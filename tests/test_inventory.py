@@ -0,0 +1,60 @@
+from cli import main as cli_main
+from database import (
+    get_book_by_id, get_db_connection, reconcile_book_availability, update_book_availability
+)
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, place_hold_for_patron, return_book_by_patron
+)
+from services.jobs import register_jobs
+from services.scheduler import Scheduler
+
+
+def set_available(book_id, copies):
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET available_copies = ? WHERE id = ?", (copies, book_id))
+    conn.commit()
+    conn.close()
+
+
+def test_update_availability_stays_in_bounds():
+    """Test the legacy helper refuses to go negative or above total_copies"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    assert not update_book_availability(1, 1)
+    assert update_book_availability(1, -1)
+    assert not update_book_availability(1, -1)
+    assert get_book_by_id(1)["available_copies"] == 0
+
+
+def test_reconcile_repairs_drift():
+    """Test drifted books are set back to total copies minus open loans"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 2)
+    add_book_to_catalog("Ulysses", "James Joyce", "3333333333333", 1)
+    borrow_book_by_patron("111111", 1)
+    borrow_book_by_patron("222222", 1)
+    set_available(1, 3)
+    set_available(2, 0)
+
+    assert reconcile_book_availability(batch_size=1) == 2
+    assert [get_book_by_id(i)["available_copies"] for i in (1, 2, 3)] == [1, 2, 1]
+    assert reconcile_book_availability() == 0
+
+
+def test_reconcile_counts_copies_kept_for_holds():
+    """Test a copy kept for a ready hold is not put back on the shelf"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    borrow_book_by_patron("111111", 1)
+    place_hold_for_patron("222222", 1)
+    return_book_by_patron("111111", 1)
+
+    assert reconcile_book_availability() == 0
+    assert get_book_by_id(1)["available_copies"] == 0
+
+
+def test_reconcile_job_and_cli(capsys):
+    """Test the reconciliation runs from the CLI and is a scheduled job"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    set_available(1, 0)
+    assert cli_main(["reconcile-inventory"]) == 0
+    assert "for 1 books" in capsys.readouterr().out
+    assert register_jobs(Scheduler()).get_job("reconcile_inventory") is not None
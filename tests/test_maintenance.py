@@ -0,0 +1,156 @@
+import json
+import logging
+
+import pytest
+import cli
+from app import create_app
+from database import enable_incremental_vacuum, get_db_connection, init_database
+from services import maintenance_service
+from services.jobs import register_jobs
+from services.maintenance_service import QuietMaintenance, run_maintenance
+from services.scheduler import Scheduler
+
+
+def pragma(name):
+    conn = get_db_connection()
+    try:
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def churned():
+    """Fill borrow_records and delete it again, leaving free pages behind (file converted, statistics gathered)."""
+    conn = get_db_connection()
+    enable_incremental_vacuum(conn)
+    conn.execute("ANALYZE")
+    conn.executemany(
+        "INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES (?, ?, ?, ?)",
+        [(f"{i:06d}", 1, "2024-01-01T00:00:00" + "x" * 200, "2024-01-15T00:00:00") for i in range(5000)])
+    conn.commit()
+    conn.execute("DELETE FROM borrow_records")
+    conn.commit()
+    conn.close()
+
+
+def test_startup_never_converts_an_existing_file():
+    """Test init_database leaves a file made without auto_vacuum=INCREMENTAL alone (converting means a full VACUUM)"""
+    conn = get_db_connection()
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    assert pragma("auto_vacuum") == 0
+
+    init_database()
+    assert pragma("auto_vacuum") == 0
+
+
+def test_maintenance_converts_on_request():
+    """Test run_maintenance(convert=True) switches the file to auto_vacuum=INCREMENTAL"""
+    assert run_maintenance()["files"][0]["converted"] is False
+    assert pragma("auto_vacuum") == 0
+
+    result = run_maintenance(convert=True)["files"][0]
+    assert result["converted"] is True
+    assert "enable_incremental_vacuum" in result["steps_ms"]
+    assert pragma("auto_vacuum") == 2
+
+    assert run_maintenance(convert=True)["files"][0]["converted"] is False
+
+
+def test_new_file_starts_with_incremental_vacuum(tmp_path, monkeypatch):
+    """Test a database created by init_database gets auto_vacuum=INCREMENTAL with its first table"""
+    import database
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "fresh.db"))
+    database.close_connection_pools()
+    try:
+        init_database()
+        assert pragma("auto_vacuum") == 2
+    finally:
+        database.close_connection_pools()
+
+
+def test_maintenance_frees_pages_and_reports_each_step(churned):
+    """Test a run shrinks the file, empties the WAL and times every step"""
+    report = run_maintenance()
+    result = report["files"][0]
+
+    assert result["before"]["freelist_pages"] > 0
+    assert result["after"]["freelist_pages"] == 0
+    assert result["freed_pages"] == result["before"]["freelist_pages"]
+    assert result["after"]["page_count"] < result["before"]["page_count"]
+    assert result["after"]["wal_bytes"] == 0
+    assert result["checkpoint"]["busy"] == 0
+    assert set(result["steps_ms"]) == {"optimize", "incremental_vacuum", "wal_checkpoint"}
+    assert report["elapsed_ms"] >= 0
+
+
+def test_first_run_analyzes_then_optimizes():
+    """Test statistics are gathered once with ANALYZE, then kept fresh with PRAGMA optimize"""
+    assert run_maintenance()["files"][0]["statistics"] == "analyze"
+    conn = get_db_connection()
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    conn.close()
+    assert run_maintenance()["files"][0]["statistics"] == "optimize"
+    assert run_maintenance(analyze=True)["files"][0]["statistics"] == "analyze"
+
+
+def test_vacuum_can_be_capped(churned):
+    """Test vacuum_pages bounds the pages handed back in one run"""
+    result = run_maintenance(vacuum_pages=10)["files"][0]
+    assert result["freed_pages"] == 10
+    assert result["after"]["freelist_pages"] == result["before"]["freelist_pages"] - 10
+
+
+def test_rejects_unknown_checkpoint_mode():
+    with pytest.raises(ValueError):
+        run_maintenance(checkpoint_mode="EVENTUALLY")
+
+
+def test_report_is_logged(caplog):
+    with caplog.at_level(logging.INFO, logger="library.maintenance"):
+        report = run_maintenance()
+    assert json.loads(caplog.records[-1].getMessage())["files"] == report["files"]
+
+
+def test_scheduled_job_waits_for_a_quiet_spell(monkeypatch):
+    """Test the job only runs after a check interval without commits, and not again too soon"""
+    runs = []
+    monkeypatch.setattr(maintenance_service, "run_maintenance", lambda: runs.append(1) or {"files": []})
+    now = [0.0]
+    job = QuietMaintenance(min_interval=100, clock=lambda: now[0])
+
+    assert job() is None  # first look: nothing to compare with yet
+    conn = get_db_connection()
+    conn.execute("INSERT INTO library_meta (key, value) VALUES ('busy', '1')")
+    conn.commit()
+    conn.close()
+    assert job() is None  # a commit since the last look
+    assert job() == {"files": []}  # quiet since the last look
+    assert job() is None  # ran too recently
+    now[0] = 101
+    assert job() == {"files": []}
+    assert len(runs) == 2
+
+
+def test_job_is_registered():
+    assert register_jobs(Scheduler()).get_job("maintenance") is not None
+
+
+def test_metrics_report_last_run():
+    client = create_app().test_client()
+    report = run_maintenance()
+    assert client.get("/api/metrics").get_json()["maintenance"] == report
+
+
+def test_cli_maintenance(churned, capsys):
+    assert cli.main(["maintenance", "--analyze", "--checkpoint", "PASSIVE"]) == 0
+    output = capsys.readouterr().out
+    assert "freelist" in output and "-> 0 pages" in output
+    assert "analyze" in output
+
+
+def test_cli_maintenance_converts_on_request(capsys):
+    assert cli.main(["maintenance", "--enable-incremental-vacuum"]) == 0
+    assert "enable_incremental_vacuum" in capsys.readouterr().out
+    assert pragma("auto_vacuum") == 2
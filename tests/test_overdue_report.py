@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+from conftest import add_overdue_loan
+from database import get_db_connection, record_return
+from services.library_service import add_book_to_catalog
+from routes.pagination import encode_cursor
+from services.overdue_service import get_due_report, iter_due_report
+
+
+def test_overdue_report_lists_open_overdue_loans_with_fees():
+    """Test returned and not-yet-due loans are left out and fees are computed"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_overdue_loan("111111", 1, 10)
+    add_overdue_loan("222222", 1, 2)
+    add_overdue_loan("333333", 1, -5)
+    add_overdue_loan("444444", 1, 20)
+    record_return("444444", 1, datetime.now())
+
+    loans = get_due_report("overdue")["loans"]
+    assert [loan["patron_id"] for loan in loans] == ["111111", "222222"]
+    assert loans[0]["days_overdue"] == 10
+    assert loans[0]["fee"] == 6.5
+    assert loans[1]["fee"] == 1.0
+
+
+def test_due_soon_report_window():
+    """Test the due-soon report only covers the look-ahead window"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_overdue_loan("111111", 1, 1)
+    add_overdue_loan("222222", 1, -2)
+    add_overdue_loan("333333", 1, -6)
+
+    loans = get_due_report("due_soon", due_within_days=3)["loans"]
+    assert [loan["patron_id"] for loan in loans] == ["222222"]
+    assert loans[0]["fee"] == 0
+
+
+def test_report_pages_with_cursor():
+    """Test keyset pages cover every loan exactly once"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 10)
+    for i in range(7):
+        add_overdue_loan(f"10000{i}", 1, 1 + i)
+
+    first = get_due_report("overdue", limit=3)
+    second = get_due_report("overdue", limit=3, after=first["next_cursor"])
+    assert len(first["loans"]) == 3
+    assert first["loans"][0]["patron_id"] == "100006"
+    assert second["loans"][0]["patron_id"] == "100003"
+    assert len(list(iter_due_report("overdue", page_size=2))) == 7
+
+
+def test_report_uses_partial_index():
+    """Test the open-loan scan is an index range search"""
+    conn = get_db_connection()
+    plan = " ".join(row[3] for row in conn.execute('''
+        EXPLAIN QUERY PLAN SELECT id FROM borrow_records
+        WHERE return_date IS NULL AND due_date < ? ORDER BY due_date, patron_id, id
+    ''', (datetime.now().isoformat(),)))
+    conn.close()
+    assert "idx_borrow_records_open_due" in plan
+
+
+def test_overdue_endpoint(client):
+    """Test the endpoint pages with an opaque cursor and validates input"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    for i in range(3):
+        add_overdue_loan(f"20000{i}", 4, 1 + i)
+
+    data = client.get("/api/overdue?limit=2").get_json()
+    assert data["count"] == 2
+    data = client.get(f"/api/overdue?limit=2&cursor={data['next_cursor']}").get_json()
+    assert data["count"] == 1
+    assert data["next_cursor"] is None
+
+    assert client.get("/api/overdue?report=lost").status_code == 400
+    assert client.get("/api/overdue?cursor=nonsense").status_code == 400
+
+
+@pytest.mark.parametrize("query", [
+    "report=due_soon&days=99999999999",
+    "report=due_soon&days=-1",
+    "cursor=" + encode_cursor([[1], [2], [3]]),
+    "cursor=" + encode_cursor(["2024-01-01", "123456", "7"]),
+])
+def test_overdue_endpoint_rejects_out_of_range_days_and_mistyped_cursors(client, query):
+    """Test values that used to raise OverflowError or ProgrammingError get a 400"""
+    assert client.get(f"/api/overdue?{query}").status_code == 400
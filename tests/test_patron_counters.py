@@ -0,0 +1,90 @@
+from unittest.mock import Mock
+
+from conftest import add_overdue_loan
+from database import (
+    get_db_connection, get_patron_borrow_count, get_patron_counters, rebuild_patron_counters, record_fee_payment
+)
+from services.library_service import (
+    PaymentGateway, add_book_to_catalog, borrow_book_by_patron, pay_late_fees, return_book_by_patron
+)
+
+
+def test_counter_follows_borrow_and_return():
+    """Test the active loan counter goes up on borrow and down on return"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    borrow_book_by_patron("123456", 1)
+    borrow_book_by_patron("123456", 1)
+    assert get_patron_borrow_count("123456") == 2
+
+    return_book_by_patron("123456", 1)
+    assert get_patron_counters("123456") == {"active_loans": 1, "outstanding_fees": 0.0}
+
+
+def test_failed_borrow_leaves_counter_alone():
+    """Test an unavailable book does not bump the counter"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    borrow_book_by_patron("111111", 1)
+    success, message = borrow_book_by_patron("222222", 1)
+    assert success is False
+    assert "not available" in message
+    assert get_patron_borrow_count("222222") == 0
+
+
+def gateway():
+    mock_gateway = Mock(spec=PaymentGateway)
+    mock_gateway.process_payment.return_value = (True, "txn_123", "Success")
+    return mock_gateway
+
+
+def test_late_return_adds_outstanding_fee():
+    """Test a late return adds its fee to the patron's outstanding fees"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    add_overdue_loan("123456", 1, 3)
+
+    success, message = return_book_by_patron("123456", 1)
+    assert success is True
+    assert "$1.50" in message
+    assert get_patron_counters("123456")["outstanding_fees"] == 1.5
+
+
+def test_rebuild_fixes_drift():
+    """Test the consistency checker repairs counters from borrow_records"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    borrow_book_by_patron("123456", 1)
+    conn = get_db_connection()
+    conn.execute("UPDATE patrons SET active_loans = 4 WHERE patron_id = '123456'")
+    conn.execute("INSERT INTO patrons (patron_id, active_loans) VALUES ('999999', 2)")
+    conn.commit()
+    conn.close()
+
+    assert rebuild_patron_counters() == 2
+    assert get_patron_borrow_count("123456") == 1
+    assert get_patron_borrow_count("999999") == 0
+    assert rebuild_patron_counters() == 0
+
+
+def test_fee_paid_before_return_is_not_owed_again():
+    """Test a fee paid on an open loan is deducted at return and cannot be charged twice"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    add_overdue_loan("123456", 1, 3)
+    mock_gateway = gateway()
+    assert pay_late_fees("123456", 1, mock_gateway)[0] is True
+    assert mock_gateway.process_payment.call_args.kwargs["amount"] == 1.5
+
+    success, message, _ = pay_late_fees("123456", 1, gateway())
+    assert success is False
+    assert "No late fees" in message
+
+    assert return_book_by_patron("123456", 1)[0] is True
+    assert get_patron_counters("123456")["outstanding_fees"] == 0.0
+
+
+def test_payment_after_return_settles_outstanding_fees():
+    """Test a payment for a returned loan is taken off the outstanding fees"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    add_overdue_loan("123456", 1, 3)
+    return_book_by_patron("123456", 1)
+    assert record_fee_payment("123456", 1, 1.0) == (True, "")
+    assert get_patron_counters("123456")["outstanding_fees"] == 0.5
+    record_fee_payment("123456", 1, 1.0)
+    assert get_patron_counters("123456")["outstanding_fees"] == 0.0
@@ -0,0 +1,141 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import add_overdue_loan
+from database import add_sample_data, get_db_connection
+from routes.pagination import encode_cursor
+from services.archive_service import archive_returned_records
+from services.library_service import get_patron_history_page, get_patron_status
+
+
+@pytest.fixture(autouse=True)
+def catalog():
+    add_sample_data()
+
+
+def add_loans(patron_id, count, start=datetime(2020, 1, 1), returned=True, book_id=1):
+    """Insert count loans a day apart (returned ones 5 days after borrowing)."""
+    rows = []
+    for day in range(count):
+        borrowed = start + timedelta(days=day)
+        rows.append((patron_id, book_id, borrowed.isoformat(), (borrowed + timedelta(days=14)).isoformat(),
+                     (borrowed + timedelta(days=5)).isoformat() if returned else None))
+    conn = get_db_connection()
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def test_status_lists_loans_and_fees_as_json(client):
+    """Test current loans and the fee total come back with ISO dates"""
+    add_overdue_loan("111111", 1, 3)
+    add_overdue_loan("111111", 2, 10)
+    response = client.get("/api/patron/111111/status")
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert data["books_borrowed_count"] == 2
+    assert data["total_fees"] == 1.5 + 6.5
+    assert [loan["fee"] for loan in data["borrowed_books"]] == [6.5, 1.5]
+    loan = data["borrowed_books"][0]
+    assert datetime.fromisoformat(loan["due_date"]) < datetime.now()
+    assert loan["is_overdue"] is True
+    json.dumps(get_patron_status("111111"))
+
+
+def test_history_pages_walk_every_loan_once(client):
+    """Test following next_cursor visits the whole history newest first, without repeats"""
+    add_loans("111111", 45)
+    data = client.get("/api/patron/111111/status?limit=20").get_json()
+    seen = [record["borrow_date"] for record in data["history"]["records"]]
+    cursor = data["history"]["next_cursor"]
+    while cursor:
+        page = client.get(f"/api/patron/111111/history?limit=20&cursor={cursor}").get_json()
+        assert page["count"] <= 20
+        seen += [record["borrow_date"] for record in page["records"]]
+        cursor = page["next_cursor"]
+
+    assert len(seen) == 45
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_history_includes_archived_loans_in_order():
+    """Test open, returned and archived loans are merged into one newest-first history"""
+    add_loans("111111", 6, start=datetime.now() - timedelta(days=400))
+    add_loans("111111", 3, start=datetime.now() - timedelta(days=30))
+    archive_returned_records(older_than_days=90)
+    add_overdue_loan("111111", 2, 1)
+
+    first = get_patron_history_page("111111", limit=4)
+    second = get_patron_history_page("111111", limit=4, before=first["next_cursor"])
+    third = get_patron_history_page("111111", limit=4, before=second["next_cursor"])
+    dates = [r["borrow_date"] for page in (first, second, third) for r in page["records"]]
+    assert len(dates) == 10 and dates == sorted(dates, reverse=True)
+    assert first["records"][0]["return_date"] is None
+    assert third["next_cursor"] is None
+
+
+def test_loans_borrowed_at_the_same_time_are_not_skipped():
+    """Test the (borrow_date, id) cursor splits ties between pages correctly"""
+    same = datetime(2021, 5, 1)
+    for _ in range(5):
+        add_loans("111111", 1, start=same)
+    first = get_patron_history_page("111111", limit=2)
+    second = get_patron_history_page("111111", limit=2, before=first["next_cursor"])
+    third = get_patron_history_page("111111", limit=2, before=second["next_cursor"])
+    assert [len(page["records"]) for page in (first, second, third)] == [2, 2, 1]
+
+
+def test_history_records_are_json_ready():
+    add_loans("111111", 1)
+    record = get_patron_history_page("111111")["records"][0]
+    assert set(record) == {"book_id", "title", "author", "borrow_date", "due_date", "return_date"}
+    assert record["title"] == "The Great Gatsby"
+    json.dumps(record)
+
+
+def test_history_query_uses_patron_index():
+    """Test each history page is read from the (patron_id, borrow_date) indexes, not sorted"""
+    conn = get_db_connection()
+    for table, returned, index in [
+        ("borrow_records", "AND return_date IS NULL", "idx_borrow_records_open_patron"),
+        ("borrow_records", "AND return_date IS NOT NULL", "idx_borrow_records_returned_patron"),
+        ("borrow_records_archive", "", "idx_borrow_records_archive_patron"),
+    ]:
+        plan = [row[3] for row in conn.execute(f'''
+            EXPLAIN QUERY PLAN SELECT id FROM {table}
+            WHERE patron_id = ? AND (borrow_date, id) < (?, ?) {returned}
+            ORDER BY borrow_date DESC, id DESC LIMIT 20
+        ''', ("111111", "2024-01-01", 1))]
+        assert any(index in detail for detail in plan)
+        assert not any("TEMP B-TREE" in detail for detail in plan)
+    conn.close()
+
+
+@pytest.mark.parametrize("url", [
+    "/api/patron/12345/status",
+    "/api/patron/abcdef/history",
+    "/api/patron/111111/status?limit=0",
+    "/api/patron/111111/history?cursor=broken",
+    "/api/patron/111111/history?cursor=" + encode_cursor(("2024-01-01",)),
+    "/api/patron/111111/history?cursor=" + encode_cursor((1, "x")),
+])
+def test_invalid_requests(client, url):
+    assert client.get(url).status_code == 400
+
+
+def test_patron_without_loans(client):
+    data = client.get("/api/patron/222222/status").get_json()
+    assert data["borrowed_books"] == [] and data["total_fees"] == 0
+    assert data["history"] == {"records": [], "count": 0, "limit": 20, "next_cursor": None}
+
+
+def test_service_rejects_invalid_patron():
+    with pytest.raises(ValueError):
+        get_patron_status("12")
+    with pytest.raises(ValueError):
+        get_patron_history_page("abcdef")
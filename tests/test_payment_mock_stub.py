@@ -7,7 +7,7 @@ from services.payment_service import PaymentGateway
 #required tests
 def test_pay_late_fees_success(mocker):
     mocker.patch("services.library_service.get_book_by_id", return_value={"id": 1, "title": "Kevin Durant"})
-    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee_amount": 7.50})
+    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee": 7.50})
 
     mock_gateway = Mock(spec=PaymentGateway)
     mock_gateway.process_payment.return_value = (True, "txn_121", "Success")
@@ -26,7 +26,7 @@ def test_pay_late_fees_success(mocker):
 
 def test_pay_late_fees_declined(mocker):
     mocker.patch("services.library_service.get_book_by_id", return_value={"id": 2, "title": "SGA"})
-    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee_amount": 12.00})
+    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee": 12.00})
 
     mock_gateway = Mock(spec=PaymentGateway)
     mock_gateway.process_payment.return_value =(False,"txn_322","Declined")
@@ -44,7 +44,7 @@ def test_pay_late_fees_declined(mocker):
 
 def test_pay_late_fees_invalid_patron_id(mocker):
     mocker.patch("services.library_service.get_book_by_id", return_value={"id": 3, "title": "Lebron James"})
-    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee_amount": 6.00})
+    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee": 6.00})
 
     mock_gateway = Mock(spec=PaymentGateway)
 
@@ -57,7 +57,7 @@ def test_pay_late_fees_invalid_patron_id(mocker):
 
 def test_pay_late_fees_zero_late_fees(mocker):
     mocker.patch("services.library_service.get_book_by_id", return_value={"id": 4, "title": "Ant"})
-    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee_amount": 0.0})
+    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee": 0.0})
 
     mock_gateway = Mock(spec=PaymentGateway)
 
@@ -69,7 +69,7 @@ def test_pay_late_fees_zero_late_fees(mocker):
 
 def test_pay_late_fees_network_error(mocker):
     mocker.patch("services.library_service.get_book_by_id", return_value={"id": 5, "title": "Luka"})
-    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee_amount": 5.00})
+    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee": 5.00})
 
     mock_gateway = Mock(spec=PaymentGateway)
     mock_gateway.process_payment.side_effect = RuntimeError("Network down" )
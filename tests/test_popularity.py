@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app import create_app
+from database import get_db_connection, record_borrow, rebuild_book_popularity
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, get_popular_books
+
+NOW = datetime(2025, 3, 12, 10, 0)  # a Wednesday
+
+
+def borrow_at(patron_id, book_id, when):
+    record_borrow(patron_id, book_id, when, when + timedelta(days=14), 5)
+
+
+@pytest.fixture
+def history():
+    """Dune borrowed twice this week, Emma three times last month."""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 5)
+    borrow_at("111111", 1, NOW)
+    borrow_at("222222", 1, NOW - timedelta(days=1))
+    for patron_id in ("111111", "222222", "333333"):
+        borrow_at(patron_id, 2, NOW - timedelta(days=20))
+
+
+def titles(books):
+    return [(book["title"], book["borrow_count"]) for book in books]
+
+
+def test_counters_follow_calendar_periods(history):
+    """Test week, month and all-time rankings come from their own counters"""
+    assert titles(get_popular_books("week", now=NOW)) == [("Dune", 2)]
+    assert titles(get_popular_books("month", now=NOW)) == [("Dune", 2)]
+    assert titles(get_popular_books("all", now=NOW)) == [("Emma", 3), ("Dune", 2)]
+    assert titles(get_popular_books("month", now=NOW - timedelta(days=20))) == [("Emma", 3)]
+    assert titles(get_popular_books("all", limit=1, now=NOW)) == [("Emma", 3)]
+
+
+def test_failed_borrow_is_not_counted():
+    """Test the counters roll back with a refused borrow"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    assert borrow_book_by_patron("111111", 1)[0]
+    assert not borrow_book_by_patron("222222", 1)[0]
+    assert titles(get_popular_books("all")) == [("Dune", 1)]
+
+
+def test_rebuild_matches_incremental_counters(history):
+    """Test recomputing from the history gives the same counters"""
+    conn = get_db_connection()
+    before = conn.execute("SELECT * FROM book_popularity ORDER BY period, book_id").fetchall()
+    conn.close()
+    rebuild_book_popularity()
+    conn = get_db_connection()
+    after = conn.execute("SELECT * FROM book_popularity ORDER BY period, book_id").fetchall()
+    conn.close()
+    assert [tuple(row) for row in after] == [tuple(row) for row in before]
+
+
+def test_top_k_uses_rank_index():
+    """Test the top-k query reads the ranking index instead of sorting"""
+    conn = get_db_connection()
+    plan = " ".join(row[3] for row in conn.execute('''
+        EXPLAIN QUERY PLAN SELECT book_id FROM book_popularity
+        WHERE period = ? ORDER BY borrow_count DESC, book_id LIMIT 10
+    ''', ("all",)))
+    conn.close()
+    assert "idx_book_popularity_rank" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_popular_endpoint_and_catalog():
+    """Test the API endpoint and the catalog page list the sample loan"""
+    client = create_app().test_client()
+    data = client.get("/api/popular?period=all").get_json()
+    assert [book["title"] for book in data["results"]] == ["1984"]
+    assert client.get("/api/popular?period=year").status_code == 400
+    assert "Most Borrowed" in client.get("/catalog").get_data(as_text=True)
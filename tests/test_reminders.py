@@ -0,0 +1,118 @@
+import time
+from datetime import datetime, timedelta
+
+from cli import main as cli_main
+from database import get_db_connection, record_borrow, record_return
+from services.library_service import add_book_to_catalog
+from services.reminder_service import deliver_reminders, queue_due_reminders, run_reminders
+from services.scheduler import Scheduler
+
+NOW = datetime(2025, 3, 10, 9, 0)
+
+
+class RejectingNotifier:
+    def send_reminder(self, patron_id, message):
+        return False
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.sent = []
+
+    def send_reminder(self, patron_id, message):
+        self.sent.append((patron_id, message))
+        return True
+
+
+def add_loan(patron_id, due):
+    record_borrow(patron_id, 1, due - timedelta(days=14), due, 5)
+
+
+def outbox():
+    conn = get_db_connection()
+    rows = conn.execute("SELECT patron_id, kind, remind_on, sent_at FROM reminder_outbox ORDER BY id").fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def test_first_run_queues_due_soon_and_overdue():
+    """Test loans due within two days and overdue loans are queued, others are not"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_loan("111111", NOW + timedelta(days=1))
+    add_loan("222222", NOW - timedelta(days=3))
+    add_loan("333333", NOW + timedelta(days=5))
+    add_loan("444444", NOW - timedelta(days=1))
+    record_return("444444", 1, NOW)
+
+    assert queue_due_reminders(NOW) == 2
+    assert [(row["patron_id"], row["kind"]) for row in outbox()] == [("111111", "due_soon"), ("222222", "overdue")]
+
+
+def test_runs_are_incremental():
+    """Test a rerun only queues what changed since the watermark"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_loan("111111", NOW + timedelta(days=1))
+    add_loan("222222", NOW - timedelta(days=3))
+    add_loan("333333", NOW + timedelta(days=2, hours=3))
+    queue_due_reminders(NOW)
+
+    # Same day: nothing new except the loan that moved into the two-day window
+    assert queue_due_reminders(NOW + timedelta(hours=4)) == 1
+    assert outbox()[-1]["patron_id"] == "333333"
+
+    # Next day: overdue loans get their daily reminder again
+    assert queue_due_reminders(NOW + timedelta(days=1)) == 1
+    assert outbox()[-1]["kind"] == "overdue"
+
+
+def test_delivery_marks_sent_and_keeps_failures():
+    """Test rejected reminders stay queued and are delivered on a later run"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_loan("222222", NOW - timedelta(days=3))
+    queue_due_reminders(NOW)
+
+    assert deliver_reminders(RejectingNotifier()) == 0
+    notifier = RecordingNotifier()
+    assert deliver_reminders(notifier) == 1
+    assert notifier.sent[0][0] == "222222"
+    assert "Dune" in notifier.sent[0][1]
+    assert outbox()[0]["sent_at"] is not None
+    assert deliver_reminders(notifier) == 0
+
+
+def test_scheduler_runs_due_jobs_and_survives_errors():
+    """Test jobs run on their interval and a failing job does not stop the others"""
+    calls = []
+    scheduler = Scheduler()
+    scheduler.add_job("count", 10, lambda: calls.append(1))
+    scheduler.add_job("broken", 10, lambda: 1 / 0)
+    start = time.monotonic()
+
+    assert sorted(scheduler.run_pending(start)) == ["broken", "count"]
+    assert scheduler.run_pending(start + 5) == []
+    assert sorted(scheduler.run_pending(start + 10)) == ["broken", "count"]
+    assert len(calls) == 2
+    assert "division" in scheduler.get_job("broken").last_error
+
+
+def test_scheduler_thread_runs_reminders():
+    """Test the background thread runs the reminder job"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    add_loan("222222", datetime.now() - timedelta(days=3))
+    notifier = RecordingNotifier()
+    scheduler = Scheduler(tick=0.01)
+    job = scheduler.add_job("reminders", 60, lambda: run_reminders(notifier=notifier))
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + 5
+        while job.runs == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+    assert len(notifier.sent) == 1
+
+
+def test_cli_reminders(capsys):
+    """Test the CLI runs one reminder pass"""
+    assert cli_main(["reminders"]) == 0
+    assert "Queued 0 reminders" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import json
+import os
+import struct
+import sys
+
+import pytest
+from database import get_catalog_version
+from services import search_index
+from services.library_service import add_book_to_catalog
+from services.search_index import MappedTrigramIndex, TrigramIndex, get_search_index, index_path, open_index
+
+BOOKS = [
+    {"id": 1, "title": "The Great Gatsby", "author": "F. Scott Fitzgerald"},
+    {"id": 2, "title": "Great Expectations", "author": "Charles Dickens"},
+    {"id": 3, "title": "Tender Is the Night", "author": "F. Scott Fitzgerald"},
+    {"id": 4, "title": "A Tale of Two Cities", "author": "Charles Dickens"},
+    {"id": 10, "title": "Bleak House", "author": "Charles Dickens"},
+]
+
+
+@pytest.fixture
+def fresh_worker(monkeypatch):
+    """Forget the index this process has mapped, like a newly started worker."""
+    monkeypatch.setattr(search_index, "_index", None)
+
+
+@pytest.mark.parametrize("term, field", [
+    ("great", "title"), ("Gatsbi", "title"), ("tale two", "title"), ("dickns", "author"),
+    ("fitzgerld scot", "author"), ("night", "author"), ("zzzz", "title"),
+])
+def test_mapped_index_matches_in_memory_index(tmp_path, term, field):
+    """Test the saved index answers exactly like the one it was built from"""
+    index = TrigramIndex(BOOKS, "v1")
+    path = str(tmp_path / "index")
+    index.save(path)
+    mapped = MappedTrigramIndex(path)
+    assert mapped.version == "v1"
+    assert mapped.search(term, field) == index.search(term, field)
+    assert mapped.search(term, field, limit=1, offset=1) == index.search(term, field, limit=1, offset=1)
+
+
+def test_new_worker_maps_saved_index(fresh_worker, monkeypatch):
+    """Test a worker that starts after the index was saved maps it without rebuilding"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    assert get_search_index().search("dunne", "title")[0][1] == 1
+    assert os.path.exists(index_path())
+
+    monkeypatch.setattr(search_index, "_index", None)
+    monkeypatch.setattr(search_index, "build_index", lambda path, version: pytest.fail("index was rebuilt"))
+    index = get_search_index()
+    assert isinstance(index, MappedTrigramIndex)
+    assert index.search("dunne", "title")[0][1] == 1
+
+
+def test_catalog_change_rebuilds_saved_index(fresh_worker):
+    """Test a stale file is rebuilt for the new catalog version"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    get_search_index()
+    add_book_to_catalog("Emma", "Jane Austen", "2222222222222", 1)
+
+    index = get_search_index()
+    assert index.version == get_catalog_version()
+    assert open_index(index_path(), get_catalog_version()) is not None
+    assert index.search("emma", "title")[0][1] == 2
+
+
+def with_header(header):
+    encoded = json.dumps(header).encode()
+    return search_index.INDEX_MAGIC + struct.pack("<I", len(encoded)) + encoded
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"not an index",
+    b"LIBSRCH\0\xff\xff\xff\xff{",
+    b"LIBSRCH\0",  # shorter than the header
+    with_header([]),  # header is not an object
+    with_header({"format": search_index.INDEX_FORMAT, "byteorder": sys.byteorder, "version": "v", "sections": 7}),
+])
+def test_unreadable_file_is_rebuilt(fresh_worker, content):
+    """Test an empty, foreign, truncated or malformed file is replaced by a fresh index"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    with open(index_path(), "wb") as index_file:
+        index_file.write(content)
+    assert open_index(index_path(), get_catalog_version()) is None
+    assert get_search_index().search("dune", "title")[0][1] == 1
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    """Test a file cut short is not mapped"""
+    path = str(tmp_path / "index")
+    TrigramIndex(BOOKS, "v1").save(path)
+    with open(path, "r+b") as index_file:
+        index_file.truncate(os.path.getsize(path) - 8)
+    assert open_index(path, "v1") is None
@@ -0,0 +1,50 @@
+from services.library_service import add_book_to_catalog, search_books_in_catalog
+
+
+def add_many(count):
+    for i in range(count):
+        add_book_to_catalog(f"Echo {i:02d}", "Reed", f"{5000000000000 + i}", 1)
+
+
+def test_search_limit_returns_first_titles():
+    """Test limit keeps the first matches ordered by title"""
+    add_many(10)
+    result = search_books_in_catalog("echo", "title", limit=3)
+    assert [book["title"] for book in result] == ["Echo 00", "Echo 01", "Echo 02"]
+
+
+def test_search_offset_skips_matches():
+    """Test offset pages through the matches"""
+    add_many(10)
+    result = search_books_in_catalog("echo", "title", limit=3, offset=9)
+    assert [book["title"] for book in result] == ["Echo 09"]
+
+
+def test_search_without_limit_returns_everything():
+    """Test the default still returns every match"""
+    add_many(10)
+    assert len(search_books_in_catalog("e", "title")) == 10
+
+
+def test_fuzzy_search_limit():
+    """Test limit also applies to ranked fuzzy results"""
+    add_many(5)
+    assert len(search_books_in_catalog("Reid", "author", fuzzy=True, limit=2)) == 2
+
+
+def test_api_search_pages(client):
+    """Test the API returns one page and the next offset"""
+    add_many(5)
+    data = client.get("/api/search?q=echo&limit=2").get_json()
+    assert data["count"] == 2
+    assert data["next_offset"] == 2
+
+    data = client.get("/api/search?q=echo&limit=2&offset=4").get_json()
+    assert [book["title"] for book in data["results"]] == ["Echo 04"]
+    assert data["next_offset"] is None
+
+
+def test_api_search_invalid_limit(client):
+    """Test a bad limit is rejected"""
+    response = client.get("/api/search?q=echo&limit=abc")
+    assert response.status_code == 400
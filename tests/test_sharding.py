@@ -0,0 +1,138 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+import database
+from conftest import remove_database
+from database import (
+    get_book_borrow_history, get_patron_counters, init_database, iter_borrow_records,
+    rebuild_patron_counters, shard_for_patron, shard_path
+)
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, get_patron_status_report, return_book_by_patron
+)
+
+# Two patrons that hash to different shards when SHARD_COUNT is 2
+PATRON_A = "123456"
+PATRON_B = "111111"
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """Run the test against a fresh database split over two shard files."""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "library.db"))
+    monkeypatch.setattr(database, "SHARD_COUNT", 2)
+    init_database()
+    yield
+    for shard in range(2):
+        remove_database(shard_path(shard))
+    remove_database(database.DATABASE)
+
+
+def shard_loans(shard):
+    conn = sqlite3.connect(shard_path(shard))
+    count = conn.execute("SELECT COUNT(*) FROM borrow_records").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_shard_layout(sharded):
+    """Test each shard is its own file and the catalog keeps no borrow records"""
+    assert shard_for_patron(PATRON_A) != shard_for_patron(PATRON_B)
+    assert all(os.path.exists(shard_path(shard)) for shard in range(2))
+    conn = sqlite3.connect(database.DATABASE)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert "books" in tables
+    assert "borrow_records" not in tables
+
+
+def test_borrow_and_return_are_routed_by_patron(sharded):
+    """Test loans land on the patron's shard and still update the shared catalog"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    assert borrow_book_by_patron(PATRON_A, 1)[0]
+    assert borrow_book_by_patron(PATRON_B, 1)[0]
+    assert shard_loans(shard_for_patron(PATRON_A)) == 1
+    assert shard_loans(shard_for_patron(PATRON_B)) == 1
+    assert database.get_book_by_id(1)["available_copies"] == 1
+
+    assert return_book_by_patron(PATRON_A, 1)[0]
+    assert database.get_book_by_id(1)["available_copies"] == 2
+    assert get_patron_counters(PATRON_A)["active_loans"] == 0
+    assert get_patron_counters(PATRON_B)["active_loans"] == 1
+    assert [r["title"] for r in get_patron_status_report(PATRON_A)["borrowing_history"]] == ["Dune"]
+
+
+def test_cross_shard_queries_see_every_shard(sharded):
+    """Test scatter-gather history and exports merge records from all shards in order"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    now = datetime.now()
+    database.record_borrow(PATRON_B, 1, now - timedelta(days=2), now + timedelta(days=12), 5)
+    database.record_borrow(PATRON_A, 1, now - timedelta(days=1), now + timedelta(days=13), 5)
+
+    assert [r["patron_id"] for r in get_book_borrow_history(1)] == [PATRON_B, PATRON_A]
+    assert [r["patron_id"] for r in iter_borrow_records()] == [PATRON_B, PATRON_A]
+
+
+def test_rebuild_counters_per_shard(sharded):
+    """Test counter drift is found and fixed on every shard"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    borrow_book_by_patron(PATRON_A, 1)
+    borrow_book_by_patron(PATRON_B, 1)
+    for patron_id in (PATRON_A, PATRON_B):
+        conn = sqlite3.connect(shard_path(shard_for_patron(patron_id)))
+        conn.execute("UPDATE patrons SET active_loans = 4")
+        conn.commit()
+        conn.close()
+
+    assert rebuild_patron_counters() == 2
+    assert get_patron_counters(PATRON_A)["active_loans"] == 1
+    assert get_patron_counters(PATRON_B)["active_loans"] == 1
+
+
+def test_reconcile_inventory_across_shards(sharded):
+    """Test open loans on every shard count towards a book's expected availability"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    borrow_book_by_patron(PATRON_A, 1)
+    borrow_book_by_patron(PATRON_B, 1)
+    conn = sqlite3.connect(database.DATABASE)
+    conn.execute("UPDATE books SET available_copies = 3")
+    conn.commit()
+    conn.close()
+
+    assert database.reconcile_book_availability() == 1
+    assert database.get_book_by_id(1)["available_copies"] == 1
+
+
+def test_turning_sharding_on_moves_existing_loans(tmp_path, monkeypatch):
+    """Test raising SHARD_COUNT on a single-file database moves its loans into the shards"""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "library.db"))
+    init_database()
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 3)
+    borrow_book_by_patron(PATRON_A, 1)
+    borrow_book_by_patron(PATRON_B, 1)
+    return_book_by_patron(PATRON_B, 1)
+    loan_ids = sorted(record["id"] for record in iter_borrow_records())
+
+    database.close_connection_pools()
+    monkeypatch.setattr(database, "SHARD_COUNT", 2)
+    try:
+        init_database()
+        assert shard_loans(shard_for_patron(PATRON_A)) == 1
+        assert shard_loans(shard_for_patron(PATRON_B)) == 1
+        assert sorted(record["id"] for record in iter_borrow_records()) == loan_ids
+        assert get_patron_counters(PATRON_A)["active_loans"] == 1
+        assert get_patron_counters(PATRON_B)["active_loans"] == 0
+        assert database.get_book_by_id(1)["available_copies"] == 2
+        assert return_book_by_patron(PATRON_A, 1)[0]
+
+        conn = sqlite3.connect(database.DATABASE)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert "borrow_records" not in tables and "patrons" not in tables
+    finally:
+        database.close_connection_pools()
+        for shard in range(2):
+            remove_database(shard_path(shard))
+        remove_database(database.DATABASE)
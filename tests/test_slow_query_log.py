@@ -0,0 +1,125 @@
+import json
+import logging
+import sqlite3
+
+import pytest
+import query_log
+from app import create_app
+from database import get_all_books, get_db_connection, read_connection, set_slow_query_threshold
+from query_log import full_table_scans, parameters_shape
+from services.library_service import add_book_to_catalog
+
+
+@pytest.fixture
+def slow_log():
+    """Log every statement (threshold 0), then turn the log off again."""
+    add_book_to_catalog("The Great Gatsby", "F. Scott Fitzgerald", "1111111111111", 2)
+    add_book_to_catalog("Dune", "Frank Herbert", "2222222222222", 1)
+    query_log.clear()
+    set_slow_query_threshold(0)
+    yield
+    set_slow_query_threshold(None)
+    query_log.clear()
+
+
+def recorded(sql_fragment):
+    return [entry for entry in query_log.get_slow_query_stats()["recent"] if sql_fragment in entry["sql"]]
+
+
+def test_off_by_default():
+    """Test connections are plain sqlite3 connections unless a threshold is set"""
+    conn = get_db_connection()
+    assert type(conn) is sqlite3.Connection
+    conn.close()
+    assert query_log.get_slow_query_stats()["threshold_ms"] is None
+
+
+def test_slow_statement_is_logged_with_plan(slow_log, caplog):
+    """Test a statement over the threshold is logged as JSON with its plan and full scans flagged"""
+    with caplog.at_level(logging.WARNING, logger="library.slow_query"):
+        with read_connection() as conn:
+            rows = conn.execute("SELECT * FROM books WHERE title LIKE ?", ("%Gatsby%",)).fetchall()
+    assert len(rows) == 1
+
+    entry = recorded("title LIKE")[0]
+    assert entry["rows"] == 1
+    assert entry["parameters"] == "positional(1)"
+    assert entry["full_scans"] == ["books"]
+    assert any(detail.startswith("SCAN books") for detail in entry["plan"])
+    assert json.loads(caplog.records[-1].getMessage())["sql"] == entry["sql"]
+
+
+def test_parameter_values_are_not_logged(slow_log, caplog):
+    """Test only the shape of bound parameters reaches the log"""
+    with caplog.at_level(logging.WARNING, logger="library.slow_query"):
+        with read_connection() as conn:
+            conn.execute("SELECT * FROM borrow_records WHERE patron_id = :patron", {"patron": "987654"}).fetchall()
+    entry = recorded("patron_id = :patron")[0]
+    assert entry["parameters"] == "named(patron)"
+    assert "987654" not in caplog.text
+    assert "987654" not in json.dumps(query_log.get_slow_query_stats())
+
+
+def test_indexed_lookup_is_not_a_full_scan(slow_log):
+    """Test a primary key lookup is not flagged"""
+    with read_connection() as conn:
+        conn.execute("SELECT title FROM books WHERE id = ?", (1,)).fetchone()
+        conn.execute("SELECT 1").fetchone()
+    assert recorded("WHERE id = ?")[0]["full_scans"] == []
+
+
+def test_rows_read_through_iteration_are_counted(slow_log):
+    """Test a statement whose rows are iterated is finished when they run out"""
+    with read_connection() as conn:
+        titles = [row["title"] for row in conn.execute("SELECT title FROM books ORDER BY title")]
+    assert recorded("ORDER BY title")[0]["rows"] == len(titles) == len(get_all_books())
+
+
+def test_writes_report_rows_changed(slow_log):
+    """Test data-changing statements record the rows they changed"""
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET available_copies = available_copies WHERE total_copies > 0")
+    conn.commit()
+    conn.close()
+    assert recorded("UPDATE books")[0]["rows"] == len(get_all_books())
+
+
+def test_fast_statements_are_counted_not_logged():
+    """Test statements under the threshold are only counted"""
+    query_log.clear()
+    set_slow_query_threshold(60000)
+    try:
+        get_all_books()
+        stats = query_log.get_slow_query_stats()
+        assert stats["statements"] > 0
+        assert stats["slow_statements"] == 0 and stats["recent"] == []
+    finally:
+        set_slow_query_threshold(None)
+
+
+def test_metrics_endpoint():
+    """Test the app config turns the log on and /api/metrics reports it"""
+    query_log.clear()
+    client = create_app({"SLOW_QUERY_MS": 0}).test_client()
+    try:
+        client.get("/api/search?q=gatsby&type=title")
+        metrics = client.get("/api/metrics").get_json()["slow_queries"]
+        assert metrics["threshold_ms"] == 0
+        assert metrics["slow_statements"] > 0
+        assert metrics["recent"][0]["event"] == "slow_query"
+    finally:
+        set_slow_query_threshold(None)
+
+
+@pytest.mark.parametrize("parameters, many, shape", [
+    ((), False, "none"), (None, False, "none"), ((1, "a"), False, "positional(2)"),
+    ({"b": 1, "a": 2}, False, "named(a, b)"), ([(1,), (2,)], True, "many(2) x positional(1)"),
+])
+def test_parameters_shape(parameters, many, shape):
+    assert parameters_shape(parameters, many) == shape
+
+
+def test_full_table_scans():
+    plan = ["SCAN books", "SEARCH borrow_records USING INDEX idx (book_id=?)",
+            "SCAN patrons USING COVERING INDEX idx_p", "SCAN CONSTANT ROW", "USE TEMP B-TREE FOR ORDER BY"]
+    assert full_table_scans(plan) == ["books"]
@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import database
+from app import PRODUCTION_CONFIG, create_app
+from database import SCHEMA_VERSION, get_all_books, get_db_connection, init_database, schema_is_current
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def index_exists(name):
+    conn = get_db_connection()
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+    conn.close()
+    return row is not None
+
+
+def test_schema_version_is_recorded():
+    """Test init_database stamps the schema version"""
+    assert schema_is_current()
+    conn = get_db_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_init_skips_setup_when_schema_is_current():
+    """Test a current schema is not set up again, and an outdated one is"""
+    conn = get_db_connection()
+    conn.execute("DROP INDEX idx_borrow_records_borrow_date")
+    conn.commit()
+    conn.close()
+
+    init_database()
+    assert not index_exists("idx_borrow_records_borrow_date")
+
+    conn = get_db_connection()
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+    init_database()
+    assert index_exists("idx_borrow_records_borrow_date")
+
+
+def outdate_schema():
+    conn = get_db_connection()
+    conn.execute("DROP INDEX idx_borrow_records_borrow_date")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+
+def test_workers_starting_together_wait_for_one_setup():
+    """Test concurrent init_database calls queue on the write lock instead of failing with 'database is locked'"""
+    outdate_schema()
+    blocker = get_db_connection()
+    blocker.execute("BEGIN IMMEDIATE")
+    errors = []
+
+    def start_worker():
+        try:
+            init_database()
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=start_worker) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.3)
+    blocker.rollback()
+    blocker.close()
+    for worker in workers:
+        worker.join(10)
+
+    assert errors == []
+    assert schema_is_current()
+    assert index_exists("idx_borrow_records_borrow_date")
+
+
+def test_interrupted_setup_leaves_the_version_unstamped(monkeypatch):
+    """Test user_version is written in the setup transaction, so a failed setup is redone"""
+    outdate_schema()
+    conn = get_db_connection()
+    conn.execute("DROP TABLE book_popularity")
+    conn.close()
+
+    def fail(records):
+        raise RuntimeError("worker killed")
+
+    monkeypatch.setattr(database, "_tally_book_popularity", fail)
+    with pytest.raises(RuntimeError):
+        init_database()
+    assert not schema_is_current()
+    assert not index_exists("idx_borrow_records_borrow_date")
+
+    monkeypatch.undo()
+    init_database()
+    assert schema_is_current()
+    assert index_exists("idx_borrow_records_borrow_date")
+
+
+def test_production_config_skips_sample_data_and_precompiles():
+    """Test production startup leaves the catalog alone and compiles every template"""
+    app = create_app(PRODUCTION_CONFIG)
+    assert get_all_books() == []
+    assert len(app.jinja_env.cache) == len(app.jinja_env.list_templates())
+    assert app.test_client().get("/catalog").status_code == 200
+
+
+def test_default_config_still_adds_sample_data():
+    """Test the development default keeps the sample catalog"""
+    create_app()
+    assert len(get_all_books()) == 3
+
+
+def test_payment_service_defers_requests_import():
+    """Test importing the app does not import requests"""
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, services.payment_service, routes; print('requests' in sys.modules)"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,188 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+from database import get_book_by_id, get_patron_borrow_count, record_borrow
+from services import write_queue as write_queue_module
+from datetime import datetime, timedelta
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, return_book_by_patron
+from services.write_queue import WriteQueue, get_write_queue, start_write_queue, stop_write_queue
+
+
+@pytest.fixture
+def write_queue():
+    queue = start_write_queue(max_latency=0.05)
+    yield queue
+    stop_write_queue()
+
+
+def test_services_use_the_queue(write_queue):
+    """Test borrow and return go through the writer thread"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 2)
+    assert borrow_book_by_patron("123456", 1)[0] is True
+    assert return_book_by_patron("123456", 1)[0] is True
+    assert write_queue.batches_committed == 2
+    assert get_book_by_id(1)["available_copies"] == 2
+
+
+def test_concurrent_borrows_share_batches(write_queue):
+    """Test concurrent borrows are grouped and each caller gets its own result"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 5)
+    results = []
+    lock = threading.Lock()
+
+    def borrow(patron_id):
+        result = borrow_book_by_patron(patron_id, 1)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=borrow, args=(f"{100000 + i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Five copies: five borrows succeed, the rest are told the book is unavailable
+    assert sum(1 for success, _ in results if success) == 5
+    assert all("not available" in message for success, message in results if not success)
+    assert get_book_by_id(1)["available_copies"] == 0
+    assert write_queue.batches_committed < 8
+
+
+def test_failed_item_does_not_abort_batch():
+    """Test one failing write in a batch is rolled back alone"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    queue = WriteQueue(max_latency=0.05)
+    queue.start()
+    now = datetime.now()
+    due = now + timedelta(days=14)
+    try:
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                queue.submit(lambda conn: record_borrow("123456", 1, now, due, 5, conn=conn), 0))),
+            threading.Thread(target=lambda: results.append(
+                queue.submit(lambda conn: record_borrow("654321", 999, now, due, 5, conn=conn)))),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        queue.stop()
+
+    assert sorted(results) == [(False, "unavailable"), (True, "")]
+    assert get_patron_borrow_count("123456") == 1
+    assert get_patron_borrow_count("654321") == 0
+
+
+def test_stopped_queue_writes_directly():
+    """Test services fall back to direct writes without a queue"""
+    assert get_write_queue() is None
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    assert borrow_book_by_patron("123456", 1)[0] is True
+
+
+def test_failed_batch_reports_the_error_and_the_writer_carries_on(monkeypatch):
+    """Test an error outside the items (here opening the connection) fails that batch only"""
+    queue = WriteQueue(max_latency=0)
+    open_shard_connection = write_queue_module.open_shard_connection
+    failures = [sqlite3.OperationalError("unable to open database file")]
+
+    def flaky_open(shard):
+        if failures:
+            raise failures.pop()
+        return open_shard_connection(shard)
+
+    monkeypatch.setattr(write_queue_module, "open_shard_connection", flaky_open)
+    queue.start()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            queue.submit(lambda conn: (True, ""))
+        assert queue.submit(lambda conn: (True, "")) == (True, "")
+    finally:
+        queue.stop()
+
+
+def test_dead_writer_fails_waiting_and_new_writes(monkeypatch):
+    """Test callers are released when the writer thread dies and later submits raise at once"""
+    monkeypatch.setattr(threading, "excepthook", lambda args: None)
+    queue = WriteQueue(max_latency=0)
+
+    def die(conn, batch):
+        raise SystemExit
+
+    monkeypatch.setattr(queue, "_commit_batch", die)
+    queue.start()
+    with pytest.raises(RuntimeError, match="stopped"):
+        queue.submit(lambda conn: (True, ""))
+    queue._thread.join(1)
+    assert not queue.is_running()
+    with pytest.raises(RuntimeError, match="not running"):
+        queue.submit(lambda conn: (True, ""))
+    queue.stop()
+
+
+def test_submit_times_out_and_withdraws_the_write():
+    """Test a caller stops waiting after its timeout and its queued write is not applied"""
+    queue = WriteQueue(max_latency=0)
+    queue.start()
+    started, release = threading.Event(), threading.Event()
+    applied = []
+    blocker = threading.Thread(target=lambda: queue.submit(lambda conn: (started.set() or release.wait(5), "")))
+    try:
+        blocker.start()
+        assert started.wait(5)
+        with pytest.raises(FutureTimeoutError):
+            queue.submit(lambda conn: (applied.append(1) or True, ""), timeout=0.1)
+    finally:
+        release.set()
+        blocker.join()
+        queue.stop()
+    assert applied == []
+
+
+def test_stopped_queue_rejects_writes():
+    queue = WriteQueue()
+    with pytest.raises(RuntimeError):
+        queue.submit(lambda conn: (True, ""))
+
+
+def test_submit_waits_for_a_write_already_running():
+    """Test a timeout does not report a write the writer has started as failed"""
+    queue = WriteQueue(max_latency=0)
+    queue.start()
+    try:
+        assert queue.submit(lambda conn: (time.sleep(0.3) or True, ""), timeout=0.05) == (True, "")
+    finally:
+        queue.stop()
+
+
+def test_service_reports_a_failed_batch_as_a_result(write_queue, monkeypatch):
+    """Test borrow returns (False, message) instead of raising when the writer's batch fails"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+    stop_write_queue()
+
+    def broken_open(shard):
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(write_queue_module, "open_shard_connection", broken_open)
+    start_write_queue(max_latency=0)
+    success, message = borrow_book_by_patron("111111", 1)
+    assert success is False
+    assert "Database error" in message
+    assert get_patron_borrow_count("111111") == 0
+
+
+def test_service_writes_directly_when_the_queue_stops_under_it(write_queue, monkeypatch):
+    """Test a write refused by a queue that just stopped runs directly"""
+    add_book_to_catalog("Dune", "Frank Herbert", "1111111111111", 1)
+
+    def stopped(work, shard=0, timeout=None):
+        raise RuntimeError("write queue is not running")
+
+    monkeypatch.setattr(write_queue, "submit", stopped)
+    assert borrow_book_by_patron("111111", 1)[0] is True
+    assert get_patron_borrow_count("111111") == 1
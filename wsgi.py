@@ -0,0 +1,11 @@
+"""
+WSGI entry point for multi-worker deployments, e.g.
+
+    gunicorn -w 4 wsgi:app
+
+Uses PRODUCTION_CONFIG: no sample data and templates compiled at startup.
+"""
+
+from app import PRODUCTION_CONFIG, create_app
+
+app = create_app(PRODUCTION_CONFIG)